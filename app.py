@@ -3,16 +3,33 @@ Flask API server for RecipeSnap - Recipe Extractor
 Provides REST API endpoints for recipe extraction
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, g
 from flask_cors import CORS
 from recipe_extractor import RecipeExtractor
 from recipe_searcher import RecipeSearcher
+from recipe_cache import ApplianceCache, ExtractionCache, PageCache, normalize_url
+from recipe_store import RecipeStore
+from pantry import PantryIndex
+from ingredient_parser import IngredientTable, SYSTEMS
+from prefetch import Prefetcher
+from job_queue import JobQueue
+import metrics
+from logging_setup import setup_logging, set_request_id, get_request_id, bind_context
+from concurrent.futures import ThreadPoolExecutor
 import os
+import json
+import time
+import queue
+import logging
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__, static_folder='static')
 # Enable CORS for frontend - allow GitHub Pages and localhost
 CORS(app, origins=[
@@ -23,20 +40,114 @@ CORS(app, origins=[
     "http://127.0.0.1:*"
 ], supports_credentials=True)
 
+# Initialize extraction and page caches (set RECIPE_CACHE_ENABLED=false to disable)
+extraction_cache = None
+page_cache = None
+appliance_cache = None
+if os.getenv('RECIPE_CACHE_ENABLED', 'true').lower() != 'false':
+    try:
+        extraction_cache = ExtractionCache()
+        page_cache = PageCache()
+        appliance_cache = ApplianceCache()
+    except Exception as e:
+        logger.warning("Could not open extraction cache: %s", e)
+
+# Keep every extracted recipe for local search (set RECIPE_STORE_ENABLED=false to disable)
+recipe_store = None
+if os.getenv('RECIPE_STORE_ENABLED', 'true').lower() != 'false':
+    try:
+        recipe_store = RecipeStore()
+    except Exception as e:
+        logger.warning("Could not open recipe store: %s", e)
+
+# Pantry matching over stored recipes; the first load can take a while, so start it now
+pantry_index = None
+if recipe_store is not None:
+    pantry_index = PantryIndex(recipe_store)
+    pantry_index.start()
+
 # Initialize recipe extractor
 try:
-    extractor = RecipeExtractor()
+    extractor = RecipeExtractor(
+        cache=extraction_cache, page_cache=page_cache, appliance_cache=appliance_cache, store=recipe_store
+    )
 except ValueError as e:
-    print(f"Warning: {e}")
+    logger.warning("%s", e)
     extractor = None
 
+# Batch extraction: shared worker pool so concurrent batches can't exceed the limit
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', 200))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch-extract')
+
+# Generate appliance instructions after each extraction (set APPLIANCE_PRECOMPUTE=true to enable)
+appliance_executor = None
+if extractor is not None and os.getenv('APPLIANCE_PRECOMPUTE', 'false').lower() == 'true':
+    appliance_executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv('APPLIANCE_WORKERS', 2)), thread_name_prefix='appliances'
+    )
+
+# Background extraction jobs (set JOB_QUEUE_ENABLED=false to disable)
+def _run_extraction_job(payload):
+    """Run a queued extraction job"""
+    recipe = extractor.extract_recipe(payload['url'])
+    if recipe.get('fetch_error'):
+        # A guess from the URL alone isn't a result; fail the attempt so the queue retries it
+        raise Exception(f"Could not fetch page: {recipe['fetch_error']}")
+    _precompute_appliances(recipe)
+    return recipe
+
+
+job_queue = None
+if extractor is not None and os.getenv('JOB_QUEUE_ENABLED', 'true').lower() != 'false':
+    try:
+        job_queue = JobQueue(_run_extraction_job)
+        job_queue.start()
+    except Exception as e:
+        logger.warning("Could not open job queue: %s", e)
+
+# Speculatively extract the top search results (set PREFETCH_ENABLED=true to enable)
+prefetcher = None
+if extractor is not None and os.getenv('PREFETCH_ENABLED', 'false').lower() == 'true':
+    prefetcher = Prefetcher(extractor)
+
 # Initialize recipe searcher
 try:
-    searcher = RecipeSearcher()
+    searcher = RecipeSearcher(prefetcher=prefetcher, store=recipe_store)
 except ValueError as e:
-    print(f"Warning: {e}")
+    logger.warning("%s", e)
     searcher = None
 
+# Expose cache and coalescing counters on /api/metrics
+for name, cache in (('extraction', extraction_cache), ('page', page_cache), ('appliance', appliance_cache),
+                    ('search', searcher._cache if searcher is not None else None),
+                    ('search_shared', searcher._shared_cache if searcher is not None else None)):
+    if cache is not None:
+        metrics.register_cache(name, cache)
+if extractor is not None:
+    metrics.register_singleflight('extract', extractor._inflight)
+if searcher is not None:
+    metrics.register_singleflight('search', searcher._inflight)
+
+
+@app.before_request
+def start_request_timer():
+    """Record when the request started and tag its log records with a request ID"""
+    g.request_start = time.perf_counter()
+    g.request_id = set_request_id(request.headers.get('X-Request-ID'))
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and observe its duration (time to first byte for streams)"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if 'request_start' in g:
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
 
 @app.route('/')
 def index():
@@ -49,10 +160,29 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'extractor_ready': extractor is not None
+        'extractor_ready': extractor is not None,
+        'llm_backend': extractor.backend.name if extractor is not None else None,
+        'cache': extraction_cache.stats() if extraction_cache is not None else None,
+        'page_cache': page_cache.stats() if page_cache is not None else None,
+        'appliance_cache': appliance_cache.stats() if appliance_cache is not None else None,
+        'search_cache': searcher.cache_stats() if searcher is not None else None,
+        'recipe_store': recipe_store.stats() if recipe_store is not None else None,
+        'pantry_index': pantry_index.stats() if pantry_index is not None else None,
+        'coalescing': {
+            'extract': extractor._inflight.stats() if extractor is not None else None,
+            'search': searcher._inflight.stats() if searcher is not None else None
+        },
+        'prefetch': prefetcher.stats() if prefetcher is not None else None,
+        'jobs': job_queue.stats() if job_queue is not None else None
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Metrics in Prometheus text exposition format"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @app.route('/api/extract', methods=['POST'])
 def extract_recipe():
     """
@@ -73,7 +203,7 @@ def extract_recipe():
     if extractor is None:
         return jsonify({
             'success': False,
-            'error': 'Recipe extractor not initialized. Please check WRITER_API_KEY environment variable.',
+            'error': 'Recipe extractor not initialized. Please check LLM_BACKEND and its API key (WRITER_API_KEY by default).',
             'recipe': None
         }), 500
     
@@ -98,6 +228,7 @@ def extract_recipe():
         
         # Extract recipe
         recipe = extractor.extract_recipe(url)
+        _precompute_appliances(recipe)
         
         return jsonify({
             'success': True,
@@ -113,6 +244,411 @@ def extract_recipe():
         }), 500
 
 
+def _precompute_appliances(recipe):
+    """Generate a recipe's appliance instructions in the background so a later request finds them cached"""
+    if appliance_executor is None or not (recipe.get('ingredients') or recipe.get('directions')):
+        return
+
+    def run():
+        try:
+            extractor.appliance_instructions(recipe)
+        except Exception as e:
+            logger.warning("Background appliance generation failed for %s: %s", recipe.get('source_url'), e)
+
+    appliance_executor.submit(bind_context(run))
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a recipe extraction and return immediately
+
+    Request body:
+    {
+        "url": "https://example.com/recipe"
+    }
+
+    Returns (202, with a Location header pointing at the job):
+    {
+        "success": true,
+        "job": {"id": "...", "status": "queued", "attempts": 0, "result": null, ...},
+        "error": null
+    }
+    """
+    if job_queue is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job queue not available. Please check LLM_BACKEND and JOB_QUEUE_ENABLED.',
+            'job': None
+        }), 503
+
+    data = request.get_json(silent=True)
+    url = (data or {}).get('url')
+    if not isinstance(url, str) or not url.strip():
+        return jsonify({
+            'success': False,
+            'error': 'Missing required field: url',
+            'job': None
+        }), 400
+
+    url = url.strip()
+    # A URL already waiting in the queue shares that job
+    job = job_queue.submit({'url': url}, dedupe_key=normalize_url(url), request_id=get_request_id())
+    response = jsonify({
+        'success': True,
+        'job': job,
+        'error': None
+    })
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll a queued extraction
+
+    Returns:
+    {
+        "success": true,
+        "job": {"id": "...", "status": "succeeded", "attempts": 1, "result": {...recipe...}, "error": null, ...},
+        "error": null
+    }
+    status is "queued", "running", "succeeded" or "failed". A queued job that has
+    failed before has its last error and a "retry_at" time.
+    """
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found',
+            'job': None
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'job': job,
+        'error': None
+    })
+
+
+@app.route('/api/extract/appliances', methods=['POST'])
+def extract_appliance_instructions():
+    """
+    Get Instant Pot / Breville Smart Oven instructions for a recipe
+
+    Request body (either field):
+    {
+        "url": "https://example.com/recipe",
+        "recipe": {"title": "...", "ingredients": [...], "directions": [...]}
+    }
+
+    Returns:
+    {
+        "success": true,
+        "applianceInstructions": [{"applianceName": "Instant Pot", "instructions": [...]}],
+        "error": null
+    }
+    """
+    if extractor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Recipe extractor not initialized. Please check LLM_BACKEND and its API key (WRITER_API_KEY by default).',
+            'applianceInstructions': []
+        }), 500
+
+    data = request.get_json(silent=True) or {}
+    recipe = data.get('recipe')
+    url = data.get('url')
+    if recipe is not None and not (
+        isinstance(recipe, dict)
+        and isinstance(recipe.get('ingredients', []), list)
+        and isinstance(recipe.get('directions', []), list)
+    ):
+        return jsonify({
+            'success': False,
+            'error': 'recipe must be an object with ingredients and directions lists',
+            'applianceInstructions': []
+        }), 400
+    if recipe is None and (not isinstance(url, str) or not url.strip()):
+        return jsonify({
+            'success': False,
+            'error': 'Missing required field: url or recipe',
+            'applianceInstructions': []
+        }), 400
+
+    try:
+        # Extractions are cached, so this is usually free for a recipe the client just loaded
+        if recipe is None:
+            recipe = extractor.extract_recipe(url.strip())
+        return jsonify({
+            'success': True,
+            'applianceInstructions': extractor.appliance_instructions(recipe),
+            'error': None
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'applianceInstructions': []
+        }), 500
+
+
+def _extract_one(url, on_event=None):
+    """Extract a single URL for a batch, capturing errors and timing."""
+    start = time.perf_counter()
+    try:
+        recipe = extractor.extract_recipe(url, on_event=on_event)
+        error = None
+        if recipe.get('fetch_error'):
+            # A guess from the URL alone isn't a successful extraction
+            recipe, error = None, f"Could not fetch page: {recipe['fetch_error']}"
+        else:
+            _precompute_appliances(recipe)
+    except Exception as e:
+        recipe = None
+        error = str(e)
+    return {
+        'url': url,
+        'success': error is None,
+        'recipe': recipe,
+        'error': error,
+        'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def _batch_urls(data):
+    """
+    Validate and deduplicate the "urls" field of a batch request.
+
+    Returns:
+        tuple: (urls, unique_urls, error). error is None when the request is valid.
+    """
+    if not data or not isinstance(data.get('urls'), list):
+        return None, None, 'Missing required field: urls (list of URLs)'
+
+    urls = [u.strip() for u in data['urls'] if isinstance(u, str) and u.strip()]
+
+    if not urls:
+        return None, None, 'urls cannot be empty'
+    if len(urls) > BATCH_MAX_URLS:
+        return None, None, f'Too many URLs: {len(urls)} (maximum {BATCH_MAX_URLS})'
+
+    # Deduplicate on the normalized URL, keeping the first spelling we saw
+    by_key = {}
+    for u in urls:
+        by_key.setdefault(normalize_url(u), u)
+    return urls, list(by_key.values()), None
+
+
+def _batch_stats(urls, results, wall_time_ms):
+    """Summarize a finished batch."""
+    succeeded = sum(1 for r in results if r['success'])
+    return {
+        'requested': len(urls),
+        'unique': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'wall_time_ms': wall_time_ms
+    }
+
+
+@app.route('/api/extract/batch', methods=['POST'])
+def extract_recipes_batch():
+    """
+    Extract recipes from many URLs in parallel
+
+    Request body:
+    {
+        "urls": ["https://example.com/recipe-1", "https://example.com/recipe-2"]
+    }
+
+    Returns:
+    {
+        "success": true,
+        "results": [
+            {
+                "url": "https://example.com/recipe-1",
+                "success": true,
+                "recipe": {...},
+                "error": null,
+                "duration_ms": 812.4
+            },
+            ...
+        ],
+        "stats": {"requested": 2, "unique": 2, "succeeded": 2, "failed": 0, "wall_time_ms": 830.2},
+        "error": null
+    }
+    """
+    if extractor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Recipe extractor not initialized. Please check LLM_BACKEND and its API key (WRITER_API_KEY by default).',
+            'results': []
+        }), 500
+
+    urls, unique_urls, error = _batch_urls(request.get_json(silent=True))
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error,
+            'results': []
+        }), 400
+
+    start = time.perf_counter()
+    results = list(batch_executor.map(bind_context(_extract_one), unique_urls))
+    stats = _batch_stats(urls, results, round((time.perf_counter() - start) * 1000, 1))
+    logger.info("Batch extracted %d/%d recipes in %sms", stats['succeeded'], stats['unique'], stats['wall_time_ms'])
+
+    return jsonify({
+        'success': True,
+        'results': results,
+        'stats': stats,
+        'error': None
+    })
+
+
+def _extraction_events(urls, requested=None):
+    """
+    Run extractions in the background and yield their events as they happen.
+
+    Yields progress events ("fetched", "reduced", "llm_started", "parsed", ...),
+    a "result" event per URL as soon as it finishes, then a final "done" event.
+    Extractions run on batch_executor, so all streams and batches together never
+    run more than BATCH_CONCURRENCY at once. If the generator is closed early
+    (the client went away), extractions that haven't started are cancelled.
+
+    Args:
+        urls (list): URLs to extract
+        requested (int): Number of URLs requested, before deduplication, for the
+            "done" stats (default len(urls))
+    """
+    events = queue.Queue()
+    start = time.perf_counter()
+
+    def elapsed_ms():
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    def run(url):
+        def on_event(event, data):
+            events.put({'event': event, 'url': url, 'data': data, 'elapsed_ms': elapsed_ms()})
+        result = _extract_one(url, on_event=on_event)
+        events.put({'event': 'result', **result, 'elapsed_ms': elapsed_ms()})
+
+    # Worker threads log under the request ID of the request that started them
+    futures = [batch_executor.submit(bind_context(run), url) for url in urls]
+    try:
+        results = []
+        while len(results) < len(urls):
+            event = events.get()
+            if event['event'] == 'result':
+                results.append(event)
+            yield event
+
+        stats = _batch_stats(urls, results, elapsed_ms())
+        if requested is not None:
+            stats['requested'] = requested
+        yield {'event': 'done', 'stats': stats}
+    finally:
+        # Nobody will read the rest; extractions already running finish and are cached
+        for future in futures:
+            future.cancel()
+
+
+def _stream_response(events):
+    """
+    Stream events as NDJSON, or as Server-Sent Events when the client asks for
+    text/event-stream (Accept header or ?format=sse).
+    """
+    use_sse = (
+        request.args.get('format') == 'sse'
+        or 'text/event-stream' in request.headers.get('Accept', '')
+    )
+
+    def encode():
+        try:
+            for event in events:
+                payload = json.dumps(event)
+                yield f"event: {event['event']}\ndata: {payload}\n\n" if use_sse else f"{payload}\n"
+        finally:
+            # Closed when the client disconnects; pass that on so pending work is cancelled
+            events.close()
+
+    return Response(
+        encode(),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+        # Ask proxies not to buffer so events reach the client immediately
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/extract/stream', methods=['POST'])
+def extract_recipe_stream():
+    """
+    Extract recipe from URL, streaming progress events
+
+    Request body:
+    {
+        "url": "https://example.com/recipe"
+    }
+
+    Streams NDJSON (or SSE) events:
+    {"event": "fetched", "url": "...", "data": {"characters": 182344}, "elapsed_ms": 412.0}
+    {"event": "llm_started", "url": "...", "data": {"stage": "recipe"}, "elapsed_ms": 430.2}
+    {"event": "result", "url": "...", "success": true, "recipe": {...}, "error": null, ...}
+    {"event": "done", "stats": {...}}
+    """
+    if extractor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Recipe extractor not initialized. Please check LLM_BACKEND and its API key (WRITER_API_KEY by default).',
+            'recipe': None
+        }), 500
+
+    data = request.get_json(silent=True)
+    url = (data or {}).get('url')
+    if not isinstance(url, str) or not url.strip():
+        return jsonify({
+            'success': False,
+            'error': 'Missing required field: url',
+            'recipe': None
+        }), 400
+
+    return _stream_response(_extraction_events([url.strip()]))
+
+
+@app.route('/api/extract/batch/stream', methods=['POST'])
+def extract_recipes_batch_stream():
+    """
+    Extract recipes from many URLs in parallel, streaming each result as it finishes
+
+    Request body:
+    {
+        "urls": ["https://example.com/recipe-1", "https://example.com/recipe-2"]
+    }
+
+    Streams the same events as /api/extract/stream for every URL, then a final
+    {"event": "done", "stats": {...}} event.
+    """
+    if extractor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Recipe extractor not initialized. Please check LLM_BACKEND and its API key (WRITER_API_KEY by default).',
+            'results': []
+        }), 500
+
+    urls, unique_urls, error = _batch_urls(request.get_json(silent=True))
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error,
+            'results': []
+        }), 400
+
+    return _stream_response(_extraction_events(unique_urls, requested=len(urls)))
+
+
 @app.route('/api/search', methods=['POST'])
 def search_recipes():
     """
@@ -183,6 +719,345 @@ def search_recipes():
         }), 500
 
 
+@app.route('/api/pantry', methods=['POST'])
+def match_pantry():
+    """
+    Find stored recipes that can be made from the ingredients on hand
+
+    Request body:
+    {
+        "pantry": ["eggs", "flour", "milk"],
+        "limit": 10,  (optional, default 10, max 100)
+        "max_missing": 2,  (optional, default no limit)
+        "assume_staples": true  (optional, default true: salt, pepper and water are on hand)
+    }
+
+    Returns:
+    {
+        "success": true,
+        "results": [
+            {
+                "title": "Recipe Title",
+                "url": "https://...",
+                "site": "example.com",
+                "ingredients": 5,
+                "matched": 4,
+                "missing_count": 1,
+                "coverage": 0.8,
+                "missing": ["sugar"]
+            },
+            ...
+        ],
+        "error": null
+    }
+    """
+    if pantry_index is None:
+        return jsonify({
+            'success': False,
+            'error': 'Recipe store not available. Please check RECIPE_STORE_ENABLED.',
+            'results': []
+        }), 503
+
+    data = request.get_json(silent=True) or {}
+    pantry = data.get('pantry')
+    if not isinstance(pantry, list) or not pantry or not all(isinstance(item, str) for item in pantry):
+        return jsonify({
+            'success': False,
+            'error': 'Field "pantry" must be a non-empty list of ingredients',
+            'results': []
+        }), 400
+
+    limit = data.get('limit', 10)
+    max_missing = data.get('max_missing')
+    if not isinstance(limit, int) or not 1 <= limit <= 100 or (
+            max_missing is not None and (not isinstance(max_missing, int) or max_missing < 0)):
+        return jsonify({
+            'success': False,
+            'error': 'limit must be between 1 and 100 and max_missing a non-negative integer',
+            'results': []
+        }), 400
+
+    try:
+        results = pantry_index.match(
+            pantry, limit=limit, max_missing=max_missing, assume_staples=data.get('assume_staples', True) is not False
+        )
+        return jsonify({
+            'success': True,
+            'results': results,
+            'error': None
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'results': []
+        }), 500
+
+
+def _scale_entry(entry, default_system):
+    """
+    Resolve one recipe of a /api/scale request.
+
+    Returns:
+        tuple: (entry dict with url, title, ingredients, factor and system; error message or None)
+    """
+    if not isinstance(entry, dict):
+        return None, 'Each recipe must be an object'
+
+    url = entry.get('url')
+    if url is not None and not isinstance(url, str):
+        return None, 'Field "url" must be a string'
+    title = entry.get('title')
+    ingredients = entry.get('ingredients')
+    if ingredients is None:
+        if not url or not url.strip():
+            return None, 'Each recipe needs a "url" or an "ingredients" list'
+        stored = recipe_store.get(url) if recipe_store is not None else None
+        if stored is None:
+            return None, f'Recipe not extracted yet: {url}'
+        ingredients = stored.get('ingredients') or []
+        title = title or stored.get('title')
+    if not isinstance(ingredients, list) or not all(isinstance(line, str) for line in ingredients):
+        return None, 'Field "ingredients" must be a list of strings'
+
+    factor = entry.get('factor')
+    if factor is None and entry.get('target_servings') is not None:
+        servings, target = entry.get('servings'), entry.get('target_servings')
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+                   for value in (servings, target)):
+            return None, '"servings" and "target_servings" must be positive numbers'
+        factor = target / servings
+    if factor is None:
+        factor = 1
+    if not isinstance(factor, (int, float)) or isinstance(factor, bool) or not 0 < factor <= 100:
+        return None, '"factor" must be a number between 0 and 100'
+
+    system = entry.get('system', default_system)
+    if system not in SYSTEMS:
+        return None, '"system" must be "metric", "imperial" or null'
+
+    return {'url': url, 'title': title, 'ingredients': ingredients, 'factor': factor, 'system': system}, None
+
+
+@app.route('/api/scale', methods=['POST'])
+def scale_recipes():
+    """
+    Scale recipes' ingredients and convert their units
+
+    Recipes are given by URL (looked up among extracted recipes, no new extraction)
+    or as ingredient lists. A single recipe can be sent without the "recipes" list.
+
+    Request body:
+    {
+        "recipes": [
+            {"url": "https://...", "factor": 2},
+            {"ingredients": ["1 cup flour", ...], "servings": 4, "target_servings": 6, "system": "imperial"}
+        ],
+        "system": "metric"  (optional: "metric", "imperial" or null to keep units, default null)
+    }
+
+    Returns:
+    {
+        "success": true,
+        "recipes": [
+            {
+                "url": "https://...",
+                "title": "Recipe Title",
+                "factor": 2,
+                "ingredients": [
+                    {
+                        "original": "1 1/2 cups flour, sifted",
+                        "quantity": 710.0,
+                        "quantity_max": null,
+                        "unit": "ml",
+                        "size": null,
+                        "item": "flour",
+                        "notes": "sifted",
+                        "name": "flour",
+                        "names": ["flour"],
+                        "text": "710 ml flour, sifted"
+                    },
+                    ...
+                ],
+                "error": null
+            },
+            ...
+        ],
+        "error": null
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('recipes')
+    if entries is None and ('url' in data or 'ingredients' in data):
+        entries = [data]
+    if not isinstance(entries, list) or not entries:
+        return jsonify({
+            'success': False,
+            'error': 'Field "recipes" must be a non-empty list',
+            'recipes': []
+        }), 400
+    if len(entries) > BATCH_MAX_URLS:
+        return jsonify({
+            'success': False,
+            'error': f'Too many recipes: {len(entries)} (maximum {BATCH_MAX_URLS})',
+            'recipes': []
+        }), 400
+
+    default_system = data.get('system') if 'recipes' in data else None
+    if default_system not in SYSTEMS:
+        return jsonify({
+            'success': False,
+            'error': '"system" must be "metric", "imperial" or null',
+            'recipes': []
+        }), 400
+
+    try:
+        resolved = [_scale_entry(entry, default_system) for entry in entries]
+        ready = [entry for entry, error in resolved if error is None]
+
+        # One table for the whole request: scaling and conversion run once over every line
+        table = IngredientTable.from_recipes([entry['ingredients'] for entry in ready])
+        table = table.scale([entry['factor'] for entry in ready]).convert(
+            [entry['system'] for entry in ready]
+        ).rounded()
+
+        results = []
+        position = 0
+        for requested, (entry, error) in zip(entries, resolved):
+            if error is not None:
+                results.append({
+                    'url': requested.get('url') if isinstance(requested, dict) else None,
+                    'title': None,
+                    'factor': None,
+                    'ingredients': [],
+                    'error': error
+                })
+                continue
+            results.append({
+                'url': entry['url'],
+                'title': entry['title'],
+                'factor': entry['factor'],
+                'ingredients': table.records(position),
+                'error': None
+            })
+            position += 1
+
+        return jsonify({
+            'success': True,
+            'recipes': results,
+            'error': None
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'recipes': []
+        }), 500
+
+
+@app.route('/api/shopping-list', methods=['POST'])
+def shopping_list():
+    """
+    Combine several recipes' ingredients into one shopping list
+
+    Recipes are given as in /api/scale: by URL (looked up among extracted
+    recipes, no new extraction) or as ingredient lists, optionally scaled.
+
+    Request body:
+    {
+        "recipes": [
+            {"url": "https://...", "factor": 2},
+            {"ingredients": ["1 cup flour", ...]}
+        ],
+        "urls": ["https://...", ...],  (optional shorthand for unscaled recipes)
+        "system": "metric"  (optional: "metric" or "imperial", default each item's own system)
+    }
+
+    Returns:
+    {
+        "success": true,
+        "items": [
+            {
+                "name": "black bean",
+                "item": "black beans",
+                "quantity": 3.0,
+                "quantity_max": null,
+                "unit": "can",
+                "size": "15 oz",
+                "text": "3 (15 oz) cans black beans",
+                "recipes": [0, 1],  (positions in the request's recipe list)
+                "lines": 2
+            },
+            ...
+        ],
+        "recipes": [{"url": "https://...", "title": "Recipe Title", "error": null}, ...],
+        "error": null
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('recipes', [])
+    urls = data.get('urls', [])
+    if not isinstance(entries, list) or not isinstance(urls, list) or not entries + urls:
+        return jsonify({
+            'success': False,
+            'error': 'Fields "recipes" and "urls" must be lists, and at least one recipe is required',
+            'items': [],
+            'recipes': []
+        }), 400
+    entries = entries + [{'url': url} for url in urls]
+    if len(entries) > BATCH_MAX_URLS:
+        return jsonify({
+            'success': False,
+            'error': f'Too many recipes: {len(entries)} (maximum {BATCH_MAX_URLS})',
+            'items': [],
+            'recipes': []
+        }), 400
+
+    system = data.get('system')
+    if system not in SYSTEMS:
+        return jsonify({
+            'success': False,
+            'error': '"system" must be "metric", "imperial" or null',
+            'items': [],
+            'recipes': []
+        }), 400
+
+    try:
+        resolved = [_scale_entry(entry, None) for entry in entries]
+        ready = [position for position, (entry, error) in enumerate(resolved) if error is None]
+
+        table = IngredientTable.from_recipes([resolved[position][0]['ingredients'] for position in ready])
+        table = table.scale([resolved[position][0]['factor'] for position in ready])
+        items = table.shopping_list(system)
+        for item in items:
+            item['recipes'] = [ready[recipe] for recipe in item['recipes']]
+
+        recipes = []
+        for requested, (entry, error) in zip(entries, resolved):
+            recipes.append({
+                'url': requested.get('url') if isinstance(requested, dict) else None,
+                'title': entry['title'] if entry is not None else None,
+                'error': error
+            })
+
+        return jsonify({
+            'success': True,
+            'items': items,
+            'recipes': recipes,
+            'error': None
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'items': [],
+            'recipes': []
+        }), 500
+
+
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
     """Test endpoint with sample data"""
@@ -0,0 +1,386 @@
+"""
+RecipeSnap - Async Recipe Extraction
+asyncio versions of RecipeExtractor and RecipeSearcher, so one process can keep
+hundreds of page fetches and AI calls in flight at once.
+Output formats match the synchronous classes exactly.
+"""
+
+import asyncio
+import json
+import logging
+from http_client import AsyncHTTPClient
+from recipe_extractor import RecipeExtractor
+from recipe_searcher import RecipeSearcher, normalize_query
+from recipe_cache import ApplianceCache, PageCache, normalize_url
+from singleflight import AsyncSingleFlight
+from page_reader import PageReader
+from llm_backends import StreamDecoder
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRecipeExtractor(RecipeExtractor):
+    """Extracts and formats recipes from URLs using AI, with asyncio I/O."""
+
+    def __init__(self, api_key=None, cache=None, token_budget=None, http=None, page_cache=None, backend=None,
+                 appliance_cache=None, store=None):
+        """
+        Initialize the async recipe extractor.
+
+        Args:
+            api_key (str): API key for the LLM backend (see RecipeExtractor).
+            cache (ExtractionCache): Optional cache of previous extractions.
+            token_budget (int): Approximate token budget for page content in the prompt.
+            http (AsyncHTTPClient): Async HTTP client. A new one is created if not provided.
+            page_cache (PageCache): Optional store of fetched pages, re-validated with conditional GETs.
+            backend (LLMBackend): LLM backend to call (see RecipeExtractor).
+            appliance_cache (ApplianceCache): Optional cache of generated appliance instructions.
+            store (RecipeStore): Optional recipe store that recipes extracted from fetched pages
+                are added to.
+        """
+        super().__init__(
+            api_key=api_key, cache=cache, token_budget=token_budget, page_cache=page_cache, backend=backend,
+            appliance_cache=appliance_cache, store=store
+        )
+        self.http = http or AsyncHTTPClient()
+        self._inflight = AsyncSingleFlight()
+
+    async def extract_recipe(self, url, on_event=None):
+        """
+        Extract recipe from URL using AI.
+
+        Args:
+            url (str): The recipe URL to extract
+            on_event (callable): Optional progress callback (see RecipeExtractor.extract_recipe)
+
+        Returns:
+            dict: Structured recipe data (same format as RecipeExtractor.extract_recipe)
+        """
+        def join():
+            logger.info("Joining in-flight extraction for %s", url)
+            self._emit(on_event, 'coalesced')
+
+        with metrics.IN_FLIGHT.track(operation='extract'), metrics.stage('extract', 'total'):
+            recipe = await self._inflight.do(
+                normalize_url(url), lambda: self._extract_recipe(url, on_event), on_wait=join
+            )
+        # Label a copy, so source_url never depends on how the result is shared between callers
+        recipe = dict(recipe)
+        recipe['source_url'] = url
+        return recipe
+
+    async def _extract_recipe(self, url, on_event=None):
+        """Fetch and extract a recipe (see extract_recipe)."""
+        logger.info("Extracting recipe from %s", url)
+        with metrics.stage('extract', 'fetch'):
+            page = await self._fetch_page(url)
+        self._emit(on_event, 'fetched', characters=self._page_characters(page), not_modified=page['not_modified'])
+
+        # HTML parsing and cache access are blocking, so keep them off the event loop
+        webpage_content, recipe, page_text, cache_key, cached = await asyncio.to_thread(
+            self._prepare_page, url, page, on_event
+        )
+        if cached is not None:
+            self._emit(on_event, 'cached')
+            await asyncio.to_thread(self._add_to_store, url, cached)
+            return cached
+
+        if recipe:
+            logger.info("Found structured recipe data: %s", recipe['title'])
+            self._emit(on_event, 'structured', title=recipe['title'])
+        else:
+            recipe = await self._extract_with_ai(url, page_text, on_event)
+            if not webpage_content:
+                # The model only had the URL to go on; flag it so callers can treat it as a failure
+                recipe['fetch_error'] = page['error'] or 'Page was empty'
+
+        self._emit(
+            on_event, 'parsed',
+            ingredients=len(recipe.get('ingredients', [])),
+            directions=len(recipe.get('directions', []))
+        )
+        with metrics.stage('extract', 'cache_store'):
+            await asyncio.to_thread(self._store_cache, cache_key, recipe)
+            if webpage_content:
+                await asyncio.to_thread(self._add_to_store, url, recipe)
+        return recipe
+
+    async def _fetch_page(self, url):
+        """
+        Fetch a recipe page, re-validating a stored copy with a conditional GET if there is one.
+
+        Args:
+            url (str): The recipe URL
+
+        Returns:
+            dict: The page from _page_from_response, plus "error" (message if the fetch
+                failed, else None) and "reducer" (HTMLReducer already fed the downloaded
+                page, or None)
+        """
+        try:
+            logger.debug("Fetching webpage content")
+            stored = None
+            if self.page_cache is not None:
+                stored = await asyncio.to_thread(self.page_cache.get_page, url)
+            readers = []
+
+            def make_reader(status_code, headers):
+                # Error and 304 bodies are never used
+                if status_code >= 300:
+                    return None
+                readers.append(PageReader(headers.get('Content-Type'), token_budget=self.token_budget))
+                return readers[-1]
+
+            try:
+                response = await self.http.request_stream(
+                    'GET', url, make_reader, timeout=30, headers=PageCache.conditional_headers(stored)
+                )
+            except Exception:
+                metrics.upstream('page', 'error')
+                raise
+            metrics.upstream('page', response.status_code)
+            if response.status_code >= 400:
+                raise Exception(f"HTTP {response.status_code}")
+            complete = True
+            reducer = None
+            if readers:
+                self._log_page_read(readers[-1])
+                complete = not (readers[-1].stopped_early or readers[-1].truncated)
+                reducer = readers[-1].reducer
+            page = await asyncio.to_thread(
+                self._page_from_response, url, stored, response.status_code, response.text, response.headers,
+                complete
+            )
+            page.update(error=None, reducer=reducer)
+            return page
+        except Exception as e:
+            logger.warning("Could not fetch webpage content from %s: %s", url, e)
+            return {'content': None, 'not_modified': False, 'stored': None, 'validators': None,
+                    'error': str(e), 'reducer': None}
+
+    async def _extract_with_ai(self, url, page_text, on_event=None):
+        """
+        Run the LLM extraction for a page.
+
+        Args:
+            url (str): The recipe URL
+            page_text (str): Reduced page text, or None if the fetch failed
+            on_event (callable): Optional progress callback
+
+        Returns:
+            dict: Structured recipe data
+        """
+        with metrics.stage('extract', 'prompt_build'):
+            prompt = self._build_prompt(url, page_text)
+
+        try:
+            self._emit(on_event, 'llm_started', stage='recipe')
+            with metrics.stage('extract', 'llm'):
+                response_text = await self._call_llm(prompt, on_delta=self._partial_emitter(url, on_event))
+            with metrics.stage('extract', 'parse'):
+                return self._parse_recipe_response(response_text, url)
+        except Exception as e:
+            logger.error("AI extraction error: %s", e)
+            raise Exception(f"AI extraction failed: {str(e)}")
+
+    async def appliance_instructions(self, recipe, on_event=None):
+        """
+        Get appliance instructions for an extracted recipe (see RecipeExtractor.appliance_instructions).
+
+        Args:
+            recipe (dict): Recipe returned by extract_recipe
+            on_event (callable): Optional progress callback
+
+        Returns:
+            list: applianceInstructions entries
+        """
+        key = ApplianceCache.make_key(recipe, self.APPLIANCE_PROMPT_VERSION)
+        with metrics.stage('appliances', 'total'):
+            return await self._inflight.do(
+                f"appliances:{key}", lambda: self._appliance_instructions(key, recipe, on_event)
+            )
+
+    async def _appliance_instructions(self, key, recipe, on_event=None):
+        """Look up or generate appliance instructions (see appliance_instructions)."""
+        if self.appliance_cache is not None:
+            cached = await asyncio.to_thread(self.appliance_cache.get, key)
+            if cached is not None:
+                self._emit(on_event, 'cached', stage='appliance')
+                return cached['applianceInstructions']
+
+        instructions = await self._extract_appliance_instructions(recipe, on_event)
+        if self.appliance_cache is not None:
+            await asyncio.to_thread(self.appliance_cache.set, key, {'applianceInstructions': instructions})
+        return instructions
+
+    async def _extract_appliance_instructions(self, recipe, on_event=None):
+        """
+        Generate appliance-specific instructions for an already extracted recipe.
+
+        Args:
+            recipe (dict): Recipe with ingredients and directions
+            on_event (callable): Optional progress callback
+
+        Returns:
+            list: applianceInstructions entries
+        """
+        prompt = self._build_appliance_prompt(recipe)
+        if prompt is None:
+            return []
+
+        try:
+            self._emit(on_event, 'llm_started', stage='appliance')
+            with metrics.stage('appliances', 'llm'):
+                return self._parse_appliance_response(await self._call_llm(prompt))
+        except Exception as e:
+            logger.warning("Could not generate appliance instructions: %s", e)
+            raise Exception(f"Appliance instruction generation failed: {str(e)}")
+
+    async def _call_llm(self, prompt, on_delta=None):
+        """
+        Send a prompt to the LLM backend.
+
+        Args:
+            prompt (str): The user prompt
+            on_delta (callable): If given, the completion is streamed and this is called
+                with each piece of text as it arrives
+
+        Returns:
+            str: The model's response text
+        """
+        backend = self.backend
+        stream = on_delta is not None
+        headers, payload = backend.build_request(prompt, stream=stream)
+        logger.debug("Calling %s model %s at %s", backend.label, backend.model, backend.api_url)
+
+        decoders = []
+
+        def make_reader(status, response_headers):
+            ok = status == 200
+            decoders.append(StreamDecoder(
+                backend, response_headers.get('Content-Type') if ok else None, on_delta if ok else None
+            ))
+            return decoders[-1]
+
+        try:
+            if stream:
+                response = await self.http.request_stream(
+                    'POST', backend.api_url, make_reader, timeout=backend.timeout, headers=headers, json=payload
+                )
+            else:
+                response = await self.http.request(
+                    'POST', backend.api_url, timeout=backend.timeout, headers=headers, json=payload
+                )
+        except Exception:
+            metrics.upstream(backend.name, 'error')
+            raise
+        metrics.upstream(backend.name, response.status_code)
+
+        if stream:
+            return backend.stream_result(response.status_code, decoders[-1])
+
+        # Handle API errors
+        if response.status_code != 200:
+            raise Exception(backend.error_message(response.status_code, response.text))
+
+        return backend.response_text(json.loads(response.text))
+
+    async def close(self):
+        """Close the HTTP connection pool."""
+        await self.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AsyncRecipeSearcher(RecipeSearcher):
+    """Searches for recipes using Google Custom Search API, with asyncio I/O."""
+
+    def __init__(self, api_key=None, search_engine_id=None, http=None, store=None):
+        """
+        Initialize the async recipe searcher.
+
+        Args:
+            api_key (str): Google Custom Search API key. If not provided, reads from GOOGLE_API_KEY env var.
+            search_engine_id (str): Google Custom Search Engine ID. If not provided, reads from GOOGLE_CSE_ID env var.
+            http (AsyncHTTPClient): Async HTTP client. A new one is created if not provided.
+            store (RecipeStore): Optional store of extracted recipes, searched before Google.
+        """
+        super().__init__(api_key=api_key, search_engine_id=search_engine_id, store=store)
+        self.http = http or AsyncHTTPClient()
+        self._inflight = AsyncSingleFlight()
+
+    async def search_recipes(self, query, num_results=5):
+        """
+        Search for recipes using Google Custom Search.
+
+        Args:
+            query (str): The recipe search query
+            num_results (int): Number of results to return (default 5, max 10)
+
+        Returns:
+            list: Search results (same format as RecipeSearcher.search_recipes)
+        """
+        with metrics.IN_FLIGHT.track(operation='search'), metrics.stage('search', 'total'):
+            results = await self._inflight.do(
+                f"{normalize_query(query)}:{min(num_results, 10)}",
+                lambda: self._search_recipes(query, num_results)
+            )
+        if self.prefetcher is not None:
+            # Only queues work on the prefetcher's own thread pool
+            self.prefetcher.prefetch_results(results)
+        return results
+
+    async def _search_recipes(self, query, num_results):
+        """Search the recipe store, then Google Custom Search using the cache (see search_recipes)."""
+        logger.info("Searching for recipes: %s", query)
+
+        with metrics.stage('search', 'local'):
+            local = await asyncio.to_thread(self._search_local, query, num_results)
+        if self._enough_local(local, num_results):
+            logger.info("Answered '%s' from the recipe store", query)
+            return local
+
+        with metrics.stage('search', 'cache_lookup'):
+            cached = self._get_cached(query, num_results)
+        if cached is not None:
+            return self._merge_local(local, cached, num_results)
+
+        try:
+            self._count_google_fallback()
+            try:
+                with metrics.stage('search', 'google_api'):
+                    response = await self.http.request(
+                        'GET', self.api_url, timeout=10, params=self._build_params(query, num_results)
+                    )
+            except Exception:
+                metrics.upstream('google', 'error')
+                raise
+            metrics.upstream('google', response.status_code)
+
+            # Handle API errors
+            if response.status_code != 200:
+                raise Exception(self._error_message(response.status_code, response.text))
+
+            with metrics.stage('search', 'parse'):
+                results = self._parse_results(json.loads(response.text))
+            self._store_cached(query, num_results, results)
+            return self._merge_local(local, results, num_results)
+
+        except Exception as e:
+            logger.error("Search error: %s", e)
+            raise Exception(f"Recipe search failed: {str(e)}")
+
+    async def close(self):
+        """Close the HTTP connection pool."""
+        await self.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,521 @@
+"""
+RecipeSnap - Benchmark Suite
+End-to-end throughput and latency benchmarks for RecipeExtractor,
+RecipeSearcher and the Flask API, run entirely against local stand-ins:
+saved recipe pages from benchmarks/corpus served over HTTP, mock_llm_server.py
+for the LLM, and a fake Google Custom Search endpoint.
+
+Reports p50/p95/p99 latency, throughput at each concurrency level, per-stage
+timing and the memory high-water mark, and saves everything as JSON so runs
+can be compared between commits.
+
+Usage:
+    python benchmark.py                                # all scenarios
+    python benchmark.py --scenarios extract_cold,api_extract --concurrency 1,8,32
+    python benchmark.py --output benchmarks/baseline.json    # save a baseline
+    python benchmark.py --compare benchmarks/baseline.json --fail-on-regression
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from urllib.parse import urlsplit, parse_qs, quote
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+
+# resource is Unix-only; memory reporting is skipped elsewhere
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import requests
+import mock_llm_server
+from llm_backends import LocalBackend
+from logging_setup import setup_logging
+from recipe_cache import ExtractionCache, MemoryCache, PageCache
+from recipe_extractor import RecipeExtractor
+from recipe_searcher import RecipeSearcher
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, 'corpus')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+SCENARIOS = ['extract_cold', 'extract_warm', 'search', 'api_extract', 'api_search']
+
+# Extraction progress events, named for the stage each one ends
+STAGE_NAMES = {
+    'fetched': 'fetch',
+    'cached': 'cache_lookup',
+    'structured': 'structured_parse',
+    'reduced': 'reduce_html',
+    'llm_started': 'prompt_build',
+    'parsed': 'llm_and_parse',
+}
+
+SEARCH_QUERIES = [
+    'lasagna', 'pancakes', 'beef chili', 'chicken curry', 'banana bread', 'apple pie',
+    'tomato soup', 'pad thai', 'fried rice', 'carbonara', 'tacos', 'granola'
+]
+
+
+class _CorpusHandler(SimpleHTTPRequestHandler):
+    """Serves corpus pages (query strings are ignored, so every ?n= variant is the same page)."""
+
+    def handle_one_request(self):
+        # The extractor stops reading once it has the recipe and drops the connection
+        try:
+            super().handle_one_request()
+        except (ConnectionResetError, BrokenPipeError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    """Fake Google Custom Search API whose results point at the corpus server."""
+
+    pages = []
+    base_url = ''
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        num = int(params.get('num', ['5'])[0])
+        query = params.get('q', [''])[0]
+        items = [
+            {
+                'title': f"{query} #{i}",
+                'link': f"{self.base_url}/{self.pages[i % len(self.pages)]}?q={quote(query)}&i={i}",
+                'snippet': f"A recipe for {query}",
+                'displayLink': urlsplit(self.base_url).netloc
+            }
+            for i in range(num)
+        ]
+        payload = json.dumps({'items': items}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server(handler):
+    """Start a threaded HTTP server on a free local port."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values (nearest-rank), or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies_ms):
+    """Summarize a list of latencies in milliseconds."""
+    return {
+        'count': len(latencies_ms),
+        'mean': round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None,
+        'p50': _round(percentile(latencies_ms, 50)),
+        'p95': _round(percentile(latencies_ms, 95)),
+        'p99': _round(percentile(latencies_ms, 99)),
+        'max': _round(max(latencies_ms) if latencies_ms else None),
+    }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def max_rss_mb():
+    """Process memory high-water mark in MiB, or None where unsupported."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    """Return the current git commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+    """Runs benchmark scenarios against local stand-ins for every upstream service."""
+
+    def __init__(self, requests_per_level=40, concurrency_levels=(1, 4, 16), llm_latency='fixed:200',
+                 llm_errors='', trace_memory=False):
+        """
+        Initialize the benchmark and start the stand-in servers.
+
+        Args:
+            requests_per_level (int): Requests issued at each concurrency level
+            concurrency_levels (tuple): Numbers of concurrent clients to test
+            llm_latency (str): Mock LLM latency distribution (see mock_llm_server.parse_latency)
+            llm_errors (str): Mock LLM error distribution (see mock_llm_server.parse_errors)
+            trace_memory (bool): Also record the Python heap peak per run with tracemalloc
+                (slows everything down, so latencies aren't comparable with untraced runs)
+        """
+        self.requests_per_level = requests_per_level
+        self.concurrency_levels = concurrency_levels
+        self.trace_memory = trace_memory
+
+        self.pages = sorted(os.path.basename(p) for p in glob.glob(os.path.join(CORPUS_DIR, '*.html')))
+        if not self.pages:
+            raise Exception(f"No corpus pages found in {CORPUS_DIR}")
+
+        self.page_server, self.page_url = _start_server(partial(_CorpusHandler, directory=CORPUS_DIR))
+        _SearchHandler.pages = self.pages
+        _SearchHandler.base_url = self.page_url
+        self.search_server, self.search_url = _start_server(_SearchHandler)
+        self.llm_server = mock_llm_server.serve(port=0, latency=llm_latency, errors=llm_errors)
+        self.llm_url = f"http://127.0.0.1:{self.llm_server.server_address[1]}/v1/chat/completions"
+
+        self._run_id = 0
+        self._app_url = None
+
+    def close(self):
+        """Stop the stand-in servers."""
+        for server in (self.page_server, self.search_server, self.llm_server):
+            server.shutdown()
+
+    def _unique_page_urls(self, count):
+        """Distinct page URLs (so nothing is coalesced or cached) cycling through the corpus."""
+        self._run_id += 1
+        return [
+            f"{self.page_url}/{self.pages[i % len(self.pages)]}?run={self._run_id}&n={i}"
+            for i in range(count)
+        ]
+
+    def _new_extractor(self, cached=False):
+        """Create an extractor wired to the mock LLM, optionally with private caches."""
+        return RecipeExtractor(
+            backend=LocalBackend(api_url=self.llm_url),
+            cache=ExtractionCache(':memory:') if cached else None,
+            page_cache=PageCache(':memory:') if cached else None
+        )
+
+    def _new_searcher(self):
+        """Create a searcher wired to the fake search API."""
+        searcher = RecipeSearcher(api_key='benchmark', search_engine_id='benchmark', cache=MemoryCache())
+        searcher.api_url = f"{self.search_url}/customsearch/v1"
+        return searcher
+
+    def measure(self, calls, concurrency):
+        """
+        Run calls on a thread pool and time each one.
+
+        Args:
+            calls (list): Zero-argument callables. Any dict they return is taken as stage timings.
+            concurrency (int): Number of worker threads
+
+        Returns:
+            dict: Latency summary, throughput, errors, stage timings and memory
+        """
+        latencies, stages, errors = [], {}, []
+        lock = threading.Lock()
+
+        def timed(call):
+            start = time.perf_counter()
+            try:
+                result = call()
+                elapsed = (time.perf_counter() - start) * 1000
+                stage_times = result if isinstance(result, dict) else {}
+                with lock:
+                    latencies.append(elapsed)
+                    for stage, ms in stage_times.items():
+                        stages.setdefault(stage, []).append(ms)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e)[:200])
+
+        if self.trace_memory:
+            tracemalloc.start()
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, calls))
+        wall = time.perf_counter() - wall_start
+        heap_peak = None
+        if self.trace_memory:
+            heap_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+
+        return {
+            'concurrency': concurrency,
+            'requests': len(calls),
+            'errors': len(errors),
+            'error_samples': errors[:3],
+            'wall_seconds': round(wall, 3),
+            'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+            'latency_ms': summarize(latencies),
+            'stages_ms': {stage: summarize(values) for stage, values in sorted(stages.items())},
+            'max_rss_mb': max_rss_mb(),
+            'heap_peak_mb': heap_peak,
+        }
+
+    @staticmethod
+    def _extract_with_stages(extractor, url):
+        """Extract a URL and return per-stage timings from its progress events."""
+        stage_times = {}
+        last = [time.perf_counter()]
+
+        def on_event(event, data):
+            now = time.perf_counter()
+            stage = STAGE_NAMES.get(event)
+            # Other events (coalesced, partial) fall inside a stage and don't end it
+            if stage:
+                stage_times[stage] = stage_times.get(stage, 0) + (now - last[0]) * 1000
+                last[0] = now
+
+        recipe = extractor.extract_recipe(url, on_event=on_event)
+        if not recipe.get('ingredients'):
+            raise Exception(f"No ingredients extracted from {url}")
+        return stage_times
+
+    def scenario_extract_cold(self, concurrency):
+        """RecipeExtractor with no caches: every request fetches, parses and (for plain pages) calls the LLM."""
+        extractor = self._new_extractor()
+        urls = self._unique_page_urls(self.requests_per_level)
+        return self.measure([partial(self._extract_with_stages, extractor, url) for url in urls], concurrency)
+
+    def scenario_extract_warm(self, concurrency):
+        """RecipeExtractor with extraction and page caches already holding every URL."""
+        extractor = self._new_extractor(cached=True)
+        urls = self._unique_page_urls(self.requests_per_level)
+        for url in urls:
+            extractor.extract_recipe(url)
+        return self.measure([partial(self._extract_with_stages, extractor, url) for url in urls], concurrency)
+
+    def scenario_search(self, concurrency):
+        """RecipeSearcher against the fake search API; half the queries repeat and hit the cache."""
+        searcher = self._new_searcher()
+        queries = [f"{SEARCH_QUERIES[i % len(SEARCH_QUERIES)]} {i // 2}" for i in range(self.requests_per_level)]
+        return self.measure([partial(searcher.search_recipes, query, 5) for query in queries], concurrency)
+
+    def _start_app(self):
+        """Start the Flask app on a local port, wired to the stand-ins. Returns its base URL."""
+        if self._app_url:
+            return self._app_url
+
+        # app.py builds its extractor and searcher from the environment at import time
+        os.environ.update({
+            'LLM_BACKEND': 'local',
+            'LLM_API_URL': self.llm_url,
+            'GOOGLE_API_KEY': os.getenv('GOOGLE_API_KEY') or 'benchmark',
+            'GOOGLE_CSE_ID': os.getenv('GOOGLE_CSE_ID') or 'benchmark',
+            'RECIPE_CACHE_ENABLED': 'false',
+            'PREFETCH_ENABLED': 'false',
+        })
+        os.environ.pop('SEARCH_CACHE_PATH', None)
+        import app as app_module
+        from werkzeug.serving import make_server
+
+        # One access log line per request would swamp the report
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+        app_module.searcher.api_url = f"{self.search_url}/customsearch/v1"
+        server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._app_server = server
+        self._app_url = f"http://127.0.0.1:{server.server_port}"
+        return self._app_url
+
+    @staticmethod
+    def _post(url, body):
+        """POST JSON to the app and fail on unsuccessful responses."""
+        response = requests.post(url, json=body, timeout=120)
+        data = response.json()
+        if response.status_code != 200 or not data.get('success'):
+            raise Exception(f"HTTP {response.status_code}: {data.get('error')}")
+
+    def scenario_api_extract(self, concurrency):
+        """POST /api/extract through the Flask app over HTTP."""
+        base = self._start_app()
+        urls = self._unique_page_urls(self.requests_per_level)
+        return self.measure(
+            [partial(self._post, f"{base}/api/extract", {'url': url}) for url in urls], concurrency
+        )
+
+    def scenario_api_search(self, concurrency):
+        """POST /api/search through the Flask app over HTTP."""
+        base = self._start_app()
+        self._run_id += 1
+        queries = [f"{SEARCH_QUERIES[i % len(SEARCH_QUERIES)]} {self._run_id} {i // 2}" for i in range(self.requests_per_level)]
+        return self.measure(
+            [partial(self._post, f"{base}/api/search", {'query': q, 'num_results': 5}) for q in queries],
+            concurrency
+        )
+
+    def run(self, scenarios):
+        """
+        Run scenarios at every concurrency level.
+
+        Args:
+            scenarios (list): Scenario names (see SCENARIOS)
+
+        Returns:
+            dict: {scenario: [result per concurrency level]}
+        """
+        results = {}
+        for name in scenarios:
+            method = getattr(self, f"scenario_{name}")
+            results[name] = []
+            for concurrency in self.concurrency_levels:
+                print(f"⏱️  {name} @ concurrency {concurrency}...", file=sys.stderr)
+                results[name].append(method(concurrency))
+        return results
+
+
+def print_report(report):
+    """Print a results table."""
+    print(f"\nBenchmark {report['timestamp']} (commit {report['commit'] or 'unknown'})")
+    print(f"{'scenario':<14} {'conc':>4} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>6} {'rss MB':>7}")
+    for name, runs in report['results'].items():
+        for run in runs:
+            latency = run['latency_ms']
+            print(
+                f"{name:<14} {run['concurrency']:>4} {run['throughput_rps'] or 0:>8.1f} "
+                f"{latency['p50'] or 0:>9.1f} {latency['p95'] or 0:>9.1f} {latency['p99'] or 0:>9.1f} "
+                f"{run['errors']:>6} {run['max_rss_mb'] or 0:>7.1f}"
+            )
+            for stage, summary in run['stages_ms'].items():
+                print(f"{'':<14} {'':>4}   {stage:<18} p50 {summary['p50'] or 0:>8.1f}  p95 {summary['p95'] or 0:>8.1f}")
+
+
+def compare(report, baseline, threshold=0.10):
+    """
+    Compare a run against a saved baseline and print the differences.
+
+    Args:
+        report (dict): Current results
+        baseline (dict): Baseline results loaded from JSON
+        threshold (float): Relative slowdown (p95 or throughput) counted as a regression
+
+    Returns:
+        list: Descriptions of regressions
+    """
+    regressions = []
+    print(f"\nComparison with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')})")
+    print(f"{'scenario':<14} {'conc':>4} {'p95 base':>9} {'p95 now':>9} {'Δ%':>7} {'rps base':>9} {'rps now':>9} {'Δ%':>7}")
+
+    for name, runs in report['results'].items():
+        base_runs = {run['concurrency']: run for run in baseline.get('results', {}).get(name, [])}
+        for run in runs:
+            base = base_runs.get(run['concurrency'])
+            if base is None:
+                continue
+            p95_now, p95_base = run['latency_ms']['p95'], base['latency_ms']['p95']
+            rps_now, rps_base = run['throughput_rps'], base['throughput_rps']
+            p95_delta = (p95_now - p95_base) / p95_base if p95_now and p95_base else 0
+            rps_delta = (rps_now - rps_base) / rps_base if rps_now and rps_base else 0
+            print(
+                f"{name:<14} {run['concurrency']:>4} {p95_base or 0:>9.1f} {p95_now or 0:>9.1f} {p95_delta * 100:>+6.1f}% "
+                f"{rps_base or 0:>9.1f} {rps_now or 0:>9.1f} {rps_delta * 100:>+6.1f}%"
+            )
+            if p95_delta > threshold:
+                regressions.append(f"{name} @ {run['concurrency']}: p95 {p95_base} -> {p95_now} ms")
+            if rps_delta < -threshold:
+                regressions.append(f"{name} @ {run['concurrency']}: throughput {rps_base} -> {rps_now} rps")
+
+    return regressions
+
+
+def main():
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description="RecipeSnap end-to-end benchmarks")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated scenarios (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--concurrency', default='1,4,16', help="Comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=40, help="Requests per concurrency level")
+    parser.add_argument('--llm-latency', default='fixed:200', help="Mock LLM latency distribution")
+    parser.add_argument('--llm-errors', default='', help="Mock LLM error distribution")
+    parser.add_argument('--trace-memory', action='store_true', help="Record Python heap peaks (slower)")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument('--compare', help="Baseline results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold (default 0.10)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit 1 if --compare finds a regression")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    # Keep the extractor's log output out of the report
+    setup_logging(stream=open(os.path.join(tempfile.gettempdir(), 'recipesnap-benchmark.log'), 'w'))
+
+    benchmark = Benchmark(
+        requests_per_level=args.requests,
+        concurrency_levels=tuple(int(c) for c in args.concurrency.split(',')),
+        llm_latency=args.llm_latency,
+        llm_errors=args.llm_errors,
+        trace_memory=args.trace_memory
+    )
+    try:
+        results = benchmark.run(scenarios)
+    finally:
+        benchmark.close()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'requests_per_level': args.requests,
+            'concurrency': list(benchmark.concurrency_levels),
+            'llm_latency': args.llm_latency,
+            'llm_errors': args.llm_errors,
+            'corpus': benchmark.pages,
+        },
+        'results': results,
+    }
+    print_report(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("\n⚠️  Regressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
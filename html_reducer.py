@@ -0,0 +1,295 @@
+"""
+RecipeSnap - HTML Reducer
+Turns raw recipe page HTML into a compact text payload for the extraction prompt.
+Strips scripts, styles, navigation and comments, then keeps the region of the
+page around the ingredients and instructions within a token budget.
+"""
+
+import re
+from bisect import bisect_right
+from collections import deque
+from html.parser import HTMLParser
+
+# Elements whose contents are never part of a recipe
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas',
+    'iframe', 'nav', 'footer', 'aside', 'select', 'button'
+}
+
+# Elements that start a new line of text
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'header', 'li', 'ul', 'ol',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'tr', 'td', 'th', 'table',
+    'dd', 'dt', 'dl', 'figcaption', 'blockquote', 'pre', 'hr'
+}
+
+# Rough characters-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+
+INGREDIENTS_HEADING_RE = re.compile(r'^#*\s*ingredients?\b', re.IGNORECASE)
+INSTRUCTIONS_HEADING_RE = re.compile(
+    r'^#*\s*(instructions|directions|method|steps|preparation|how to make)\b', re.IGNORECASE
+)
+QUANTITY_LINE_RE = re.compile(
+    r'^[-•*]?\s*(\d|[¼½¾⅓⅔⅛]|a\s+(pinch|handful|dash)\b)'
+    r'|\b(cups?|tbsp|tablespoons?|tsp|teaspoons?|grams?|g|kg|ml|oz|ounces?|pounds?|lbs?|cloves?|pinch)\b',
+    re.IGNORECASE
+)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Lines after an ingredients heading checked for quantities, and for an instructions heading
+QUANTITY_WINDOW = 30
+INSTRUCTIONS_WINDOW = 199
+
+# Lines of context kept above the ingredients heading (recipe title, servings, times)
+CONTEXT_LINES = 8
+
+
+class HTMLReducer(HTMLParser):
+    """
+    Streaming HTML-to-text reducer.
+
+    Feed HTML in chunks with feed(); the visible text is accumulated line by line
+    so the page never has to be held as a parsed tree. JSON-LD script blocks are
+    kept too, so the page doesn't need a second parser to look for structured data.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.lines = []
+        self.json_ld = []
+        self.region = RecipeRegionScanner(self.lines)
+
+        self._current = []
+        self._skip_depth = 0
+        self._content_depth = 0
+        self._in_title = False
+        self._in_list_item = False
+        self._json_ld_buffer = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'script' and (dict(attrs).get('type') or '').strip().lower() == 'application/ld+json':
+            self._json_ld_buffer = []
+        if tag in ('article', 'main'):
+            self._content_depth += 1
+
+        # Site headers are chrome, but a <header> inside the article usually holds the recipe title
+        if tag in SKIP_TAGS or (tag == 'header' and self._content_depth == 0):
+            self._skip_depth += 1
+            return
+
+        if tag == 'title':
+            self._in_title = True
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag == 'li':
+            self._in_list_item = True
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._json_ld_buffer is not None:
+            self.json_ld.append(''.join(self._json_ld_buffer))
+            self._json_ld_buffer = None
+        if tag in SKIP_TAGS or (tag == 'header' and self._content_depth == 0):
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if tag in ('article', 'main'):
+            self._content_depth = max(self._content_depth - 1, 0)
+
+        if tag == 'title':
+            self._in_title = False
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._json_ld_buffer is not None:
+            self._json_ld_buffer.append(data)
+            return
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        self._current.append(data)
+
+    def handle_comment(self, data):
+        # Comments never contain recipe content
+        pass
+
+    def _flush(self):
+        """Finish the current line of text."""
+        text = WHITESPACE_RE.sub(' ', ''.join(self._current)).strip()
+        self._current = []
+        if not text:
+            return
+        if self._in_list_item:
+            text = f"- {text}"
+            self._in_list_item = False
+        # Collapse consecutive duplicates (e.g. repeated "Jump to Recipe" links)
+        if not self.lines or self.lines[-1] != text:
+            self.lines.append(text)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class RecipeRegionScanner:
+    """
+    Locates the ingredients heading of the recipe itself in a growing list of lines.
+
+    Each line is examined once, when it is first seen, so checking again after
+    every chunk of a download only costs the lines added since the last check.
+    Prefers the heading followed by the most quantity lines, plus a bonus for an
+    instructions heading soon after it; later headings win ties because blog
+    posts usually put the recipe card after the story.
+    """
+
+    def __init__(self, lines):
+        """
+        Args:
+            lines (list): Text lines, only ever appended to (e.g. HTMLReducer.lines)
+        """
+        self.lines = lines
+        self._scanned = 0
+        # Running counts of quantity lines and of characters (with newlines) before each line
+        self._quantities = [0]
+        self._chars = [0]
+        self._instructions = []
+        # Ingredients headings whose windows may still grow, and the best one whose windows are complete
+        self._pending = deque()
+        self._best = (None, 0)
+
+    def _update(self):
+        """Scan the lines added since the last call."""
+        for line in self.lines[self._scanned:]:
+            index = self._scanned
+            self._scanned += 1
+            heading = line.lstrip('- ')
+            is_quantity = bool(len(line) < 160 and QUANTITY_LINE_RE.search(line))
+            self._quantities.append(self._quantities[-1] + is_quantity)
+            self._chars.append(self._chars[-1] + len(line) + 1)
+            if INGREDIENTS_HEADING_RE.match(heading):
+                self._pending.append(index)
+            if INSTRUCTIONS_HEADING_RE.match(heading):
+                self._instructions.append(index)
+
+        while self._pending and self._pending[0] + INSTRUCTIONS_WINDOW < self._scanned:
+            self._best = self._better(self._best, self._pending.popleft())
+
+    def _better(self, best, index):
+        """Return (index, score) if the heading at index beats or ties the best so far."""
+        score = (
+            self._quantities[min(index + 1 + QUANTITY_WINDOW, self._scanned)] - self._quantities[index + 1]
+            + 5 * self._instructions_between(index, index + INSTRUCTIONS_WINDOW)
+        )
+        if score >= best[1] and score > 0:
+            return index, score
+        return best
+
+    def _instructions_between(self, first, last):
+        """True if an instructions heading comes after line first and no later than line last."""
+        position = bisect_right(self._instructions, first)
+        return position < len(self._instructions) and self._instructions[position] <= last
+
+    def ingredients_heading(self):
+        """
+        Returns:
+            int: Index of the recipe's ingredients heading, or None if the lines have none
+        """
+        self._update()
+        best = self._best
+        for index in self._pending:
+            best = self._better(best, index)
+        return best[0]
+
+    def recipe_start(self):
+        """
+        Returns:
+            int: Index of the first line of the recipe region
+        """
+        heading = self.ingredients_heading()
+        if heading is None:
+            return 0
+        return max(heading - CONTEXT_LINES, 0)
+
+    def has_instructions_after(self, index):
+        """True if an instructions heading follows line index."""
+        self._update()
+        return self._instructions_between(index, self._scanned)
+
+    def chars_from(self, index):
+        """Characters (counting newlines) from line index to the end."""
+        self._update()
+        return self._chars[self._scanned] - self._chars[index]
+
+
+def recipe_region_complete(reducer, token_budget=6000):
+    """
+    Check whether a partially fed reducer already holds everything the prompt will use:
+    an ingredients heading followed by an instructions heading, and enough text after
+    it to fill the token budget.
+
+    Only the lines added since the previous call are scanned, so this can be called
+    after every chunk of a download.
+
+    Args:
+        reducer (HTMLReducer): Reducer fed with the start of a page
+        token_budget (int): Approximate token budget of the prompt payload
+
+    Returns:
+        bool: True if reading more of the page can't add to the payload
+    """
+    region = reducer.region
+    heading = region.ingredients_heading()
+    if heading is None or not region.has_instructions_after(heading):
+        return False
+    return region.chars_from(max(heading - CONTEXT_LINES, 0)) > token_budget * CHARS_PER_TOKEN
+
+
+def reduce_html(webpage_content, token_budget=6000):
+    """
+    Reduce raw HTML to the recipe-relevant text within a token budget.
+
+    Args:
+        webpage_content (str): Raw page HTML
+        token_budget (int): Approximate maximum number of tokens to return
+
+    Returns:
+        str: Compact page text, prefixed with the page title
+    """
+    reducer = HTMLReducer()
+    reducer.feed(webpage_content)
+    reducer.close()
+    return build_payload(reducer, token_budget)
+
+
+def build_payload(reducer, token_budget=6000):
+    """
+    Build the prompt payload from a reducer that has already been fed a page.
+
+    Args:
+        reducer (HTMLReducer): Reducer holding the page's text lines
+        token_budget (int): Approximate maximum number of tokens to return
+
+    Returns:
+        str: Compact page text, prefixed with the page title
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    lines = reducer.lines
+    title = WHITESPACE_RE.sub(' ', reducer.title).strip()
+
+    output = [f"Page title: {title}"] if title else []
+    used = sum(len(l) + 1 for l in output)
+
+    for line in lines[reducer.region.recipe_start():]:
+        if used + len(line) + 1 > char_budget:
+            break
+        output.append(line)
+        used += len(line) + 1
+
+    return "\n".join(output)
@@ -0,0 +1,295 @@
+"""
+RecipeSnap - HTTP Client
+Shared, thread-safe connection pool for page fetches and API calls.
+Reusing one session keeps TCP/TLS connections alive between requests and
+retries rate-limited or failed upstream calls with exponential backoff.
+AsyncHTTPClient provides the same for the asyncio extractor and searcher.
+"""
+
+import os
+import asyncio
+import threading
+from collections import namedtuple
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+# aiohttp is only needed by the async extractor/searcher
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+load_dotenv()
+
+# Browser-like User-Agent for recipe page fetches
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Bytes read per chunk when streaming a response body
+CHUNK_SIZE = 64 * 1024
+
+# Upstream status codes worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Methods safe to send twice. A POST to an LLM API that timed out may still have been
+# processed (and billed), so only failures to connect are retried for other methods.
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD'})
+
+# Connection pool sizes for hosts we call on every request
+DEFAULT_HOST_POOL_SIZES = {
+    'api.writer.com': 20,
+    'www.googleapis.com': 10,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# Response returned by AsyncHTTPClient.request
+AsyncResponse = namedtuple('AsyncResponse', ['status_code', 'text', 'headers'])
+
+
+def _host_sizes(env_var, defaults):
+    """
+    Read per-host sizes from an env var like "api.writer.com=32,www.googleapis.com=8".
+    """
+    sizes = dict(defaults)
+    for entry in os.getenv(env_var, '').split(','):
+        host, _, size = entry.partition('=')
+        if host.strip() and size.strip().isdigit():
+            sizes[host.strip()] = int(size)
+    return sizes
+
+
+def _host_pool_sizes():
+    """Per-host pool sizes, overridable with HTTP_HOST_POOL_SIZES."""
+    return _host_sizes('HTTP_HOST_POOL_SIZES', DEFAULT_HOST_POOL_SIZES)
+
+
+def create_session(pool_size=None, retries=None, backoff=None):
+    """
+    Create a pooled HTTP session with keep-alive and retries.
+
+    Args:
+        pool_size (int): Connections kept per host for hosts without an explicit size.
+            If not provided, reads from HTTP_POOL_SIZE env var (default 10).
+        retries (int): Retries on connection errors, and for GET and HEAD also on read
+            errors and 429/5xx responses. If not provided, reads from HTTP_RETRIES env var (default 3).
+        backoff (float): Exponential backoff factor in seconds.
+            If not provided, reads from HTTP_BACKOFF env var (default 0.5).
+
+    Returns:
+        requests.Session: Configured session
+    """
+    pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', 10))
+    retries = retries if retries is not None else int(os.getenv('HTTP_RETRIES', 3))
+    backoff = backoff if backoff is not None else float(os.getenv('HTTP_BACKOFF', 0.5))
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    # Requests are independent; never carry cookies from one site visit to the next
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    default_adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', default_adapter)
+    session.mount('https://', default_adapter)
+
+    for host, size in _host_pool_sizes().items():
+        session.mount(
+            f'https://{host}/',
+            HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry)
+        )
+
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide pooled session, creating it on first use.
+
+    Returns:
+        requests.Session: Shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+class AsyncHTTPClient:
+    """
+    asyncio HTTP client with a shared connection pool, a concurrency
+    semaphore per upstream host and retries with exponential backoff.
+    """
+
+    def __init__(self, max_connections=None, host_concurrency=None, retries=None, backoff=None,
+                 max_retry_after=None):
+        """
+        Initialize the client. The aiohttp session is created lazily inside the running event loop.
+
+        Args:
+            max_connections (int): Total open connections. If not provided, reads from
+                ASYNC_MAX_CONNECTIONS env var (default 200).
+            host_concurrency (int): In-flight requests per host without an explicit limit.
+                If not provided, reads from ASYNC_HOST_CONCURRENCY env var (default 10).
+                Per-host overrides come from ASYNC_HOST_LIMITS (e.g. "api.writer.com=64").
+            retries (int): Retries on connection errors, and for GET and HEAD also on timeouts
+                and 429/5xx responses. If not provided, reads from HTTP_RETRIES env var (default 3).
+            backoff (float): Exponential backoff factor in seconds.
+                If not provided, reads from HTTP_BACKOFF env var (default 0.5).
+            max_retry_after (float): Longest wait between attempts in seconds, however long a
+                Retry-After header asks for. If not provided, reads from HTTP_MAX_RETRY_AFTER
+                env var (default 30).
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for async extraction. Install it with: pip install aiohttp")
+
+        self.max_connections = max_connections or int(os.getenv('ASYNC_MAX_CONNECTIONS', 200))
+        self.host_concurrency = host_concurrency or int(os.getenv('ASYNC_HOST_CONCURRENCY', 10))
+        self.host_limits = _host_sizes('ASYNC_HOST_LIMITS', {'api.writer.com': 64, 'www.googleapis.com': 20})
+        self.retries = retries if retries is not None else int(os.getenv('HTTP_RETRIES', 3))
+        self.backoff = backoff if backoff is not None else float(os.getenv('HTTP_BACKOFF', 0.5))
+        self.max_retry_after = (
+            max_retry_after if max_retry_after is not None else float(os.getenv('HTTP_MAX_RETRY_AFTER', 30))
+        )
+
+        self._session = None
+        self._semaphores = {}
+
+    def _get_session(self):
+        """Return the aiohttp session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                headers={'User-Agent': USER_AGENT},
+                # Requests are independent; never carry cookies between them
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
+        return self._session
+
+    def _semaphore(self, host):
+        """Return the concurrency semaphore for an upstream host."""
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.host_limits.get(host, self.host_concurrency))
+        return self._semaphores[host]
+
+    def _delay(self, attempt, retry_after=None):
+        """Seconds to wait before the next attempt, at most max_retry_after."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_retry_after)
+        return min(self.backoff * (2 ** attempt), self.max_retry_after)
+
+    def _retryable(self, method, attempt, error=None, status=None):
+        """
+        Decide whether a failed attempt is retried.
+
+        Args:
+            method (str): HTTP method
+            attempt (int): Attempt number, from 0
+            error (Exception): Exception the attempt raised, if any
+            status (int): Response status, if one arrived
+
+        Returns:
+            bool: True to try again
+        """
+        if attempt >= self.retries:
+            return False
+        if method.upper() in IDEMPOTENT_METHODS:
+            return error is not None or status in RETRY_STATUSES
+        # The request may have reached the server; only retry if it never connected
+        return isinstance(error, aiohttp.ClientConnectorError)
+
+    async def request(self, method, url, timeout=30, **kwargs):
+        """
+        Make an HTTP request, retrying connection errors, and for GET and HEAD also
+        timeouts and 429/5xx responses.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            timeout (float): Total timeout per attempt in seconds
+            **kwargs: Passed to aiohttp (headers, json, params, ...)
+
+        Returns:
+            AsyncResponse: status_code, decoded text and headers of the final attempt
+        """
+        session = self._get_session()
+        host = url.split('/')[2] if len(url.split('/')) > 2 else ''
+
+        for attempt in range(self.retries + 1):
+            # Hold the host's slot while a request is in flight, never while backing off
+            async with self._semaphore(host):
+                try:
+                    async with session.request(
+                        method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+                    ) as response:
+                        text = await response.text(errors='replace')
+                        if not self._retryable(method, attempt, status=response.status):
+                            return AsyncResponse(response.status, text, dict(response.headers))
+                        delay = self._delay(attempt, response.headers.get('Retry-After'))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if not self._retryable(method, attempt, error=e):
+                        raise
+                    delay = self._delay(attempt)
+            await asyncio.sleep(delay)
+
+    async def request_stream(self, method, url, make_reader, timeout=30, **kwargs):
+        """
+        Make an HTTP request and read the body incrementally, retrying like request().
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            make_reader (callable): Called as make_reader(status_code, headers) once the
+                headers arrive. Returns an object with feed(chunk) -> bool (True to stop
+                reading) and close() -> str, or None to skip the body. May raise to reject
+                the response.
+            timeout (float): Total timeout per attempt in seconds
+            **kwargs: Passed to aiohttp (headers, params, ...)
+
+        Returns:
+            AsyncResponse: status_code, the reader's text ('' if the body was skipped) and headers
+        """
+        session = self._get_session()
+        host = url.split('/')[2] if len(url.split('/')) > 2 else ''
+
+        for attempt in range(self.retries + 1):
+            # Hold the host's slot while a request is in flight, never while backing off
+            async with self._semaphore(host):
+                try:
+                    async with session.request(
+                        method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+                    ) as response:
+                        if not self._retryable(method, attempt, status=response.status):
+                            headers = dict(response.headers)
+                            reader = make_reader(response.status, response.headers)
+                            if reader is None:
+                                return AsyncResponse(response.status, '', headers)
+                            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                                if reader.feed(chunk):
+                                    break
+                            return AsyncResponse(response.status, reader.close(), headers)
+                        delay = self._delay(attempt, response.headers.get('Retry-After'))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if not self._retryable(method, attempt, error=e):
+                        raise
+                    delay = self._delay(attempt)
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        """Close the underlying connection pool."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,759 @@
+"""
+RecipeSnap - Ingredient Parser
+Parses free-text ingredient lines ("1 1/2 cups flour, sifted") into quantity,
+unit, item and notes without an AI call, and reduces them to normalized
+ingredient names. Parsed lines are held in columns (NumPy arrays of
+quantities and unit codes), so scaling and metric/imperial conversion of any
+number of recipes is a handful of array operations.
+"""
+
+import re
+import logging
+from functools import lru_cache
+import numpy as np
+from recipe_searcher import singularize
+
+logger = logging.getLogger(__name__)
+
+# --- Ingredient names -------------------------------------------------------
+
+WORD_RE = re.compile(r"[a-z]+|\d+")
+PAREN_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+# Text after these is a note or an alternative, not part of the ingredient name
+NOTE_RE = re.compile(r",|;|\bto taste\b|\bfor (?:serving|garnish|topping|dusting|frying)\b|\bor\b|\bif\b")
+AND_RE = re.compile(r"\band\b|&|\+")
+
+# Measures that can follow a quantity ("2 cups", "1 (28 ounce) can"), singularized
+MEASURE_WORDS = {
+    'cup', 'c', 'tablespoon', 'tbsp', 'tbs', 'tbl', 'tb', 't', 'teaspoon', 'tsp', 'ounce', 'oz', 'fl', 'fluid',
+    'pound', 'lb', 'gram', 'g', 'kilogram', 'kg', 'milligram', 'mg', 'milliliter', 'millilitre', 'ml',
+    'liter', 'litre', 'l', 'quart', 'qt', 'pint', 'pt', 'gallon', 'gal', 'pinch', 'dash', 'can', 'jar',
+    'package', 'pkg', 'packet', 'stick', 'clove', 'slice', 'piece', 'bunch', 'head', 'sprig', 'handful',
+    'container', 'bag', 'box', 'bottle', 'envelope', 'sheet', 'stalk', 'inch', 'small', 'medium', 'large'
+}
+
+# Preparation and size words that don't change what the ingredient is
+DESCRIPTORS = {
+    'chopped', 'minced', 'diced', 'sliced', 'crushed', 'grated', 'shredded', 'cubed', 'halved', 'quartered',
+    'peeled', 'seeded', 'cored', 'trimmed', 'rinsed', 'drained', 'beaten', 'melted', 'softened', 'sifted',
+    'packed', 'divided', 'optional', 'fresh', 'freshly', 'finely', 'coarsely', 'roughly', 'thinly', 'lightly',
+    'large', 'small', 'medium', 'extra', 'virgin', 'lean', 'whole', 'boneless', 'skinless',
+    'dried', 'frozen', 'thawed', 'cooked', 'uncooked', 'raw', 'unsalted', 'salted', 'room', 'temperature',
+    'cold', 'warm', 'hot', 'about', 'plus', 'more', 'additional', 'taste', 'needed', 'of', 'a', 'an', 'the',
+    'into', 'inch', 'piece', 'cut', 'at', 'your', 'favorite', 'good', 'quality', 'prepared', 'very', 'well'
+}
+
+# Plurals singularize() gets wrong
+IRREGULAR = {'leave': 'leaf', 'loave': 'loaf', 'halve': 'half'}
+
+
+def _singular(word):
+    word = singularize(word)
+    return IRREGULAR.get(word, word)
+
+
+# Plurals the rules in _plural get wrong
+PLURALS = {'leaf': 'leaves', 'loaf': 'loaves', 'half': 'halves', 'tomato': 'tomatoes', 'potato': 'potatoes'}
+
+
+def _plural(word):
+    """Pluralize a singular noun ("egg" -> "eggs", "berry" -> "berries"), the inverse of _singular."""
+    lower = word.lower()
+    if lower in PLURALS:
+        return word[:-len(lower)] + PLURALS[lower]
+    if re.search(r'[^aeiou]y$', lower):
+        return word[:-1] + 'ies'
+    if re.search(r'(?:s|x|z|ch|sh)$', lower):
+        return word + 'es'
+    return word + 's'
+
+
+# Singulars _singular gets wrong: it folds "-ie" into "-y" so both spellings match
+SINGULARS = {'cookies': 'cookie', 'brownies': 'brownie', 'smoothies': 'smoothie'}
+
+
+def _singular_noun(word):
+    """Singularize a plural noun for display ("eggs" -> "egg", "cookies" -> "cookie"), the inverse of _plural."""
+    lower = word.lower()
+    singular = SINGULARS.get(lower) or _singular(lower)
+    if singular == lower or _plural(singular) != lower:
+        return word
+    return word[:1] + singular[1:]
+
+
+# Uncountable nouns, never pluralized or singularized with their amount ("2 salt", not "2 salts")
+MASS_NOUNS = {
+    'water', 'milk', 'buttermilk', 'cream', 'broth', 'stock', 'juice', 'wine', 'beer', 'vinegar', 'oil', 'honey',
+    'syrup', 'molasses', 'butter', 'flour', 'sugar', 'salt', 'pepper', 'rice', 'garlic', 'cheese', 'yogurt',
+    'bread', 'meat', 'beef', 'pork', 'chicken', 'fish', 'spinach', 'lettuce', 'parsley', 'cilantro', 'basil',
+    'thyme', 'oregano', 'rosemary', 'cinnamon', 'asparagus', 'couscous', 'quinoa', 'pasta', 'hummus', 'ice'
+}
+
+
+def _count_noun(item, plural):
+    """
+    Make a counted item agree with its amount ("3 egg" -> "3 eggs", "1 bay leaves" -> "1 bay leaf").
+
+    Only the head noun changes: the last word before any "of" ("2 glasses of wine").
+    Mass nouns don't change.
+
+    Args:
+        item (str): Item as written, e.g. "large eggs"
+        plural (bool): True if the amount is over one
+
+    Returns:
+        str: The item with its head noun in the right number
+    """
+    counted, of, rest = item.partition(' of ')
+    head = counted.rsplit(' ', 1)[-1]
+    lower = head.lower()
+    if not head.isalpha() or lower in MASS_NOUNS or _singular(lower) in MASS_NOUNS:
+        return item
+    if plural:
+        # Already plural words stay as they are
+        word = _plural(head) if _singular_noun(lower) == lower else head
+    else:
+        word = _singular_noun(head)
+    return counted[:len(counted) - len(head)] + word + of + rest
+
+
+def ingredient_names(text):
+    """
+    Reduce an ingredient line to normalized ingredient names.
+
+    Quantities, units, parentheticals, preparation notes and alternatives are
+    dropped and words are singularized, e.g. "1 (28 ounce) can crushed
+    tomatoes" -> ["tomato"]. Lines naming several ingredients ("salt and
+    pepper to taste") give one name each.
+
+    Args:
+        text (str): Ingredient line from a recipe, or a pantry item
+
+    Returns:
+        list: Normalized names (empty if none could be found)
+    """
+    text = PAREN_RE.sub(' ', text.lower())
+    text = NOTE_RE.split(text, 1)[0]
+
+    names = []
+    for part in AND_RE.split(text):
+        words = WORD_RE.findall(part)
+        # Skip the leading quantity and its unit ("1 1/2 cups", "2 large", "a pinch")
+        start = 0
+        while start < len(words) and (
+                words[start].isdigit() or words[start] in ('a', 'an', 'one')
+                or _singular(words[start]) in MEASURE_WORDS):
+            start += 1
+        kept = [_singular(w) for w in words[start:] if not w.isdigit() and w not in DESCRIPTORS]
+        if not kept:
+            # "2 cloves" or "1 large" alone: the unit is all there is
+            kept = [_singular(w) for w in words if not w.isdigit()]
+        name = ' '.join(kept)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+# --- Parsing ----------------------------------------------------------------
+
+FRACTIONS = {
+    '½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅕': '1/5', '⅖': '2/5', '⅗': '3/5',
+    '⅘': '4/5', '⅙': '1/6', '⅚': '5/6', '⅛': '1/8', '⅜': '3/8', '⅝': '5/8', '⅞': '7/8'
+}
+FRACTION_RE = re.compile(r"(\d)?\s*([" + ''.join(FRACTIONS) + r"])")
+
+# Canonical units: (dimension, size in the dimension's base unit, singular, plural).
+# Volumes are in millilitres and masses in grams; counted units don't convert.
+UNITS = {
+    'tsp': ('volume', 4.92892, 'tsp', 'tsp'),
+    'tbsp': ('volume', 14.7868, 'tbsp', 'tbsp'),
+    'fl oz': ('volume', 29.5735, 'fl oz', 'fl oz'),
+    'cup': ('volume', 236.588, 'cup', 'cups'),
+    'pint': ('volume', 473.176, 'pint', 'pints'),
+    'quart': ('volume', 946.353, 'quart', 'quarts'),
+    'gallon': ('volume', 3785.41, 'gallon', 'gallons'),
+    'ml': ('volume', 1.0, 'ml', 'ml'),
+    'l': ('volume', 1000.0, 'l', 'l'),
+    'oz': ('mass', 28.3495, 'oz', 'oz'),
+    'lb': ('mass', 453.592, 'lb', 'lb'),
+    'g': ('mass', 1.0, 'g', 'g'),
+    'kg': ('mass', 1000.0, 'kg', 'kg'),
+    'pinch': ('count', 1.0, 'pinch', 'pinches'),
+    'dash': ('count', 1.0, 'dash', 'dashes'),
+    'can': ('count', 1.0, 'can', 'cans'),
+    'jar': ('count', 1.0, 'jar', 'jars'),
+    'package': ('count', 1.0, 'package', 'packages'),
+    'packet': ('count', 1.0, 'packet', 'packets'),
+    'envelope': ('count', 1.0, 'envelope', 'envelopes'),
+    'stick': ('count', 1.0, 'stick', 'sticks'),
+    'clove': ('count', 1.0, 'clove', 'cloves'),
+    'slice': ('count', 1.0, 'slice', 'slices'),
+    'piece': ('count', 1.0, 'piece', 'pieces'),
+    'bunch': ('count', 1.0, 'bunch', 'bunches'),
+    'head': ('count', 1.0, 'head', 'heads'),
+    'sprig': ('count', 1.0, 'sprig', 'sprigs'),
+    'stalk': ('count', 1.0, 'stalk', 'stalks'),
+    'handful': ('count', 1.0, 'handful', 'handfuls'),
+    'bottle': ('count', 1.0, 'bottle', 'bottles'),
+    'bag': ('count', 1.0, 'bag', 'bags'),
+    'box': ('count', 1.0, 'box', 'boxes'),
+    'container': ('count', 1.0, 'container', 'containers'),
+}
+
+# Spellings of each canonical unit, matched case-insensitively
+UNIT_ALIASES = {
+    'tsp': ('teaspoons', 'teaspoon', 'tsps', 'tsp'),
+    'tbsp': ('tablespoons', 'tablespoon', 'tbsps', 'tbsp', 'tbls', 'tbl', 'tbs'),
+    'fl oz': ('fluid ounces', 'fluid ounce', 'fl. oz', 'fl oz'),
+    'cup': ('cups', 'cup', 'c'),
+    'pint': ('pints', 'pint', 'pt'),
+    'quart': ('quarts', 'quart', 'qt'),
+    'gallon': ('gallons', 'gallon', 'gal'),
+    'ml': ('milliliters', 'milliliter', 'millilitres', 'millilitre', 'ml'),
+    'l': ('liters', 'liter', 'litres', 'litre', 'l'),
+    'oz': ('ounces', 'ounce', 'oz'),
+    'lb': ('pounds', 'pound', 'lbs', 'lb'),
+    'g': ('grams', 'gram', 'g'),
+    'kg': ('kilograms', 'kilogram', 'kg'),
+    'pinch': ('pinches', 'pinch'),
+    'dash': ('dashes', 'dash'),
+    'can': ('cans', 'can'),
+    'jar': ('jars', 'jar'),
+    'package': ('packages', 'package', 'pkgs', 'pkg'),
+    'packet': ('packets', 'packet'),
+    'envelope': ('envelopes', 'envelope'),
+    'stick': ('sticks', 'stick'),
+    'clove': ('cloves', 'clove'),
+    'slice': ('slices', 'slice'),
+    'piece': ('pieces', 'piece'),
+    'bunch': ('bunches', 'bunch'),
+    'head': ('heads', 'head'),
+    'sprig': ('sprigs', 'sprig'),
+    'stalk': ('stalks', 'stalk'),
+    'handful': ('handfuls', 'handful'),
+    'bottle': ('bottles', 'bottle'),
+    'bag': ('bags', 'bag'),
+    'box': ('boxes', 'box'),
+    'container': ('containers', 'container'),
+}
+ALIAS_TO_UNIT = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+# Spellings only told apart by case: "1 T butter" is a tablespoon, "1 t salt" a teaspoon
+CASED_UNIT_ALIASES = {'T': 'tbsp', 't': 'tsp'}
+
+NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?|\.\d+"
+
+
+def _unit_pattern(dimensions):
+    """Regex alternation of the spellings of units in the given dimensions, longest first."""
+    aliases = [alias for alias, unit in ALIAS_TO_UNIT.items() if UNITS[unit][0] in dimensions]
+    return '|'.join(re.escape(alias).replace(r'\ ', r'\s+') for alias in sorted(aliases, key=len, reverse=True))
+
+
+UNIT_PATTERN = _unit_pattern(('volume', 'mass', 'count')) + '|(?-i:' + '|'.join(CASED_UNIT_ALIASES) + ')'
+# A package size written before a counted unit without parentheses: "1 15-oz can", "2 8 ounce packages"
+INLINE_SIZE = rf"\d+(?:\.\d+)?\s*-?\s*(?:{_unit_pattern(('volume', 'mass'))})\.?(?=\s+(?:{_unit_pattern(('count',))})\b)"
+LINE_RE = re.compile(
+    rf"""^\s*(?P<quantity>{NUMBER})
+    (?:\s*(?:-|–|—|to|or)\s*(?P<quantity_max>{NUMBER}))?
+    \s*(?:(?P<size>\([^)]*\))|(?P<size_inline>{INLINE_SIZE}))?
+    \s*(?:(?P<unit>{UNIT_PATTERN})\.?(?=[\s,(]|$))?
+    \s*(?P<size_after>\([^)]*\))?
+    \s*(?:of\s+)?(?P<rest>.*)$""",
+    re.IGNORECASE | re.VERBOSE
+)
+# "a pinch of salt", "one can of beans": the article is the quantity
+ARTICLE_RE = re.compile(rf"^(?:an?|one)\s+(?=(?:{UNIT_PATTERN})\b)", re.IGNORECASE)
+TRAILING_NOTE_RE = re.compile(r"\s*(?:,|\bto taste\b|\bfor (?:serving|garnish|topping|dusting|frying)\b)", re.I)
+
+
+def _to_number(text):
+    """Convert "1 1/2", "3/4" or "0.5" to a float."""
+    total = 0.0
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/')
+            total += int(numerator) / int(denominator) if int(denominator) else 0.0
+        else:
+            total += float(part)
+    return total
+
+
+@lru_cache(maxsize=65536)
+def _parse(text):
+    """Parse one line (see parse_ingredient); cached because recipes repeat the same lines."""
+    line = FRACTION_RE.sub(lambda m: (m.group(1) + ' ' if m.group(1) else '') + FRACTIONS[m.group(2)], text)
+    line = ARTICLE_RE.sub('1 ', line.replace('⁄', '/').strip())
+
+    quantity = quantity_max = unit = size = None
+    rest = line
+    match = LINE_RE.match(line)
+    if match:
+        quantity = _to_number(match.group('quantity'))
+        if match.group('quantity_max'):
+            quantity_max = _to_number(match.group('quantity_max'))
+        if match.group('unit'):
+            unit = re.sub(r'\s+', ' ', match.group('unit'))
+            unit = CASED_UNIT_ALIASES.get(unit) or ALIAS_TO_UNIT[unit.lower()]
+        size = match.group('size') or match.group('size_after')
+        if size:
+            size = size[1:-1].strip()
+        elif match.group('size_inline'):
+            size = re.sub(r'\s*-\s*|\s+', ' ', match.group('size_inline'))
+        rest = match.group('rest')
+
+    note_match = TRAILING_NOTE_RE.search(rest)
+    if note_match:
+        item, notes = rest[:note_match.start()], rest[note_match.start():].lstrip(' ,')
+    else:
+        item, notes = rest, ''
+    names = tuple(ingredient_names(text))
+    return (text, quantity, quantity_max, unit, size or None, item.strip(), notes.strip() or None,
+            names[0] if names else None, names)
+
+
+def parse_ingredient(text):
+    """
+    Parse a free-text ingredient line.
+
+    Args:
+        text (str): Ingredient line, e.g. "1 1/2 cups all-purpose flour, sifted"
+
+    Returns:
+        dict: {
+            "original": str,
+            "quantity": float or None,
+            "quantity_max": float or None (upper end of a range like "2-3"),
+            "unit": str or None (canonical unit, e.g. "cup", "tbsp", "g", "can"),
+            "size": str or None (package size, e.g. "28 ounce"),
+            "item": str (e.g. "all-purpose flour"),
+            "notes": str or None (e.g. "sifted"),
+            "name": str or None (normalized name, e.g. "all purpose flour"),
+            "names": [str, ...] (every ingredient named, e.g. ["salt", "pepper"] for
+                "salt and pepper to taste")
+        }
+    """
+    original, quantity, quantity_max, unit, size, item, notes, name, names = _parse(text)
+    return {
+        'original': original,
+        'quantity': quantity,
+        'quantity_max': quantity_max,
+        'unit': unit,
+        'size': size,
+        'item': item,
+        'notes': notes,
+        'name': name,
+        'names': list(names)
+    }
+
+
+# --- Columnar scaling and conversion ----------------------------------------
+
+# Unit codes index these arrays; -1 means no unit
+UNIT_NAMES = tuple(UNITS)
+UNIT_CODES = {unit: code for code, unit in enumerate(UNIT_NAMES)}
+DIMENSIONS = ('count', 'volume', 'mass')
+UNIT_DIMENSION = np.array([DIMENSIONS.index(UNITS[unit][0]) for unit in UNIT_NAMES], dtype=np.int8)
+UNIT_BASE = np.array([UNITS[unit][1] for unit in UNIT_NAMES])
+METRIC_UNITS = np.array([unit in ('ml', 'l', 'g', 'kg') for unit in UNIT_NAMES])
+LARGE_METRIC_UNITS = np.array([unit in ('l', 'kg') for unit in UNIT_NAMES])
+
+SYSTEMS = (None, 'metric', 'imperial')
+
+# Target units for each system and dimension: the largest unit whose threshold
+# (in the base unit) the amount reaches is used
+CONVERSIONS = {
+    ('metric', 'volume'): (('ml', 0.0), ('l', 1000.0)),
+    ('metric', 'mass'): (('g', 0.0), ('kg', 1000.0)),
+    ('imperial', 'volume'): (('tsp', 0.0), ('tbsp', 14.7868), ('cup', 59.147), ('pint', 473.176),
+                             ('quart', 946.353), ('gallon', 3785.41)),
+    ('imperial', 'mass'): (('oz', 0.0), ('lb', 453.592)),
+}
+
+# Units only liquids are shown in: "1 quart chicken broth", but "4 cups flour"
+LIQUID_UNITS = {'pint', 'quart', 'gallon'}
+# Last words of ingredient names that are liquids
+LIQUIDS = {
+    'water', 'milk', 'buttermilk', 'broth', 'stock', 'juice', 'wine', 'beer', 'cider', 'soda', 'tea', 'coffee',
+    'cream'
+}
+
+# Names the shopping list adds together: the same thing bought under a plainer name
+SHOPPING_ALIASES = {
+    'all purpose flour': 'flour', 'plain flour': 'flour', 'ap flour': 'flour',
+    'granulated sugar': 'sugar', 'white sugar': 'sugar',
+    'kosher salt': 'salt', 'sea salt': 'salt', 'table salt': 'salt', 'fine salt': 'salt',
+    'black pepper': 'pepper', 'ground black pepper': 'pepper', 'ground pepper': 'pepper',
+    'yellow onion': 'onion',
+}
+
+# Fractions imperial and counted amounts are rounded to
+FRACTION_STEPS = np.array([0, 1 / 8, 1 / 4, 1 / 3, 3 / 8, 1 / 2, 5 / 8, 2 / 3, 3 / 4, 7 / 8, 1])
+FRACTION_TEXT = {0.125: '1/8', 0.25: '1/4', 0.333: '1/3', 0.375: '3/8', 0.5: '1/2', 0.625: '5/8',
+                 0.667: '2/3', 0.75: '3/4', 0.875: '7/8'}
+
+
+class IngredientTable:
+    """
+    Parsed ingredient lines of one or more recipes, stored column by column.
+
+    quantity and quantity_max are float arrays (NaN where absent), unit an
+    int array of unit codes (-1 for none), and offsets marks where each
+    recipe's rows start, like a CSR row pointer.
+    """
+
+    def __init__(self, parsed, offsets):
+        """
+        Build a table from parsed lines. Use from_recipes() to parse and build at once.
+
+        Args:
+            parsed (list): Tuples from _parse, all recipes' lines in order
+            offsets (array): Start row of each recipe, plus the total row count at the end
+        """
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.original = [row[0] for row in parsed]
+        self.size = [row[4] for row in parsed]
+        self.item = [row[5] for row in parsed]
+        self.notes = [row[6] for row in parsed]
+        self.name = [row[7] for row in parsed]
+        self.names = [row[8] for row in parsed]
+        self.quantity = np.array([np.nan if row[1] is None else row[1] for row in parsed], dtype=np.float64)
+        self.quantity_max = np.array([np.nan if row[2] is None else row[2] for row in parsed], dtype=np.float64)
+        self.unit = np.array([-1 if row[3] is None else UNIT_CODES[row[3]] for row in parsed], dtype=np.int16)
+
+    @classmethod
+    def from_recipes(cls, ingredient_lists):
+        """
+        Parse the ingredient lists of several recipes.
+
+        Args:
+            ingredient_lists (list): One list of ingredient lines per recipe
+
+        Returns:
+            IngredientTable
+        """
+        parsed = []
+        offsets = [0]
+        for lines in ingredient_lists:
+            parsed.extend(_parse(line) for line in lines if isinstance(line, str) and line.strip())
+            offsets.append(len(parsed))
+        return cls(parsed, offsets)
+
+    def __len__(self):
+        return len(self.original)
+
+    @property
+    def recipe(self):
+        """Recipe number of each row."""
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+    def _copy(self, quantity, quantity_max, unit):
+        table = object.__new__(IngredientTable)
+        table.__dict__.update(self.__dict__)
+        table.quantity, table.quantity_max, table.unit = quantity, quantity_max, unit
+        return table
+
+    def scale(self, factors):
+        """
+        Multiply every quantity by its recipe's factor.
+
+        Args:
+            factors: One factor per recipe (or a single factor for all)
+
+        Returns:
+            IngredientTable: Scaled copy
+        """
+        factors = np.broadcast_to(np.asarray(factors, dtype=np.float64), (len(self.offsets) - 1,))
+        per_row = factors[self.recipe]
+        return self._copy(self.quantity * per_row, self.quantity_max * per_row, self.unit)
+
+    def convert(self, systems):
+        """
+        Convert volumes and masses to metric or imperial units.
+
+        Amounts are converted through millilitres or grams and shown in the
+        largest unit they fill ("750 ml" but "1.5 l"; "2 tsp" but "1/4 cup").
+        Pints, quarts and gallons are only used for liquids, so other imperial
+        volumes stop at cups. Counted units ("2 cans") are left alone.
+
+        Args:
+            systems: One of None, "metric" or "imperial" per recipe (or one for all);
+                None leaves that recipe's units unchanged
+
+        Returns:
+            IngredientTable: Converted copy
+        """
+        if isinstance(systems, str) or systems is None:
+            systems = [systems] * (len(self.offsets) - 1)
+        system = np.array([SYSTEMS.index(value) for value in systems], dtype=np.int8)[self.recipe]
+
+        has_unit = self.unit >= 0
+        codes = np.where(has_unit, self.unit, 0)
+        dimension = np.where(has_unit, UNIT_DIMENSION[codes], 0)
+        base = self.quantity * UNIT_BASE[codes]
+        base_max = self.quantity_max * UNIT_BASE[codes]
+
+        quantity, quantity_max, unit = self.quantity.copy(), self.quantity_max.copy(), self.unit.copy()
+        for (system_name, dimension_name), targets in CONVERSIONS.items():
+            rows = np.flatnonzero(
+                has_unit & (system == SYSTEMS.index(system_name))
+                & (dimension == DIMENSIONS.index(dimension_name)) & ~np.isnan(base)
+            )
+            if not len(rows):
+                continue
+            target_codes = np.array([UNIT_CODES[name] for name, _ in targets])
+            thresholds = np.array([threshold for _, threshold in targets])
+            # Largest unit whose threshold the amount reaches; the slack lets 3 tsp reach 1 tbsp
+            index = np.searchsorted(thresholds, base[rows] * 1.001, side='right') - 1
+            liquid_only = np.array([name in LIQUID_UNITS for name, _ in targets])
+            if liquid_only.any():
+                liquid = np.array([_is_liquid(self.name[row]) for row in rows], dtype=bool)
+                index = np.where(liquid, index, np.minimum(index, np.flatnonzero(~liquid_only).max()))
+            chosen = target_codes[index]
+            unit[rows] = chosen
+            quantity[rows] = base[rows] / UNIT_BASE[chosen]
+            quantity_max[rows] = base_max[rows] / UNIT_BASE[chosen]
+        return self._copy(quantity, quantity_max, unit)
+
+    def rounded(self):
+        """
+        Round quantities for display.
+
+        Metric amounts are rounded to a precision that suits their size and
+        everything else to the nearest common fraction (1/8, 1/4, 1/3, ...).
+
+        Returns:
+            IngredientTable: Rounded copy
+        """
+        has_unit = self.unit >= 0
+        codes = np.where(has_unit, self.unit, 0)
+        metric = has_unit & METRIC_UNITS[codes]
+        large = has_unit & LARGE_METRIC_UNITS[codes]
+        return self._copy(
+            _round_amounts(self.quantity, metric, large), _round_amounts(self.quantity_max, metric, large),
+            self.unit
+        )
+
+    def records(self, recipe):
+        """
+        Return one recipe's rows as dicts.
+
+        Args:
+            recipe (int): Recipe number (position in the list given to from_recipes)
+
+        Returns:
+            list: Dicts like parse_ingredient's, with the current quantity and unit and
+                a "text" field holding the line rewritten with them
+        """
+        rows = []
+        for row in range(self.offsets[recipe], self.offsets[recipe + 1]):
+            quantity = None if np.isnan(self.quantity[row]) else float(self.quantity[row])
+            quantity_max = None if np.isnan(self.quantity_max[row]) else float(self.quantity_max[row])
+            unit = UNIT_NAMES[self.unit[row]] if self.unit[row] >= 0 else None
+            rows.append({
+                'original': self.original[row],
+                'quantity': quantity,
+                'quantity_max': quantity_max,
+                'unit': unit,
+                'size': self.size[row],
+                'item': self.item[row],
+                'notes': self.notes[row],
+                'name': self.name[row],
+                'names': list(self.names[row]),
+                'text': self._text(row, quantity, quantity_max, unit)
+            })
+        return rows
+
+    def shopping_list(self, system=None):
+        """
+        Combine the rows of every recipe into a shopping list.
+
+        Rows are grouped by normalized name, with aliases like "all purpose
+        flour" folded into a plainer name (SHOPPING_ALIASES), and by what their
+        amounts can be added in: volumes in millilitres, masses in grams, and counted units
+        ("2 cans (15 oz)", "3 eggs") per unit and package size. Each group is
+        summed in one vectorized reduction and converted for display. Rows
+        without a quantity ("salt to taste") get a group of their own. A line
+        naming several ingredients ("salt and pepper") lists each of them, with
+        no quantity since it can't be split between them.
+
+        Args:
+            system (str): "metric" or "imperial" for the combined amounts. If not
+                provided, groups whose lines are all metric stay metric and the
+                rest are shown in imperial units.
+
+        Returns:
+            list: Items sorted by name:
+            [
+                {
+                    "name": str (normalized name, e.g. "black bean"),
+                    "item": str (item as written in the first line, e.g. "black beans"),
+                    "quantity": float or None,
+                    "quantity_max": float or None (upper end if any line gave a range),
+                    "unit": str or None,
+                    "size": str or None,
+                    "text": str (e.g. "1 1/2 cups all-purpose flour"),
+                    "recipes": [int, ...] (recipe numbers the item appears in),
+                    "lines": int
+                },
+                ...
+            ]
+        """
+        # One entry per (row, ingredient named on it)
+        entries = [(row, name) for row, names in enumerate(self.names) for name in names]
+        if not entries:
+            return []
+        rows = np.array([row for row, _ in entries], dtype=np.int64)
+        entry_names = [SHOPPING_ALIASES.get(name, name) for _, name in entries]
+        aliased = np.array([SHOPPING_ALIASES.get(name, name) != name for _, name in entries])
+        compound = np.array([len(self.names[row]) > 1 for row, _ in entries])
+
+        name_codes, size_codes = {}, {None: 0}
+        names = np.array([name_codes.setdefault(name, len(name_codes)) for name in entry_names], dtype=np.int64)
+        quantity = np.where(compound, np.nan, self.quantity[rows])
+        quantity_max = np.where(compound, np.nan, self.quantity_max[rows])
+        has_quantity = ~np.isnan(quantity)
+        has_unit = self.unit[rows] >= 0
+        codes = np.where(has_unit, self.unit[rows], 0)
+        dimension = np.where(has_unit, UNIT_DIMENSION[codes], 0)
+        measured = has_unit & (dimension > 0)
+
+        # Group key: (name, kind, package size); kind is the unit code for counted
+        # units, or -1 no unit, -2 volume, -3 mass, -4 no quantity
+        kind = np.where(has_unit, self.unit[rows], -1).astype(np.int64)
+        kind = np.where(measured, -1 - dimension, kind)
+        kind = np.where(has_quantity, kind, -4)
+        sizes = np.array([
+            size_codes.setdefault(_size_key(self.size[row]), len(size_codes)) if self.size[row] else 0
+            for row in rows
+        ], dtype=np.int64)
+        sizes = np.where(measured | ~has_quantity, 0, sizes)
+        keys, first, group = np.unique(
+            np.column_stack((names, kind, sizes)), axis=0, return_index=True, return_inverse=True
+        )
+        group = group.ravel()
+        groups = len(keys)
+
+        # Sum in base units (ml, g, or the counted unit itself)
+        base = np.where(has_quantity, quantity * np.where(measured, UNIT_BASE[codes], 1.0), 0.0)
+        base_max = np.where(np.isnan(quantity_max), base, quantity_max * np.where(measured, UNIT_BASE[codes], 1.0))
+        total = np.bincount(group, weights=base, minlength=groups)
+        total_max = np.bincount(group, weights=base_max, minlength=groups)
+        ranged = np.bincount(group, weights=~np.isnan(quantity_max), minlength=groups) > 0
+        imperial = np.bincount(group, weights=measured & ~METRIC_UNITS[codes], minlength=groups) > 0
+
+        group_kind = keys[:, 1]
+        group_unit = np.where(
+            group_kind == -2, UNIT_CODES['ml'], np.where(group_kind == -3, UNIT_CODES['g'], group_kind)
+        )
+        group_unit = np.where(group_unit < 0, -1, group_unit).astype(np.int16)
+        first_rows = rows[first]
+        table = object.__new__(IngredientTable)
+        table.offsets = np.arange(groups + 1)
+        table.name = [entry_names[entry] for entry in first]
+        table.names = [(name,) for name in table.name]
+        # Label with the item as written, unless the line named several ingredients or an alias
+        table.item = [
+            table.name[i] if compound[entry] or aliased[entry] else (self.item[row] or table.name[i])
+            for i, (entry, row) in enumerate(zip(first, first_rows))
+        ]
+        table.original = list(table.item)
+        table.size = [self.size[row] if keys[i, 2] else None for i, row in enumerate(first_rows)]
+        table.notes = [None] * groups
+        table.quantity = np.where(group_kind == -4, np.nan, total)
+        table.quantity_max = np.where(ranged & (group_kind != -4), total_max, np.nan)
+        table.unit = group_unit
+        systems = [system or ('imperial' if imperial[i] else 'metric') for i in range(groups)]
+        table = table.convert(systems).rounded()
+
+        # Recipes each group came from, read off the rows sorted by group
+        recipe_of_row = self.recipe[rows]
+        order = np.argsort(group, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(group, minlength=groups))))
+        items = []
+        for i in sorted(range(groups), key=lambda i: (table.name[i], keys[i, 1] == -4, keys[i, 1], keys[i, 2])):
+            record = table.records(i)[0]
+            members = order[bounds[i]:bounds[i + 1]]
+            items.append({
+                'name': record['name'],
+                'item': record['item'],
+                'quantity': record['quantity'],
+                'quantity_max': record['quantity_max'],
+                'unit': record['unit'],
+                'size': record['size'],
+                'text': record['text'],
+                'recipes': sorted({int(recipe) for recipe in recipe_of_row[members]}),
+                'lines': len(members)
+            })
+        return items
+
+    def _text(self, row, quantity, quantity_max, unit):
+        """Rewrite an ingredient line with its current quantity and unit."""
+        if quantity is None:
+            return self.original[row]
+        parts = [format_quantity(quantity, unit)]
+        if quantity_max is not None:
+            parts[0] += '-' + format_quantity(quantity_max, unit)
+        if self.size[row]:
+            parts.append(f"({self.size[row]})")
+        if unit:
+            singular, plural = UNITS[unit][2:]
+            parts.append(plural if (quantity_max or quantity) > 1 else singular)
+        item = self.item[row]
+        if item and not unit:
+            # "3 egg" -> "3 eggs", "1 large eggs" -> "1 large egg"
+            item = _count_noun(item, (quantity_max or quantity) > 1)
+        if item:
+            parts.append(item)
+        text = ' '.join(parts)
+        if self.notes[row]:
+            text += ', ' + self.notes[row]
+        return text
+
+
+def _is_liquid(name):
+    """True if a normalized ingredient name ("chicken broth") is a liquid."""
+    return bool(name) and name.rsplit(' ', 1)[-1] in LIQUIDS
+
+
+def _size_key(size):
+    """Canonical form of a package size, so "15 oz" and "15 ounce" compare equal."""
+    _, quantity, _, unit, _, item, _, _, _ = _parse(size)
+    if quantity is None or unit is None or item:
+        return size.lower()
+    return f"{quantity:g} {unit}"
+
+
+def _round_amounts(values, metric, large):
+    """Round metric amounts by magnitude and the rest to the nearest common fraction."""
+    magnitude = np.abs(values)
+    # Metric: nearest 5 from 100, whole numbers from 10, else one decimal (litres and kilos: two)
+    rounded = np.where(large, np.round(values, 2), np.round(values, 1))
+    rounded = np.where(magnitude >= 10, np.round(values), rounded)
+    rounded = np.where(magnitude >= 100, np.round(values / 5) * 5, rounded)
+
+    whole = np.floor(values)
+    nearest = np.abs(np.subtract.outer(values - whole, FRACTION_STEPS)).argmin(axis=1)
+    fractional = whole + FRACTION_STEPS[nearest]
+    # Never round a small amount down to nothing
+    fractional = np.where((fractional == 0) & (values > 0), FRACTION_STEPS[1], fractional)
+    return np.where(metric, rounded, fractional)
+
+
+def format_quantity(quantity, unit=None):
+    """
+    Format a quantity for an ingredient line.
+
+    Args:
+        quantity (float): Amount
+        unit (str): Canonical unit; metric units get decimals, others fractions
+
+    Returns:
+        str: e.g. "1 1/2", "3/4", "250", "1.25"
+    """
+    if unit in ('ml', 'l', 'g', 'kg'):
+        return f"{quantity:.2f}".rstrip('0').rstrip('.')
+    whole = int(quantity)
+    fraction = FRACTION_TEXT.get(round(quantity - whole, 3))
+    if fraction is None:
+        return f"{quantity:.2f}".rstrip('0').rstrip('.')
+    return f"{whole} {fraction}" if whole else fraction
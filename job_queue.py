@@ -0,0 +1,368 @@
+"""
+RecipeSnap - Job Queue
+Durable background jobs for extractions. Jobs are stored in SQLite, so they
+survive restarts and can be shared by several worker processes; a pool of
+threads claims queued jobs, runs them and stores the result for clients to
+poll. Failed jobs are retried with exponential backoff, and running jobs hold
+a lease that a heartbeat renews, so jobs of a crashed worker are retried too.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from logging_setup import set_request_id
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+
+class JobQueue:
+    """SQLite-backed job queue with a worker thread pool, retries and result storage."""
+
+    def __init__(self, handler, path=None, workers=None, max_attempts=None, retry_backoff=None,
+                 lease=None, result_ttl=None, poll_interval=1.0):
+        """
+        Initialize the queue. Call start() to begin running jobs.
+
+        Args:
+            handler (callable): Runs a job: handler(payload) -> JSON-serializable result.
+                Raising an exception fails the attempt.
+            path (str): SQLite file. If not provided, reads from JOB_QUEUE_PATH env var,
+                falling back to the extraction cache file.
+            workers (int): Worker threads. If not provided, reads from JOB_WORKERS env var (default 4).
+            max_attempts (int): Attempts before a job fails for good. If not provided, reads from
+                JOB_MAX_ATTEMPTS env var (default 3).
+            retry_backoff (float): Delay before the first retry in seconds, doubled for each
+                later one. If not provided, reads from JOB_RETRY_BACKOFF env var (default 5).
+            lease (float): Seconds without a heartbeat before a running job is presumed lost
+                (its worker process crashed or was restarted). A lost job counts as a failed
+                attempt. Running jobs renew their lease every lease / 3 seconds. If not provided,
+                reads from JOB_LEASE_SECONDS env var (default 300).
+            result_ttl (float): Seconds finished jobs are kept. If not provided, reads from
+                JOB_RESULT_TTL env var (default 86400).
+            poll_interval (float): Seconds idle workers wait before checking for due retries
+        """
+        self.handler = handler
+        self.path = path or os.getenv('JOB_QUEUE_PATH') or os.getenv('RECIPE_CACHE_PATH', 'recipe_cache.sqlite3')
+        self.workers = workers or int(os.getenv('JOB_WORKERS', 4))
+        self.max_attempts = max_attempts or int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv('JOB_RETRY_BACKOFF', 5))
+        self.lease = lease or float(os.getenv('JOB_LEASE_SECONDS', 300))
+        self.result_ttl = result_ttl if result_ttl is not None else float(os.getenv('JOB_RESULT_TTL', 86400))
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._threads = []
+        # Jobs this process is running, whose leases the heartbeat renews
+        self._running = set()
+        self._last_purge = 0
+
+        # timeout: wait for other worker processes' writes instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                dedupe_key TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                request_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                run_after REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_after)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def submit(self, payload, kind='extract', dedupe_key=None, request_id=None):
+        """
+        Queue a job.
+
+        Args:
+            payload (dict): JSON-serializable job input passed to the handler
+            kind (str): Job type, for display
+            dedupe_key (str): If given and a queued or running job has the same key,
+                that job is returned instead of queuing a new one
+            request_id (str): Request ID the job's log records are tagged with
+
+        Returns:
+            dict: The job (see get)
+        """
+        now = time.time()
+        with self._lock:
+            if dedupe_key is not None:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running') LIMIT 1",
+                    (dedupe_key,)
+                ).fetchone()
+                if row is not None:
+                    return self._get(row[0])
+
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                """INSERT INTO jobs (id, kind, payload, dedupe_key, status, request_id, created_at, updated_at, run_after)
+                   VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)""",
+                (job_id, kind, json.dumps(payload), dedupe_key, request_id, now, now, now)
+            )
+            job = self._get(job_id)
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Job ID returned by submit
+
+        Returns:
+            dict: id, kind, status, attempts, result (once succeeded), error (last
+                failure), created_at, updated_at and finished_at; None if unknown
+        """
+        with self._lock:
+            return self._get(job_id)
+
+    def _get(self, job_id):
+        row = self._conn.execute(
+            """SELECT id, kind, status, attempts, result, error, created_at, updated_at, run_after, finished_at
+               FROM jobs WHERE id = ?""",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job_id, kind, status, attempts, result, error, created_at, updated_at, run_after, finished_at = row
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'status': status,
+            'attempts': attempts,
+            'result': json.loads(result) if result is not None else None,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'finished_at': finished_at
+        }
+        if status == 'queued' and attempts:
+            job['retry_at'] = run_after
+        return job
+
+    def start(self):
+        """Start the worker threads and the lease heartbeat."""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stop the workers after their current jobs. Running jobs are finished or, if
+        the process exits first, re-queued once their lease expires.
+
+        Args:
+            timeout (float): Seconds to wait for each worker
+        """
+        self._stopping = True
+        self._stopped.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self):
+        """Worker loop: claim due jobs and run them until stopped."""
+        while not self._stopping:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.warning("Could not claim a job: %s", e)
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            try:
+                self._run(*job)
+            except sqlite3.Error as e:
+                # The job stays running until its lease expires, then counts as a failed attempt
+                logger.error("Could not record the outcome of job %s: %s", job[0], e)
+
+    def _heartbeat(self):
+        """Renew the leases of jobs this process is running, so slow jobs aren't presumed lost."""
+        while not self._stopped.wait(self.lease / 3):
+            with self._lock:
+                running = list(self._running)
+                if not running:
+                    continue
+                try:
+                    self._conn.execute(
+                        f"""UPDATE jobs SET started_at = ? WHERE status = 'running'
+                            AND id IN ({','.join('?' * len(running))})""",
+                        [time.time()] + running
+                    )
+                except sqlite3.Error as e:
+                    logger.warning("Could not renew job leases: %s", e)
+
+    def _claim(self):
+        """
+        Atomically take the oldest due job.
+
+        Returns:
+            tuple: (job_id, payload, attempts, request_id), or None if nothing is due
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A job whose worker died (crash or restart) failed that attempt: retry it or give up
+                self._conn.execute(
+                    """UPDATE jobs SET status = 'failed', error = 'Worker lost: lease expired', updated_at = ?,
+                       finished_at = ? WHERE status = 'running' AND started_at < ? AND attempts >= ?""",
+                    (now, now, now - self.lease, self.max_attempts)
+                )
+                self._conn.execute(
+                    """UPDATE jobs SET status = 'queued', error = 'Worker lost: lease expired', updated_at = ?
+                       WHERE status = 'running' AND started_at < ?""",
+                    (now, now - self.lease)
+                )
+                row = self._conn.execute(
+                    """SELECT id, payload, attempts, request_id FROM jobs
+                       WHERE status = 'queued' AND run_after <= ?
+                       ORDER BY run_after LIMIT 1""",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        """UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, updated_at = ?
+                           WHERE id = ?""",
+                        (now, now, row[0])
+                    )
+                    self._running.add(row[0])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self._maybe_purge(now)
+
+        if row is None:
+            return None
+        job_id, payload, attempts, request_id = row
+        return job_id, json.loads(payload), attempts + 1, request_id
+
+    def _run(self, job_id, payload, attempt, request_id):
+        """
+        Run one attempt of a job and record the outcome. If the attempt's lease
+        expired meanwhile, the job has moved on and the outcome is discarded.
+        """
+        set_request_id(request_id)
+        try:
+            try:
+                result = self.handler(payload)
+            except Exception as e:
+                self._record_failure(job_id, attempt, e)
+                return
+
+            now = time.time()
+            with self._lock:
+                updated = self._conn.execute(
+                    """UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, updated_at = ?, finished_at = ?
+                       WHERE id = ? AND status = 'running' AND attempts = ?""",
+                    (json.dumps(result), now, now, job_id, attempt)
+                ).rowcount
+                if updated:
+                    self.completed += 1
+            if updated:
+                logger.info("Job %s succeeded on attempt %d", job_id, attempt)
+            else:
+                logger.warning("Job %s attempt %d finished after its lease expired", job_id, attempt)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    def _record_failure(self, job_id, attempt, error):
+        """Schedule a retry with backoff, or fail the job after its last attempt."""
+        now = time.time()
+        with self._lock:
+            if attempt < self.max_attempts:
+                # Jitter spreads out retries of jobs that failed together
+                delay = self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                if not self._conn.execute(
+                    """UPDATE jobs SET status = 'queued', error = ?, run_after = ?, updated_at = ?
+                       WHERE id = ? AND status = 'running' AND attempts = ?""",
+                    (str(error), now + delay, now, job_id, attempt)
+                ).rowcount:
+                    return
+                self.retried += 1
+                logger.warning("Job %s attempt %d failed, retrying in %.1fs: %s", job_id, attempt, delay, error)
+            else:
+                if not self._conn.execute(
+                    """UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, finished_at = ?
+                       WHERE id = ? AND status = 'running' AND attempts = ?""",
+                    (str(error), now, now, job_id, attempt)
+                ).rowcount:
+                    return
+                self.failed += 1
+                logger.error("Job %s failed after %d attempts: %s", job_id, attempt, error)
+
+    def _maybe_purge(self, now):
+        """Delete finished jobs older than the result TTL, at most once a minute. Call with the lock held."""
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+            (now - self.result_ttl,)
+        )
+
+    def stats(self):
+        """
+        Return queue counters.
+
+        Returns:
+            dict: jobs by status, workers, and completed, failed and retried counts
+                for this process
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(dict(rows))
+        return {
+            **counts,
+            'workers': len(self._threads),
+            'completed': self.completed,
+            'failed_permanently': self.failed,
+            'retried': self.retried
+        }
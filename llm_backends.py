@@ -0,0 +1,402 @@
+"""
+RecipeSnap - LLM Backends
+Chat-completion backends the extractor can send prompts to: Writer's Palmyra
+API, any OpenAI-compatible API, and a local server (for example
+mock_llm_server.py for offline load tests). A backend only builds requests and
+parses responses; the extractors own the HTTP transport, so the same backend
+works with the pooled requests session and the asyncio client.
+"""
+
+import os
+import json
+import codecs
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend:
+    """Base class for chat-completion backends."""
+
+    name = None
+
+    def __init__(self, api_url, model, api_key=None, timeout=None, stream=None):
+        """
+        Initialize the backend.
+
+        Args:
+            api_url (str): Chat endpoint URL
+            model (str): Model name sent with each request
+            api_key (str): Bearer token, or None if the endpoint needs no auth
+            timeout (int): Request timeout in seconds. If not provided, reads from
+                LLM_TIMEOUT env var, then WRITER_TIMEOUT (default 90).
+            stream (bool): Stream completions when a caller wants partial output. If not
+                provided, reads from LLM_STREAM env var (default true).
+        """
+        self.api_url = api_url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout or int(os.getenv('LLM_TIMEOUT') or os.getenv('WRITER_TIMEOUT', 90))
+        if stream is None:
+            stream = os.getenv('LLM_STREAM', 'true').lower() != 'false'
+        self.stream = stream
+
+    def build_request(self, prompt, stream=False):
+        """
+        Build the headers and JSON payload for a chat request.
+
+        Args:
+            prompt (str): The user prompt
+            stream (bool): Ask for the completion as server-sent events
+
+        Returns:
+            tuple: (headers, payload)
+        """
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"content": prompt, "role": "user"}
+            ]
+        }
+        if stream:
+            payload["stream"] = True
+
+        return headers, payload
+
+    def error_message(self, status_code, body):
+        """Build the error message for a failed API call."""
+        error_msg = f"{self.label} API error: {status_code}"
+        try:
+            error_data = json.loads(body)
+            if "error" in error_data:
+                error_msg += f" - {error_data['error']}"
+            elif "message" in error_data:
+                error_msg += f" - {error_data['message']}"
+        except:
+            error_msg += f" - {body[:200]}"
+        return error_msg
+
+    def response_text(self, response_data):
+        """
+        Pull the model's text out of a decoded chat response.
+
+        Args:
+            response_data (dict): Decoded JSON response
+
+        Returns:
+            str: The response text
+        """
+        try:
+            return response_data["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            raise Exception(
+                f"Could not extract response text from {self.label} API. "
+                f"Response structure: {list(response_data.keys())}"
+            )
+
+    def delta_text(self, event):
+        """
+        Pull the new text out of one decoded streaming event.
+
+        Args:
+            event (dict): Decoded "data:" payload of a server-sent event
+
+        Returns:
+            str: The text delta ('' if the event carries none)
+        """
+        try:
+            choice = event["choices"][0]
+        except (KeyError, IndexError, TypeError):
+            return ''
+        delta = choice.get("delta") or choice.get("message") or {}
+        text = delta.get("content") if isinstance(delta, dict) else None
+        return text or choice.get("text") or ''
+
+    def stream_result(self, status_code, decoder):
+        """
+        Finish a streamed request.
+
+        Args:
+            status_code (int): HTTP status of the response
+            decoder (StreamDecoder): Decoder the body was fed to
+
+        Returns:
+            str: The model's full response text
+
+        Raises:
+            Exception: If the API returned an error
+        """
+        body = decoder.close()
+        if status_code != 200:
+            raise Exception(self.error_message(status_code, body))
+        if decoder.sse:
+            return body
+
+        # The server ignored the stream flag and sent a normal response
+        text = self.response_text(json.loads(body))
+        if decoder.on_delta is not None:
+            decoder.on_delta(text)
+        return text
+
+    @property
+    def label(self):
+        """Human-readable backend name for logs and errors."""
+        return self.name.capitalize() if self.name else 'LLM'
+
+
+class StreamDecoder:
+    """
+    Decodes a streamed chat completion (server-sent events) fed in byte chunks.
+
+    Passes each text delta to on_delta as it arrives. Bodies that aren't an
+    event stream (errors, or servers that don't stream) are collected as-is.
+    """
+
+    def __init__(self, backend, content_type=None, on_delta=None):
+        """
+        Initialize the decoder.
+
+        Args:
+            backend (LLMBackend): Backend that parses the events
+            content_type (str): Content-Type of the response
+            on_delta (callable): Called with each piece of text as it arrives
+        """
+        self.backend = backend
+        self.on_delta = on_delta
+        self.sse = 'text/event-stream' in (content_type or '').lower()
+        self.done = False
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ''
+        self._parts = []
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the response body.
+
+        Args:
+            chunk (bytes): Next bytes of the body
+
+        Returns:
+            bool: True once the stream has signalled its end
+        """
+        text = self._decoder.decode(chunk)
+        if not self.sse:
+            self._parts.append(text)
+            return False
+
+        lines = (self._buffer + text).split('\n')
+        self._buffer = lines.pop()
+        for line in lines:
+            self._read_line(line)
+        return self.done
+
+    def _read_line(self, line):
+        line = line.strip()
+        if not line.startswith('data:') or self.done:
+            return
+        data = line[5:].strip()
+        if data == '[DONE]':
+            self.done = True
+            return
+        try:
+            delta = self.backend.delta_text(json.loads(data))
+        except ValueError:
+            return
+        if delta:
+            self._parts.append(delta)
+            if self.on_delta is not None:
+                self.on_delta(delta)
+
+    def close(self):
+        """
+        Finish decoding.
+
+        Returns:
+            str: The concatenated text deltas, or the raw body if it wasn't an event stream
+        """
+        rest = self._decoder.decode(b'', final=True)
+        if not self.sse:
+            self._parts.append(rest)
+        elif self._buffer + rest:
+            self._read_line(self._buffer + rest)
+            self._buffer = ''
+        return ''.join(self._parts)
+
+
+class WriterBackend(LLMBackend):
+    """Writer's Palmyra chat API."""
+
+    name = 'writer'
+
+    def __init__(self, api_key=None, api_url=None, model=None, timeout=None):
+        """
+        Initialize the Writer backend.
+
+        Args:
+            api_key (str): Writer API key. If not provided, reads from WRITER_API_KEY env var.
+            api_url (str): Chat endpoint. If not provided, reads from LLM_API_URL env var
+                (default https://api.writer.com/v1/chat).
+            model (str): Model name. If not provided, reads from LLM_MODEL env var (default palmyra-x5).
+            timeout (int): Request timeout in seconds (see LLMBackend)
+        """
+        api_key = api_key or os.getenv('WRITER_API_KEY')
+        if not api_key:
+            raise ValueError("Writer API key is required. Set WRITER_API_KEY environment variable.")
+
+        super().__init__(
+            api_url or os.getenv('LLM_API_URL', 'https://api.writer.com/v1/chat'),
+            model or os.getenv('LLM_MODEL', 'palmyra-x5'),
+            api_key=api_key,
+            timeout=timeout
+        )
+
+    def response_text(self, response_data):
+        """
+        Pull the model's text out of a Writer API response.
+
+        Args:
+            response_data (dict): Decoded JSON response
+
+        Returns:
+            str: The response text
+        """
+        # Writer API response structure may vary, so we handle different formats
+        response_text = None
+
+        # Try different possible response structures
+        if "choices" in response_data and len(response_data["choices"]) > 0:
+            # OpenAI-style format
+            choice = response_data["choices"][0]
+            if "message" in choice:
+                response_text = choice["message"].get("content", "").strip()
+            elif "text" in choice:
+                response_text = choice["text"].strip()
+            elif "content" in choice:
+                response_text = choice["content"].strip()
+        elif "message" in response_data:
+            # Direct message format
+            if isinstance(response_data["message"], dict):
+                response_text = response_data["message"].get("content", "").strip()
+            else:
+                response_text = str(response_data["message"]).strip()
+        elif "content" in response_data:
+            # Direct content format
+            response_text = response_data["content"].strip()
+        elif "text" in response_data:
+            # Direct text format
+            response_text = response_data["text"].strip()
+        elif "output" in response_data:
+            # Output field format
+            response_text = response_data["output"].strip()
+
+        if not response_text:
+            # Last resort: try to find any string field
+            for key, value in response_data.items():
+                if isinstance(value, str) and len(value) > 10:
+                    response_text = value.strip()
+                    break
+
+            if not response_text:
+                raise Exception(f"Could not extract response text from Writer API. Response structure: {list(response_data.keys())}")
+
+        return response_text
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any API implementing OpenAI's /v1/chat/completions (OpenAI, vLLM, Together, ...)."""
+
+    name = 'openai'
+
+    def __init__(self, api_key=None, api_url=None, model=None, timeout=None):
+        """
+        Initialize the OpenAI-compatible backend.
+
+        Args:
+            api_key (str): API key. If not provided, reads from LLM_API_KEY, then OPENAI_API_KEY env var.
+            api_url (str): Chat endpoint. If not provided, reads from LLM_API_URL env var
+                (default https://api.openai.com/v1/chat/completions).
+            model (str): Model name. If not provided, reads from LLM_MODEL env var (default gpt-4o-mini).
+            timeout (int): Request timeout in seconds (see LLMBackend)
+        """
+        api_key = api_key or os.getenv('LLM_API_KEY') or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("API key is required. Set LLM_API_KEY or OPENAI_API_KEY environment variable.")
+
+        super().__init__(
+            api_url or os.getenv('LLM_API_URL', 'https://api.openai.com/v1/chat/completions'),
+            model or os.getenv('LLM_MODEL', 'gpt-4o-mini'),
+            api_key=api_key,
+            timeout=timeout
+        )
+
+    @property
+    def label(self):
+        return 'OpenAI-compatible'
+
+
+class LocalBackend(OpenAICompatibleBackend):
+    """OpenAI-compatible server on this machine or network (mock_llm_server.py, Ollama, llama.cpp, ...)."""
+
+    name = 'local'
+
+    def __init__(self, api_key=None, api_url=None, model=None, timeout=None):
+        """
+        Initialize the local backend. No API key is required.
+
+        Args:
+            api_key (str): Optional API key. If not provided, reads from LLM_API_KEY env var.
+            api_url (str): Chat endpoint. If not provided, reads from LLM_API_URL env var
+                (default http://127.0.0.1:8001/v1/chat/completions, where mock_llm_server.py listens).
+            model (str): Model name. If not provided, reads from LLM_MODEL env var (default local).
+            timeout (int): Request timeout in seconds (see LLMBackend)
+        """
+        LLMBackend.__init__(
+            self,
+            api_url or os.getenv('LLM_API_URL', 'http://127.0.0.1:8001/v1/chat/completions'),
+            model or os.getenv('LLM_MODEL', 'local'),
+            api_key=api_key or os.getenv('LLM_API_KEY'),
+            timeout=timeout
+        )
+
+    @property
+    def label(self):
+        return 'Local LLM'
+
+
+# Backend names accepted by LLM_BACKEND
+BACKENDS = {
+    'writer': WriterBackend,
+    'openai': OpenAICompatibleBackend,
+    'local': LocalBackend,
+}
+
+
+def create_backend(name=None, api_key=None):
+    """
+    Create the configured LLM backend.
+
+    Args:
+        name (str): "writer", "openai" or "local". If not provided, reads from
+            LLM_BACKEND env var (default writer).
+        api_key (str): API key passed to the backend (each backend has its own env var fallback)
+
+    Returns:
+        LLMBackend: The backend
+
+    Raises:
+        ValueError: If the backend is unknown or its API key is missing
+    """
+    name = (name or os.getenv('LLM_BACKEND', 'writer')).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    backend = BACKENDS[name](api_key=api_key)
+    logger.info("Using %s backend, model %s", backend.label, backend.model)
+    return backend
@@ -0,0 +1,141 @@
+"""
+RecipeSnap - Logging Setup
+Level-gated logging for the server and CLI tools. Records are handed to a
+queue in the calling thread and written to stdout by a background listener, so
+request threads never block on terminal or pipe I/O. Every record carries the
+request ID of the API request (or prefetch) that produced it.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Client-supplied request IDs are only trusted if they look like IDs
+REQUEST_ID_RE = re.compile(r'^[\w.:-]{1,64}$')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+# Request ID of the work running in the current thread or task ("-" outside a request)
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def new_request_id():
+    """Return a fresh random request ID."""
+    return uuid.uuid4().hex[:16]
+
+
+def set_request_id(request_id=None):
+    """
+    Set the request ID for the current thread or task.
+
+    Args:
+        request_id (str): ID to use (e.g. from an X-Request-ID header). A new one is
+            generated if not provided or not a plausible ID.
+
+    Returns:
+        str: The request ID now in effect
+    """
+    if not request_id or not REQUEST_ID_RE.match(request_id):
+        request_id = new_request_id()
+    request_id_var.set(request_id)
+    return request_id
+
+
+def get_request_id():
+    """Return the request ID of the current thread or task."""
+    return request_id_var.get()
+
+
+def bind_context(fn):
+    """
+    Wrap a function so it runs with the caller's request ID in another thread.
+
+    Thread pools don't inherit context variables, so wrap work before submitting it.
+
+    Args:
+        fn (callable): Function to run later
+
+    Returns:
+        callable: Wrapper taking the same arguments
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # A context can only be entered once at a time, so each call gets a copy
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to each record."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log aggregators."""
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    """
+    Configure the root logger with a non-blocking queue handler. Safe to call more than once.
+
+    Args:
+        level (str): Minimum level. If not provided, reads from LOG_LEVEL env var (default INFO).
+        fmt (str): "text" or "json". If not provided, reads from LOG_FORMAT env var (default text).
+        stream: Where the listener writes (default stdout)
+    """
+    global _listener
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT', 'text')).lower()
+
+    with _setup_lock:
+        if _listener is not None:
+            logging.getLogger().setLevel(level)
+            return
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        # The filter runs in the logging thread, where the request ID is visible
+        records = queue.SimpleQueue()
+        handler = QueueHandler(records)
+        handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(level)
+
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
@@ -0,0 +1,335 @@
+"""
+RecipeSnap - Metrics
+Lightweight, thread-safe counters, gauges and histograms rendered in the
+Prometheus text exposition format. Records per-stage timings of extractions
+and searches, upstream status codes and in-flight work; cache counters are
+read from the caches themselves when metrics are scraped.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds, spanning cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    """Escape a label value for the exposition format."""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    """Render a {name="value",...} label set (empty string if there are no labels)."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """Render a sample value, using integers where possible."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        """Order label values by the metric's label names."""
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        """Return the metric in text exposition format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_samples(items))
+        return '\n'.join(lines)
+
+    def _render_samples(self, items):
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][index] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the enclosed block in seconds, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['buckets']):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(entry['sum'], 6))}")
+            lines.append(f"{self.name}_count{labels} {entry['count']}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are read from a function at scrape time (e.g. cache counters)."""
+
+    def __init__(self, name, help_text, kind, labels, callback):
+        """
+        Args:
+            kind (str): "counter" or "gauge"
+            labels (tuple): Label names
+            callback (callable): Returns {label values tuple: value}
+        """
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self):
+        try:
+            items = sorted(self.callback().items())
+        except Exception as e:
+            logger.warning("Could not collect metric %s: %s", self.name, e)
+            items = []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples(items))
+        return '\n'.join(lines)
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add a metric, replacing any earlier metric with the same name."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """
+        Render every metric in Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text, newline-terminated
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Content-Type of the text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'recipesnap_stage_duration_seconds',
+    'Time spent in each stage of an extraction or search.',
+    labels=('operation', 'stage')
+)
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    'recipesnap_upstream_responses_total',
+    'Responses from upstream services by status code ("error" when no response arrived).',
+    labels=('service', 'status')
+)
+IN_FLIGHT = REGISTRY.gauge(
+    'recipesnap_in_flight',
+    'Extractions and searches currently running.',
+    labels=('operation',)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'recipesnap_http_requests_total',
+    'API requests handled, by endpoint and status code.',
+    labels=('endpoint', 'status')
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    'recipesnap_http_request_duration_seconds',
+    'API request handling time (streaming responses: time to first byte).',
+    labels=('endpoint',)
+)
+
+
+# Caches and single-flight groups read at scrape time, by name
+_caches = {}
+_singleflights = {}
+
+
+def stage(operation, name):
+    """
+    Time a stage of an operation.
+
+    Usage:
+        with metrics.stage('extract', 'fetch'):
+            ...
+
+    Args:
+        operation (str): "extract" or "search"
+        name (str): Stage name
+
+    Returns:
+        Context manager recording the stage duration
+    """
+    return STAGE_SECONDS.time(operation=operation, stage=name)
+
+
+def upstream(service, status):
+    """
+    Count an upstream response.
+
+    Args:
+        service (str): Upstream service (e.g. "page", "google", "writer")
+        status: HTTP status code, or "error" if the request failed without a response
+    """
+    UPSTREAM_RESPONSES.inc(service=service, status=status)
+
+
+def register_cache(name, cache):
+    """
+    Expose a cache's hit, miss, eviction and size counters.
+
+    Args:
+        name (str): Cache name used as the "cache" label
+        cache: Object with a stats() method returning hits, misses, evictions,
+            expirations and entries (MemoryCache, SQLiteCache and subclasses)
+    """
+    _caches[name] = cache
+
+
+def register_singleflight(name, group):
+    """
+    Expose a single-flight group's in-flight and coalesced counts.
+
+    Args:
+        name (str): Operation name used as the "operation" label
+        group: SingleFlight or AsyncSingleFlight
+    """
+    _singleflights[name] = group
+
+
+def _cache_samples(field):
+    """Read one counter from every registered cache."""
+    def collect():
+        return {(name,): cache.stats()[field] for name, cache in list(_caches.items())}
+    return collect
+
+
+for _field, _kind, _help in (
+    ('hits', 'counter', 'Cache lookups that found a live entry.'),
+    ('misses', 'counter', 'Cache lookups that found nothing or an expired entry.'),
+    ('evictions', 'counter', 'Entries evicted to stay within the cache bounds.'),
+    ('expirations', 'counter', 'Entries dropped after their TTL.'),
+    ('entries', 'gauge', 'Entries currently cached.'),
+):
+    REGISTRY.register(CallbackMetric(
+        f"recipesnap_cache_{_field}{'_total' if _kind == 'counter' else ''}", _help, _kind, ('cache',),
+        _cache_samples(_field)
+    ))
+
+REGISTRY.register(CallbackMetric(
+    'recipesnap_coalesced_total', 'Requests that joined an identical request already in flight.',
+    'counter', ('operation',),
+    lambda: {(name,): group.stats()['coalesced'] for name, group in list(_singleflights.items())}
+))
+REGISTRY.register(CallbackMetric(
+    'recipesnap_coalesce_in_flight', 'Distinct extractions or searches currently running upstream.',
+    'gauge', ('operation',),
+    lambda: {(name,): group.stats()['in_flight'] for name, group in list(_singleflights.items())}
+))
@@ -0,0 +1,407 @@
+"""
+RecipeSnap - Mock LLM Server
+Local stand-in for the LLM API, for load-testing the full stack offline without
+spending real quota. Speaks the OpenAI chat-completions format on
+/v1/chat/completions (and Writer's /v1/chat), replays recorded responses, and
+injects configurable latency and errors. Requests with "stream": true get the
+reply as server-sent events, spread over the sampled latency.
+
+Usage:
+    python mock_llm_server.py --port 8001 --latency lognormal:1200:0.4 --errors 429:0.02,500:0.01
+    LLM_BACKEND=local LLM_API_URL=http://127.0.0.1:8001/v1/chat/completions python app.py
+
+Recorded responses (--responses) are a JSON list or JSON Lines file of entries:
+    {"match": "Chocolate Chip Cookies", "content": "{\"recipeName\": ...}"}
+    {"body": {...full API response...}}
+Entries whose "match" string appears in the prompt are used for that prompt;
+entries without "match" are replayed round-robin. Prompts nothing matches get a
+recipe synthesized from the page text in the prompt.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Paths that accept chat requests
+CHAT_PATHS = {'/v1/chat/completions', '/v1/chat', '/chat/completions'}
+
+# Characters per streamed event, and the share of the latency spent before the first one
+STREAM_CHUNK_CHARS = 24
+FIRST_TOKEN_SHARE = 0.15
+
+PAGE_TITLE_RE = re.compile(r'^Page title:\s*(.+)$', re.MULTILINE)
+RECIPE_TITLE_RE = re.compile(r'^Recipe:\s*(.+)$', re.MULTILINE)
+URL_RE = re.compile(r'^URL:\s*(\S+)', re.MULTILINE)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler returning seconds.
+
+    Specs (all times in milliseconds):
+        fixed:MS, uniform:MIN:MAX, normal:MEAN:STDDEV, lognormal:MEDIAN:SIGMA
+
+    Args:
+        spec (str): Distribution spec
+
+    Returns:
+        callable: Zero-argument function returning a delay in seconds
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(':') if v]
+
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == 'uniform' and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'normal' and len(values) == 2:
+        return lambda: max(random.gauss(values[0], values[1]), 0) / 1000
+    if kind == 'lognormal' and len(values) == 2:
+        # Parameterized by the median, which is exp(mu)
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Invalid latency spec '{spec}'. Use fixed:MS, uniform:MIN:MAX, normal:MEAN:SD or lognormal:MEDIAN:SIGMA")
+
+
+def parse_errors(spec):
+    """
+    Parse an error distribution like "429:0.02,500:0.01,timeout:0.005".
+
+    Args:
+        spec (str): Comma-separated outcome:probability pairs. An outcome is an HTTP
+            status code, or "timeout" to hang for --timeout-seconds before answering 504.
+
+    Returns:
+        list: (outcome, probability) pairs
+    """
+    errors = []
+    for entry in (spec or '').split(','):
+        if not entry.strip():
+            continue
+        outcome, _, probability = entry.strip().partition(':')
+        errors.append((outcome if outcome == 'timeout' else int(outcome), float(probability)))
+    if sum(p for _, p in errors) > 1:
+        raise ValueError("Error probabilities add up to more than 1")
+    return errors
+
+
+def load_responses(path):
+    """
+    Load recorded responses from a JSON list or JSON Lines file.
+
+    Args:
+        path (str): File path, or None
+
+    Returns:
+        list: Response entries
+    """
+    if not path:
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def synthesize_response(prompt):
+    """
+    Build a plausible model reply for a prompt nothing recorded matches.
+
+    Extraction prompts get a recipe built from the page text in the prompt;
+    appliance prompts get an empty appliance list.
+
+    Args:
+        prompt (str): The user prompt
+
+    Returns:
+        str: Model response text (JSON)
+    """
+    if RECIPE_TITLE_RE.search(prompt) and '"applianceInstructions"' in prompt and 'Webpage Content' not in prompt:
+        return json.dumps({"applianceInstructions": []})
+
+    title = PAGE_TITLE_RE.search(prompt) or URL_RE.search(prompt)
+    title = title.group(1).strip() if title else 'Mock Recipe'
+
+    # Only look at the page text, not the prompt's own instructions
+    page_text = prompt.split('Webpage Content:', 1)[-1].split('CRITICAL:', 1)[0]
+    list_lines = [line[2:].strip() for line in page_text.splitlines() if line.startswith('- ')]
+    ingredients = [line for line in list_lines if re.match(r'[\d¼½¾⅓⅔]', line)][:25]
+    steps = [line for line in list_lines if line not in ingredients and len(line) > 40][:15]
+
+    return json.dumps({
+        "recipeName": title,
+        "ingredients": ingredients or ["1 cup flour", "2 eggs", "1 cup milk"],
+        "instructions": [f"Step {i}: {step}" for i, step in enumerate(steps or ["Mix everything.", "Bake until golden."], 1)],
+        "applianceInstructions": []
+    })
+
+
+def stream_content(body):
+    """
+    Return the message text of a response body, to be streamed.
+
+    Args:
+        body (dict): Full chat API response body
+
+    Returns:
+        str: The content, or None if the body has no chat message (it is sent unstreamed)
+    """
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return content if isinstance(content, str) else None
+
+
+class MockLLM:
+    """Response selection, latency and error injection, and counters for the mock server."""
+
+    def __init__(self, responses=None, latency='fixed:0', errors='', timeout_seconds=120, seed=None):
+        """
+        Initialize the mock.
+
+        Args:
+            responses (list): Recorded response entries (see load_responses)
+            latency (str): Latency distribution spec (see parse_latency)
+            errors (str): Error distribution spec (see parse_errors)
+            timeout_seconds (float): How long "timeout" errors hang
+            seed (int): Random seed for reproducible runs
+        """
+        if seed is not None:
+            random.seed(seed)
+        self.responses = responses or []
+        self.latency = parse_latency(latency)
+        self.errors = parse_errors(errors)
+        self.timeout_seconds = timeout_seconds
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self.requests = 0
+        self.error_counts = {}
+
+    def pick_error(self):
+        """Return the injected outcome for this request (status code or "timeout"), or None."""
+        roll = random.random()
+        for outcome, probability in self.errors:
+            if roll < probability:
+                return outcome
+            roll -= probability
+        return None
+
+    def pick_response(self, prompt):
+        """
+        Choose the response body for a prompt.
+
+        Args:
+            prompt (str): The user prompt
+
+        Returns:
+            dict: Full chat API response body
+        """
+        for entry in self.responses:
+            if entry.get('match') and entry['match'] in prompt:
+                return self._body(entry)
+
+        unmatched = [entry for entry in self.responses if not entry.get('match')]
+        if unmatched:
+            with self._lock:
+                entry = unmatched[self._next % len(unmatched)]
+                self._next += 1
+            return self._body(entry)
+
+        return self._body({'content': synthesize_response(prompt)})
+
+    @staticmethod
+    def _body(entry):
+        """Wrap a recorded entry in an OpenAI-style response body."""
+        if 'body' in entry:
+            return entry['body']
+        return {
+            "id": "mock",
+            "object": "chat.completion",
+            "model": "mock",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": entry['content']},
+                "finish_reason": "stop"
+            }]
+        }
+
+    def record(self, outcome):
+        """Count a served request."""
+        with self._lock:
+            self.requests += 1
+            if outcome is not None:
+                self.error_counts[str(outcome)] = self.error_counts.get(str(outcome), 0) + 1
+
+    def stats(self):
+        """
+        Return request counters.
+
+        Returns:
+            dict: requests and errors by outcome
+        """
+        with self._lock:
+            return {'requests': self.requests, 'errors': dict(self.error_counts)}
+
+
+def make_handler(mock):
+    """Create a request handler class bound to a MockLLM."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'healthy'})
+            elif self.path == '/stats':
+                self._send_json(200, mock.stats())
+            else:
+                self._send_json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if self.path not in CHAT_PATHS:
+                self._send_json(404, {'error': 'Not found'})
+                return
+
+            try:
+                request = json.loads(body)
+                messages = request.get('messages') or []
+                prompt = '\n'.join(str(m.get('content', '')) for m in messages)
+            except (ValueError, AttributeError):
+                self._send_json(400, {'error': 'Invalid JSON body'})
+                return
+
+            outcome = mock.pick_error()
+            mock.record(outcome)
+
+            if outcome == 'timeout':
+                time.sleep(mock.timeout_seconds)
+                self._send_json(504, {'error': 'Mock upstream timeout'})
+                return
+
+            latency = mock.latency()
+            if outcome is not None:
+                time.sleep(latency)
+                self._send_json(outcome, {'error': f'Mock error {outcome}'})
+                return
+
+            response = mock.pick_response(prompt)
+            content = stream_content(response) if request.get('stream') else None
+            if content is None:
+                time.sleep(latency)
+                self._send_json(200, response)
+            else:
+                self._send_stream(content, latency)
+
+        def _send_stream(self, content, latency):
+            """Send content as OpenAI-style chat.completion.chunk events."""
+            pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or ['']
+            time.sleep(latency * FIRST_TOKEN_SHARE)
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            interval = latency * (1 - FIRST_TOKEN_SHARE) / len(pieces)
+            for index, piece in enumerate(pieces):
+                if index:
+                    time.sleep(interval)
+                event = {
+                    "id": "mock",
+                    "object": "chat.completion.chunk",
+                    "model": "mock",
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _write_chunk(self, data):
+            """Write one HTTP/1.1 chunk (an empty chunk ends the body)."""
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, status, data):
+            payload = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            if status == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # One line per request would swamp load-test output
+            pass
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8001, **mock_options):
+    """
+    Start the mock server in a background thread.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+        **mock_options: Passed to MockLLM
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it
+    """
+    mock = MockLLM(**mock_options)
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Run the mock LLM server from the command line."""
+    parser = argparse.ArgumentParser(description="Local mock LLM API for offline load tests")
+    parser.add_argument('--host', default=os.getenv('MOCK_LLM_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('MOCK_LLM_PORT', 8001)))
+    parser.add_argument('--responses', default=os.getenv('MOCK_LLM_RESPONSES'),
+                        help="JSON or JSON Lines file of recorded responses")
+    parser.add_argument('--latency', default=os.getenv('MOCK_LLM_LATENCY', 'lognormal:1500:0.5'),
+                        help="fixed:MS, uniform:MIN:MAX, normal:MEAN:SD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--errors', default=os.getenv('MOCK_LLM_ERRORS', ''),
+                        help="Injected errors, e.g. 429:0.02,500:0.01,timeout:0.005")
+    parser.add_argument('--timeout-seconds', type=float, default=120,
+                        help="How long injected timeouts hang")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = serve(
+        args.host, args.port,
+        responses=load_responses(args.responses),
+        latency=args.latency,
+        errors=args.errors,
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed
+    )
+    print(f"🧪 Mock LLM server listening on http://{args.host}:{server.server_address[1]}/v1/chat/completions")
+    print(f"   Latency: {args.latency}  Errors: {args.errors or 'none'}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+RecipeSnap - Page Reader
+Incremental decoding of recipe page downloads. Bodies are read chunk by chunk,
+non-HTML responses are rejected before any body is read, and the download
+stops at a byte cap or as soon as the recipe has been captured, so large pages
+don't cost time and memory for content that is never used.
+"""
+
+import os
+import re
+import codecs
+from dotenv import load_dotenv
+from html_reducer import HTMLReducer, recipe_region_complete
+from structured_data import StructuredRecipeWatcher
+
+load_dotenv()
+
+# Content types we try to extract recipes from
+HTML_CONTENT_TYPES = {'text/html', 'application/xhtml+xml', 'text/plain'}
+
+# How far into the page to look for a <meta charset>
+CHARSET_SNIFF_BYTES = 4096
+
+CHARSET_PARAM_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def check_content_type(content_type):
+    """
+    Reject responses that can't contain a recipe page.
+
+    Args:
+        content_type (str): Content-Type response header (None if missing)
+
+    Raises:
+        Exception: If the content type isn't HTML
+    """
+    mime = (content_type or '').split(';')[0].strip().lower()
+    if mime and mime not in HTML_CONTENT_TYPES:
+        raise Exception(f"Unsupported content type: {mime}")
+
+
+def _valid_charset(name):
+    """Return the codec name for a charset label, or None if Python doesn't know it."""
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def detect_charset(content_type, head):
+    """
+    Pick the charset of a page from its first bytes.
+
+    Checks, in order: a byte order mark, the Content-Type charset parameter and a
+    <meta charset> / http-equiv declaration, falling back to UTF-8.
+
+    Args:
+        content_type (str): Content-Type response header (None if missing)
+        head (bytes): The first bytes of the body
+
+    Returns:
+        str: Codec name
+    """
+    for bom, charset in BOMS:
+        if head.startswith(bom):
+            return charset
+
+    match = CHARSET_PARAM_RE.search(content_type or '')
+    if match and _valid_charset(match.group(1)):
+        return _valid_charset(match.group(1))
+
+    match = META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+    if match and _valid_charset(match.group(1).decode('ascii', errors='ignore')):
+        return _valid_charset(match.group(1).decode('ascii'))
+
+    return 'utf-8'
+
+
+class PageReader:
+    """
+    Decodes a page body fed in byte chunks and decides when to stop downloading.
+
+    Call feed() for each chunk until it returns True, then close() for the page text.
+    """
+
+    def __init__(self, content_type=None, max_bytes=None, token_budget=6000, early_stop=None):
+        """
+        Initialize the reader.
+
+        Args:
+            content_type (str): Content-Type response header
+            max_bytes (int): Maximum body bytes read. If not provided, reads from
+                PAGE_MAX_BYTES env var (default 2 MiB).
+            token_budget (int): Prompt token budget, used to tell when the recipe region is captured
+            early_stop (bool): Stop once the recipe is captured. If not provided, reads from
+                PAGE_EARLY_STOP env var (default true).
+
+        Raises:
+            Exception: If the content type isn't HTML
+        """
+        check_content_type(content_type)
+        self.content_type = content_type
+        self.max_bytes = max_bytes or int(os.getenv('PAGE_MAX_BYTES', 2 * 1024 * 1024))
+        self.token_budget = token_budget
+        if early_stop is None:
+            early_stop = os.getenv('PAGE_EARLY_STOP', 'true').lower() != 'false'
+        self.early_stop = early_stop
+
+        self.bytes_read = 0
+        self.charset = None
+        self.truncated = False
+        self.stopped_early = False
+
+        self._decoder = None
+        self._head = b''
+        self._parts = []
+        self._reducer = HTMLReducer()
+        # The reducer fed the page, once it is closed, so callers needn't parse it again
+        self.reducer = None
+        self._watcher = StructuredRecipeWatcher()
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the body.
+
+        Args:
+            chunk (bytes): Next bytes of the response body
+
+        Returns:
+            bool: True when the rest of the body should not be read
+        """
+        remaining = self.max_bytes - self.bytes_read
+        # Truncated only once a byte past the cap arrives: a page of exactly max_bytes is complete
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+
+        if self._decoder is None:
+            # Wait for enough bytes to sniff a <meta charset> before decoding anything
+            self._head += chunk
+            if len(self._head) < CHARSET_SNIFF_BYTES and not self.truncated:
+                return False
+            self._start_decoding()
+        else:
+            self._decode(chunk)
+
+        if self.truncated:
+            return True
+        # Both checks only look at what the reducer has added since the last chunk
+        if self.early_stop and (
+            self._watcher.check(self._reducer.json_ld) or recipe_region_complete(self._reducer, self.token_budget)
+        ):
+            self.stopped_early = True
+            return True
+        return False
+
+    def _start_decoding(self):
+        """Pick the charset from the buffered head of the page and decode it."""
+        self.charset = detect_charset(self.content_type, self._head)
+        self._decoder = codecs.getincrementaldecoder(self.charset)(errors='replace')
+        head, self._head = self._head, b''
+        self._decode(head)
+
+    def _decode(self, chunk, final=False):
+        """Decode bytes and hand the text to the recipe detectors."""
+        text = self._decoder.decode(chunk, final)
+        if not text:
+            return
+        self._parts.append(text)
+        if self.early_stop:
+            self._reducer.feed(text)
+
+    def close(self):
+        """
+        Finish reading.
+
+        Returns:
+            str: The decoded page text. With early stop on, reducer then holds an
+                HTMLReducer that was fed the same text.
+        """
+        if self._decoder is None:
+            self._start_decoding()
+        self._decode(b'', final=True)
+        if self.early_stop:
+            self._reducer.close()
+            self.reducer = self._reducer
+        return ''.join(self._parts)
+
+
+def read_page(content_type, chunks, max_bytes=None, token_budget=6000):
+    """
+    Read a page body from an iterable of byte chunks, stopping as early as possible.
+
+    Args:
+        content_type (str): Content-Type response header
+        chunks (iterable): Body chunks, e.g. response.iter_content(http_client.CHUNK_SIZE)
+        max_bytes (int): Maximum body bytes read (see PageReader)
+        token_budget (int): Prompt token budget
+
+    Returns:
+        tuple: (page text, PageReader with bytes_read, charset, truncated and stopped_early)
+    """
+    reader = PageReader(content_type, max_bytes=max_bytes, token_budget=token_budget)
+    for chunk in chunks:
+        if reader.feed(chunk):
+            break
+    return reader.close(), reader
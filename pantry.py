@@ -0,0 +1,300 @@
+"""
+RecipeSnap - Pantry Matching
+Finds stored recipes that can be cooked from a list of ingredients on hand.
+Ingredient lines are reduced to normalized names (ingredient_parser turns
+"2 cloves garlic, minced" into "garlic") that form a vocabulary, and recipes
+are held as a sparse recipe x ingredient matrix, kept in both CSR (a recipe's
+ingredients) and CSC (an ingredient's recipes) form. A pantry query gathers the recipes of the
+ingredients it covers and scores every recipe in one vectorized NumPy pass.
+"""
+
+import os
+import logging
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from ingredient_parser import ingredient_names
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Assumed to be in every kitchen unless the caller says otherwise
+STAPLES = ('salt', 'pepper', 'black pepper', 'water')
+
+
+class PantryIndex:
+    """Sparse recipe x ingredient index over a RecipeStore, scored with NumPy."""
+
+    def __init__(self, store, refresh_interval=None):
+        """
+        Initialize an empty index. Call start() to load it from the store and keep
+        it up to date in the background, or refresh() to load it once.
+
+        Args:
+            store (RecipeStore): Store of extracted recipes to index
+            refresh_interval (float): Seconds between checks for newly stored recipes. If not
+                provided, reads from PANTRY_REFRESH_SECONDS env var (default 30).
+        """
+        self.store = store
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None
+            else float(os.getenv('PANTRY_REFRESH_SECONDS', 30))
+        )
+
+        # Ingredient vocabulary: name -> column, and word -> columns whose names contain it
+        self.vocabulary = {}
+        self._names = []
+        self._columns_by_word = {}
+
+        # Row metadata, and the row holding each recipe's latest version
+        self._recipes = []
+        self._row_of = {}
+        self._hashes = {}
+
+        # CSR (indptr, indices), CSC (column indptr, rows) and which rows are current
+        self._matrix = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                        np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=bool))
+
+        # _lock guards swapping in a new index; _refresh_lock keeps refreshes one at a time
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._watermark = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Load the index in a background thread, then pick up new recipes every refresh_interval."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='pantry-index', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the background refresh.
+
+        Args:
+            timeout (float): Seconds to wait for a refresh in progress
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _refresh_loop(self):
+        """Background thread: refresh now and then every refresh_interval until stopped."""
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the index we have and try again next time
+                logger.warning("Could not refresh the pantry index: %s", e)
+            if self._stopped.wait(self.refresh_interval):
+                return
+
+    def refresh(self):
+        """
+        Index recipes stored or updated since the last refresh.
+
+        The new index is built on copies, without holding the lock queries take,
+        and swapped in at the end; queries in progress keep the one they started with.
+        Once replaced versions make up a quarter of the rows, they are compacted away.
+        """
+        with self._refresh_lock:
+            vocabulary, names = dict(self.vocabulary), list(self._names)
+            columns_by_word = dict(self._columns_by_word)
+            recipes, row_of, hashes = list(self._recipes), dict(self._row_of), dict(self._hashes)
+
+            def column(name):
+                found = vocabulary.get(name)
+                if found is None:
+                    found = vocabulary[name] = len(names)
+                    names.append(name)
+                    for word in name.split():
+                        # New sets rather than add(): the old index may be in use
+                        columns_by_word[word] = columns_by_word.get(word, frozenset()) | {found}
+                return found
+
+            indptr, indices, _, _, alive = self._matrix
+            new_indptr, new_indices, replaced = [], [], []
+            nonzeros = len(indices)
+            watermark = self._watermark
+            # Re-read a few seconds back: another process may commit a write stamped just before our last read
+            for recipe_id, url, title, site, recipe, digest, updated_at in self.store.changed_since(
+                max(self._watermark - 5, 0)
+            ):
+                watermark = max(watermark, updated_at)
+                if hashes.get(recipe_id) == digest:
+                    continue
+                if recipe_id in row_of:
+                    replaced.append(row_of[recipe_id])
+
+                columns = sorted({
+                    column(name)
+                    for line in recipe.get('ingredients') or []
+                    for name in ingredient_names(line)
+                })
+                row_of[recipe_id] = len(recipes)
+                hashes[recipe_id] = digest
+                recipes.append({'title': title or 'Untitled Recipe', 'url': url, 'site': site})
+                new_indices.extend(columns)
+                nonzeros += len(columns)
+                new_indptr.append(nonzeros)
+
+            self._watermark = watermark
+            if not new_indptr:
+                return
+
+            indptr = np.concatenate((indptr, np.array(new_indptr, dtype=np.int64)))
+            indices = np.concatenate((indices, np.array(new_indices, dtype=np.int32)))
+            alive = np.concatenate((alive, np.ones(len(new_indptr), dtype=bool)))
+            alive[replaced] = False
+            if (~alive).sum() * 4 >= len(alive):
+                indptr, indices, alive, recipes, row_of = self._compact(indptr, indices, alive, recipes, row_of)
+
+            # Rebuild the CSC copy: sort the nonzeros by column, keeping rows in order
+            rows = np.repeat(np.arange(len(alive), dtype=np.int32), np.diff(indptr))
+            order = np.argsort(indices, kind='stable')
+            column_indptr = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=len(names)))))
+            matrix = (indptr, indices, column_indptr, rows[order], alive)
+
+            # Swap in the new index at once
+            with self._lock:
+                self.vocabulary, self._names, self._columns_by_word = vocabulary, names, columns_by_word
+                self._recipes, self._row_of, self._hashes = recipes, row_of, hashes
+                self._matrix = matrix
+        logger.info("Pantry index: %d recipes added, %d ingredients known", len(new_indptr), len(names))
+
+    @staticmethod
+    def _compact(indptr, indices, alive, recipes, row_of):
+        """
+        Drop replaced rows from the CSR arrays and renumber the rest.
+
+        Returns:
+            tuple: (indptr, indices, alive, recipes, row_of) for the live rows only
+        """
+        keep = np.flatnonzero(alive)
+        lengths = np.diff(indptr)
+        indices = indices[np.repeat(alive, lengths)]
+        indptr = np.concatenate(([0], np.cumsum(lengths[keep]))).astype(np.int64)
+        new_row = np.full(len(alive), -1, dtype=np.int64)
+        new_row[keep] = np.arange(len(keep))
+        recipes = [recipes[row] for row in keep]
+        row_of = {recipe_id: int(new_row[row]) for recipe_id, row in row_of.items()}
+        return indptr, indices, np.ones(len(keep), dtype=bool), recipes, row_of
+
+    def _pantry_columns(self, pantry, assume_staples):
+        """
+        Find the vocabulary columns a pantry covers.
+
+        A pantry item covers every ingredient whose name contains all its words,
+        so "flour" covers "all purpose flour". Staples only cover exact names, so
+        "pepper" doesn't cover "red bell pepper".
+
+        Returns:
+            tuple: (pantry columns, staple columns not already among them)
+        """
+        columns = set()
+        for item in pantry:
+            for name in ingredient_names(item):
+                matches = None
+                for word in name.split():
+                    found = self._columns_by_word.get(word, set())
+                    matches = found if matches is None else matches & found
+                columns |= matches or set()
+        staples = set()
+        if assume_staples:
+            staples = {self.vocabulary[name] for name in STAPLES if name in self.vocabulary} - columns
+        return list(columns), list(staples)
+
+    def match(self, pantry, limit=10, max_missing=None, assume_staples=True):
+        """
+        Rank stored recipes by how much of each a pantry covers. The index isn't
+        refreshed here (see start), so a query never waits for the store.
+
+        Args:
+            pantry (list): Ingredients on hand (e.g. ["eggs", "flour", "milk"])
+            limit (int): Maximum number of recipes returned
+            max_missing (int): Only return recipes missing at most this many ingredients
+            assume_staples (bool): Treat salt, pepper and water as always on hand
+
+        Returns:
+            list: Recipes using at least one pantry item, fewest missing ingredients
+            first, then highest coverage:
+            [
+                {
+                    "title": str,
+                    "url": str,
+                    "site": str,
+                    "ingredients": int,
+                    "matched": int,
+                    "missing_count": int,
+                    "coverage": float,
+                    "missing": [str, ...]
+                },
+                ...
+            ]
+        """
+        with self._lock:
+            indptr, indices, column_indptr, column_rows, alive = self._matrix
+            recipes, names = self._recipes, self._names
+            columns, staples = self._pantry_columns(pantry, assume_staples)
+        if not len(alive) or limit <= 0:
+            return []
+
+        have = np.zeros(len(column_indptr) - 1, dtype=bool)
+        have[columns + staples] = True
+
+        # Count how many of each recipe's ingredients are on hand from those columns' recipe lists
+        def count(selected):
+            hits = [column_rows[column_indptr[column]:column_indptr[column + 1]] for column in selected]
+            return np.bincount(
+                np.concatenate(hits) if hits else np.zeros(0, dtype=np.int32), minlength=len(alive)
+            )
+        from_pantry = count(columns)
+        matched = from_pantry + count(staples)
+        totals = np.diff(indptr)
+        missing = totals - matched
+        coverage = matched / np.maximum(totals, 1)
+
+        # Staples alone don't make a recipe a match
+        candidate = alive & (from_pantry > 0)
+        if max_missing is not None:
+            candidate &= missing <= max_missing
+        candidates = np.flatnonzero(candidate)
+        if not len(candidates):
+            return []
+
+        # Fewest missing first, ties broken by coverage; coverage is at most 1 so it never outweighs a missing item
+        key = missing[candidates] - coverage[candidates] * 0.5
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(key, limit - 1)[:limit]]
+            key = missing[candidates] - coverage[candidates] * 0.5
+        top = candidates[np.argsort(key, kind='stable')]
+
+        results = []
+        for row in top:
+            row_columns = indices[indptr[row]:indptr[row + 1]]
+            results.append({
+                **recipes[row],
+                'ingredients': int(totals[row]),
+                'matched': int(matched[row]),
+                'missing_count': int(missing[row]),
+                'coverage': round(float(coverage[row]), 3),
+                'missing': [names[column] for column in row_columns[~have[row_columns]]]
+            })
+        return results
+
+    def stats(self):
+        """
+        Return index counters.
+
+        Returns:
+            dict: recipes indexed, vocabulary size and recipe-ingredient pairs stored
+        """
+        indptr, indices, _, _, alive = self._matrix
+        return {
+            'recipes': int(alive.sum()),
+            'ingredients': len(self._names),
+            'entries': int(len(indices))
+        }
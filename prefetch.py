@@ -0,0 +1,162 @@
+"""
+RecipeSnap - Search Result Prefetcher
+Speculatively extracts the top results of a recipe search in the background so
+the recipe a user clicks is usually already in the extraction cache. Runs on a
+small bounded worker pool with its own budget, so prefetching can never crowd
+out requests users are actually waiting on.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from recipe_cache import MemoryCache, normalize_url
+from logging_setup import bind_context
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Background extraction of likely-to-be-clicked search results."""
+
+    def __init__(self, extractor, top_n=None, workers=None, max_pending=None, max_per_hour=None,
+                 recent_ttl=None):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            extractor (RecipeExtractor): Extractor whose cache the prefetched recipes land in
+            top_n (int): Results prefetched per search. If not provided, reads from
+                PREFETCH_TOP_N env var (default 3).
+            workers (int): Concurrent prefetches. If not provided, reads from
+                PREFETCH_WORKERS env var (default 2).
+            max_pending (int): Queued plus running prefetches before new ones are dropped.
+                If not provided, reads from PREFETCH_MAX_PENDING env var (default 20).
+            max_per_hour (int): Prefetches started per rolling hour. If not provided,
+                reads from PREFETCH_MAX_PER_HOUR env var (default 200).
+            recent_ttl (int): Seconds a URL is skipped after being prefetched. If not
+                provided, reads from PREFETCH_RECENT_TTL env var (default 600).
+        """
+        self.extractor = extractor
+        self.top_n = top_n or int(os.getenv('PREFETCH_TOP_N', 3))
+        self.workers = workers or int(os.getenv('PREFETCH_WORKERS', 2))
+        self.max_pending = max_pending or int(os.getenv('PREFETCH_MAX_PENDING', 20))
+        self.max_per_hour = max_per_hour or int(os.getenv('PREFETCH_MAX_PER_HOUR', 200))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Start times of prefetches in the last hour
+        self._window = []
+        # URLs prefetched recently, so repeated searches don't re-fetch the same pages
+        self._recent = MemoryCache(
+            ttl=recent_ttl if recent_ttl is not None else int(os.getenv('PREFETCH_RECENT_TTL', 600)),
+            max_entries=self.max_per_hour
+        )
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def prefetch_results(self, results):
+        """
+        Queue the top search results for background extraction.
+
+        Args:
+            results (list): Search results as returned by RecipeSearcher.search_recipes
+        """
+        for result in results[:self.top_n]:
+            url = result.get('url')
+            if url:
+                self.prefetch(url)
+
+    def prefetch(self, url):
+        """
+        Queue one URL for background extraction, unless it was prefetched recently
+        or the budget is used up.
+
+        Args:
+            url (str): Recipe URL
+
+        Returns:
+            bool: True if the URL was queued
+        """
+        key = normalize_url(url)
+        now = time.time()
+
+        with self._lock:
+            if self._recent.get(key) is not None:
+                self.skipped += 1
+                return False
+
+            self._window = [t for t in self._window if now - t < 3600]
+            if self._pending >= self.max_pending or len(self._window) >= self.max_per_hour:
+                self.dropped += 1
+                return False
+
+            self._recent.set(key, True)
+            self._window.append(now)
+            self._pending += 1
+            self.submitted += 1
+
+        try:
+            future = self._executor.submit(bind_context(self._run), url)
+        except RuntimeError:
+            # Shut down since the budget check
+            self._release(key, cancelled=True)
+            with self._lock:
+                self.submitted -= 1
+                self.dropped += 1
+            return False
+        # Runs when the prefetch finishes or is cancelled while still queued
+        future.add_done_callback(lambda f: self._release(key, f.cancelled()))
+        return True
+
+    def _release(self, key, cancelled):
+        """Free a prefetch's pending slot; a URL that was never extracted may be prefetched again."""
+        with self._lock:
+            self._pending -= 1
+        if cancelled:
+            self._recent.delete(key)
+
+    def _run(self, url):
+        """Extract a URL into the cache, swallowing errors (nobody is waiting on it)."""
+        try:
+            self.extractor.extract_recipe(url)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            logger.warning("Prefetch failed for %s: %s", url, e)
+            with self._lock:
+                self.failed += 1
+
+    def stats(self):
+        """
+        Return prefetch counters.
+
+        Returns:
+            dict: submitted, completed, failed, skipped (recently prefetched),
+            dropped (over budget), pending and started_last_hour
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'skipped': self.skipped,
+                'dropped': self.dropped,
+                'pending': self._pending,
+                'started_last_hour': sum(1 for t in self._window if now - t < 3600),
+                'max_per_hour': self.max_per_hour
+            }
+
+    def shutdown(self, wait=False):
+        """Stop accepting work; queued prefetches are cancelled unless wait is True."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,587 @@
+"""
+RecipeSnap - Recipe Cache
+Durable SQLite-backed cache for extracted recipes, plus a bounded in-memory
+LRU cache. Extraction entries are content-addressed (normalized URL + page
+body hash + prompt version), expire after a TTL and are evicted
+least-recently-used once the cache is full. Fetched pages are kept compressed
+with their HTTP validators so they can be re-validated with conditional GETs.
+Appliance instructions are cached separately, keyed by the recipe they adapt.
+"""
+
+import os
+import copy
+import json
+import time
+import zlib
+import base64
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Query parameters that never change page content and only fragment the cache
+TRACKING_PARAMS = {
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src'
+}
+
+
+def normalize_url(url):
+    """
+    Normalize a URL so that equivalent links share a cache key.
+
+    Lowercases the scheme and host, drops the fragment, default ports and
+    tracking parameters, and sorts the query string. The path is kept as is:
+    "www." hosts and trailing slashes can serve different pages.
+
+    Args:
+        url (str): The URL to normalize
+
+    Returns:
+        str: The normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    userinfo, at, host = parts.netloc.rpartition('@')
+    host = host.lower()
+    if host.endswith(':80') and scheme == 'http':
+        host = host[:-3]
+    elif host.endswith(':443') and scheme == 'https':
+        host = host[:-4]
+
+    path = parts.path or '/'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, userinfo + at + host, path, query, ''))
+
+
+def content_hash(text):
+    """Return a stable SHA-256 hex digest of page content."""
+    return hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache bounded by entry count and approximate size, with TTL expiry."""
+
+    def __init__(self, ttl=3600, max_entries=1000, max_bytes=10 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (int): Seconds before an entry expires
+            max_entries (int): Maximum number of entries
+            max_bytes (int): Maximum total size of entries, measured as their JSON length
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, size), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Expired entries are swept proactively at this interval, not just when re-queried
+        self._sweep_interval = max(min(ttl / 10, 60), 1)
+        self._next_sweep = time.time() + self._sweep_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            A copy of the cached value, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if now >= entry[1]:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may modify what they get back; the cached value is never handed out
+        return copy.deepcopy(entry[0])
+
+    def peek(self, key):
+        """
+        Look up a cached value without counting a hit or miss or refreshing its recency.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            A copy of the cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.time() >= entry[1]:
+            return None
+        return copy.deepcopy(entry[0])
+
+    def set(self, key, value):
+        """
+        Store a value, evicting least recently used entries to stay within bounds.
+
+        Args:
+            key (str): Cache key
+            value: JSON-serializable value
+        """
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+
+        value = copy.deepcopy(value)
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, now + self.ttl, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Remove a value if cached.
+
+        Args:
+            key (str): Cache key
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        """Drop an entry (caller holds the lock)."""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _maybe_sweep(self, now):
+        """Drop every expired entry if the sweep interval has passed (caller holds the lock)."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self._sweep_interval
+        for key in [k for k, (_, expires_at, _) in self._entries.items() if now >= expires_at]:
+            self._remove(key)
+            self.expirations += 1
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """
+        Return cache counters.
+
+        Returns:
+            dict: entries, bytes, hits, misses, evictions, expirations and hit_rate
+        """
+        with self._lock:
+            entries, size = len(self._entries), self._bytes
+            hits, misses = self.hits, self.misses
+            evictions, expirations = self.evictions, self.expirations
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'expirations': expirations,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SQLiteCache:
+    """Thread-safe key/value cache stored in SQLite with TTL and LRU eviction."""
+
+    def __init__(self, path, table='cache', ttl=86400, max_entries=5000):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): Path to the SQLite database file (":memory:" for a private cache)
+            table (str): Table name, so several caches can share one database file
+            ttl (int): Seconds before an entry expires
+            max_entries (int): Maximum number of entries kept before LRU eviction
+        """
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # timeout: wait for other worker processes' writes instead of failing
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+        )
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if now - created_at >= self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+
+        return json.loads(value)
+
+    def peek(self, key):
+        """
+        Look up a cached value without counting a hit or miss or refreshing its recency.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """
+        Store a JSON-serializable value, evicting the least recently used entries if full.
+
+        Args:
+            key (str): Cache key
+            value: JSON-serializable value
+        """
+        now = time.time()
+        encoded = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                f"VALUES (?, ?, ?, ?)",
+                (key, encoded, now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        cursor = self._conn.execute(
+            f"DELETE FROM {self.table} WHERE created_at <= ?", (time.time() - self.ttl,)
+        )
+        self.expirations += max(cursor.rowcount, 0)
+
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self):
+        """
+        Return cache counters.
+
+        Returns:
+            dict: entries, hits, misses, evictions, expirations and hit_rate
+        """
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            hits, misses = self.hits, self.misses
+            evictions, expirations = self.evictions, self.expirations
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'expirations': expirations,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class ExtractionCache(SQLiteCache):
+    """Content-addressed cache of RecipeExtractor.extract_recipe results."""
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        """
+        Initialize the extraction cache.
+
+        Args:
+            path (str): SQLite file. If not provided, reads from RECIPE_CACHE_PATH env var.
+            ttl (int): Entry lifetime in seconds. If not provided, reads from RECIPE_CACHE_TTL env var.
+            max_entries (int): LRU capacity. If not provided, reads from RECIPE_CACHE_MAX_ENTRIES env var.
+        """
+        super().__init__(
+            path or os.getenv('RECIPE_CACHE_PATH', 'recipe_cache.sqlite3'),
+            table='extractions',
+            ttl=ttl if ttl is not None else int(os.getenv('RECIPE_CACHE_TTL', 7 * 86400)),
+            max_entries=max_entries if max_entries is not None else int(os.getenv('RECIPE_CACHE_MAX_ENTRIES', 5000))
+        )
+
+    @staticmethod
+    def make_key(url, page_hash, prompt_version):
+        """
+        Build the content-addressed key for an extraction.
+
+        Args:
+            url (str): Recipe URL (normalized here)
+            page_hash (str): Hash of the fetched page body
+            prompt_version (str): Version of the extraction prompt
+
+        Returns:
+            str: Cache key
+        """
+        raw = f"{normalize_url(url)}\n{page_hash}\n{prompt_version}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ApplianceCache(SQLiteCache):
+    """Appliance instructions generated for a recipe, keyed by the recipe's content."""
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        """
+        Initialize the appliance cache.
+
+        Args:
+            path (str): SQLite file. If not provided, reads from APPLIANCE_CACHE_PATH env var,
+                falling back to the extraction cache file.
+            ttl (int): Entry lifetime in seconds. If not provided, reads from APPLIANCE_CACHE_TTL env var.
+            max_entries (int): LRU capacity. If not provided, reads from APPLIANCE_CACHE_MAX_ENTRIES env var.
+        """
+        super().__init__(
+            path or os.getenv('APPLIANCE_CACHE_PATH') or os.getenv('RECIPE_CACHE_PATH', 'recipe_cache.sqlite3'),
+            table='appliances',
+            ttl=ttl if ttl is not None else int(os.getenv('APPLIANCE_CACHE_TTL', 30 * 86400)),
+            max_entries=max_entries if max_entries is not None else int(os.getenv('APPLIANCE_CACHE_MAX_ENTRIES', 5000))
+        )
+
+    @staticmethod
+    def make_key(recipe, prompt_version):
+        """
+        Build the key for a recipe's appliance instructions.
+
+        The same recipe found at different URLs shares an entry.
+
+        Args:
+            recipe (dict): Recipe with title, ingredients and directions
+            prompt_version (str): Version of the appliance prompt
+
+        Returns:
+            str: Cache key
+        """
+        raw = json.dumps(
+            [recipe.get('title'), recipe.get('ingredients') or [], recipe.get('directions') or [], prompt_version],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class PageCache(SQLiteCache):
+    """Compressed page bodies with their ETag/Last-Modified validators, for conditional GETs."""
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        """
+        Initialize the page cache.
+
+        Args:
+            path (str): SQLite file. If not provided, reads from PAGE_CACHE_PATH env var,
+                falling back to the extraction cache file.
+            ttl (int): Entry lifetime in seconds. If not provided, reads from PAGE_CACHE_TTL env var.
+            max_entries (int): LRU capacity. If not provided, reads from PAGE_CACHE_MAX_ENTRIES env var.
+        """
+        super().__init__(
+            path or os.getenv('PAGE_CACHE_PATH') or os.getenv('RECIPE_CACHE_PATH', 'recipe_cache.sqlite3'),
+            table='pages',
+            ttl=ttl if ttl is not None else int(os.getenv('PAGE_CACHE_TTL', 30 * 86400)),
+            max_entries=max_entries if max_entries is not None else int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 2000))
+        )
+        self.not_modified = 0
+
+    def get_page(self, url):
+        """
+        Look up the stored copy of a page. The body stays compressed until
+        PageCache.body is called, so a 304 that only needs the page hash never
+        decompresses it.
+
+        Args:
+            url (str): Page URL (normalized here)
+
+        Returns:
+            dict: {"compressed": str, "characters": int, "etag": str or None,
+            "last_modified": str or None, "page_hash": str or None},
+            or None if the page isn't cached
+        """
+        entry = self.get(normalize_url(url))
+        if entry is None:
+            return None
+        return {
+            'compressed': entry['body'],
+            'characters': entry.get('characters', 0),
+            'etag': entry['etag'],
+            'last_modified': entry['last_modified'],
+            'page_hash': entry.get('page_hash')
+        }
+
+    @staticmethod
+    def body(entry):
+        """
+        Decompress the body of a stored page.
+
+        Args:
+            entry (dict): Stored page from get_page
+
+        Returns:
+            str: Page HTML
+        """
+        return zlib.decompress(base64.b64decode(entry['compressed'])).decode('utf-8')
+
+    def set_page(self, url, body, etag=None, last_modified=None, page_hash=None):
+        """
+        Store a page body with its validators. Pages without validators are not stored,
+        since they can never be re-validated.
+
+        Args:
+            url (str): Page URL (normalized here)
+            body (str): Page HTML
+            etag (str): ETag response header
+            last_modified (str): Last-Modified response header
+            page_hash (str): Hash the page's extraction is cached under, so a 304 can
+                look the extraction up without parsing the page again
+        """
+        if not etag and not last_modified:
+            return
+        compressed = base64.b64encode(zlib.compress(body.encode('utf-8'), 6)).decode('ascii')
+        self.set(normalize_url(url), {
+            'body': compressed, 'characters': len(body), 'etag': etag, 'last_modified': last_modified,
+            'page_hash': page_hash
+        })
+
+    def mark_not_modified(self, url):
+        """Restart the TTL of a page the server confirmed is unchanged (HTTP 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE {self.table} SET created_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, normalize_url(url))
+            )
+            self.not_modified += 1
+
+    @staticmethod
+    def conditional_headers(entry):
+        """
+        Build conditional GET headers for a stored page.
+
+        Args:
+            entry (dict): Stored page from get_page, or None
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers (empty if nothing is stored)
+        """
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def stats(self):
+        """
+        Return cache counters.
+
+        Returns:
+            dict: SQLiteCache counters plus not_modified (pages re-validated with a 304)
+        """
+        stats = super().stats()
+        with self._lock:
+            stats['not_modified'] = self.not_modified
+        return stats
@@ -1,46 +1,101 @@
 """
 RecipeSnap - Recipe Extractor
 This script extracts recipes from URLs using AI, matching the output format from the Recipes repo.
-Uses Writer's Palmyra X5 API.
+Uses Writer's Palmyra X5 API by default; see llm_backends.py for other backends.
 """
 
 import os
+import re
 import json
-import requests
+import logging
 from dotenv import load_dotenv
+from http_client import CHUNK_SIZE, get_session
+from recipe_cache import ApplianceCache, PageCache, content_hash, normalize_url
+from singleflight import SingleFlight
+import metrics
+from structured_data import extract_structured_recipe
+from html_reducer import build_payload, reduce_html
+from llm_backends import StreamDecoder, create_backend
+from page_reader import read_page
+from response_parser import (
+    IncrementalRecipeParser, parse_recipe_response, loads_first_object, validate_appliance_instructions
+)
+from logging_setup import setup_logging
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Prompt matching the Recipes repo approach
+APPLIANCE_PROMPT_SECTION = """
+After extracting the main instructions, please analyze them.
+1. If the recipe involves using a pressure cooker, add a set of specific, alternative instructions under the appliance name "Instant Pot" in the "applianceInstructions" field.
+2. If the recipe involves baking or air frying, add a set of specific, alternative instructions under the appliance name "Breville Smart Oven Toaster Pro" in the "applianceInstructions" field.
+
+If neither of these conditions are met, the "applianceInstructions" field MUST be an empty array [].
+"""
+
+# Reply fields that trigger a "partial" event when they finish streaming
+PARTIAL_FIELDS = ('recipeName', 'ingredients', 'instructions')
+
+# Recipes that could be adapted for the Instant Pot or Breville Smart Oven
+APPLIANCE_KEYWORDS_RE = re.compile(
+    r'pressure[- ]cook|instant pot|\bbak(e|ed|es|ing)\b|\boven\b|air[- ]?fr(y|yer|ied|ying)',
+    re.IGNORECASE
+)
+
 
 class RecipeExtractor:
     """Extracts and formats recipes from URLs using AI."""
-    
-    def __init__(self, api_key=None):
+
+    # Bump whenever the prompt or output format changes so cached extractions are invalidated
+    PROMPT_VERSION = "5"
+
+    # Bump whenever the appliance prompt changes so cached appliance instructions are invalidated
+    APPLIANCE_PROMPT_VERSION = "1"
+
+    def __init__(self, api_key=None, cache=None, token_budget=None, session=None, page_cache=None,
+                 backend=None, appliance_cache=None, store=None):
         """
         Initialize the recipe extractor.
 
         Args:
-            api_key (str): Writer API key. If not provided, reads from WRITER_API_KEY env var.
+            api_key (str): API key for the LLM backend. If not provided, the backend reads
+                its own env var (WRITER_API_KEY for the default Writer backend).
+            cache (ExtractionCache): Optional cache of previous extractions.
+            token_budget (int): Approximate token budget for page content in the prompt.
+                If not provided, reads from RECIPE_PROMPT_TOKEN_BUDGET env var (default 6000).
+            session (requests.Session): HTTP session to use. Defaults to the shared pooled session.
+            page_cache (PageCache): Optional store of fetched pages, re-validated with conditional GETs.
+            backend (LLMBackend): LLM backend to call. If not provided, created from the
+                LLM_BACKEND env var (writer, openai or local; default writer).
+            appliance_cache (ApplianceCache): Optional cache of generated appliance instructions.
+            store (RecipeStore): Optional recipe store that recipes extracted from fetched pages
+                are added to.
         """
-        self.api_key = api_key or os.getenv('WRITER_API_KEY')
-        if not self.api_key:
-            raise ValueError("Writer API key is required. Set WRITER_API_KEY environment variable.")
-
-        # Debug logging
-        print(f"🔑 API key loaded: {self.api_key[:10]}...{self.api_key[-4:]} (length: {len(self.api_key)})")
-
-        # Writer API endpoint
-        self.api_url = "https://api.writer.com/v1/chat"
-        self.model = "palmyra-x5"
+        self.cache = cache
+        self.page_cache = page_cache
+        self.appliance_cache = appliance_cache
+        self.store = store
+        self.session = session or get_session()
+        # Concurrent extractions of the same URL share one fetch and AI call
+        self._inflight = SingleFlight()
+        self.token_budget = token_budget or int(os.getenv('RECIPE_PROMPT_TOKEN_BUDGET', 6000))
+        self.backend = backend or create_backend(api_key=api_key)
     
-    def extract_recipe(self, url):
+    def extract_recipe(self, url, on_event=None):
         """
         Extract recipe from URL using AI.
         Matches the output format from the Recipes repo.
         
         Args:
             url (str): The recipe URL to extract
+            on_event (callable): Optional progress callback, called as on_event(event, data)
+                with events "fetched" (not_modified is true when the page was re-validated
+                with a 304), "cached", "structured", "reduced", "llm_started", "partial"
+                (the recipe so far, once the streamed reply has its title and ingredients),
+                "parsed" and "coalesced" (joined an identical extraction already in progress).
             
         Returns:
             dict: Structured recipe data with format:
@@ -48,54 +103,324 @@ class RecipeExtractor:
                 "recipeName": str,
                 "ingredients": [str, ...],
                 "instructions": [str, ...],
-                "applianceInstructions": [
-                    {
-                        "applianceName": str,
-                        "instructions": [str, ...]
-                    }
-                ]
+                "applianceInstructions": []
             }
+            applianceInstructions is always empty here; see appliance_instructions.
+            If the page couldn't be fetched, the recipe is the model's guess from the URL
+            alone and fetch_error holds the reason.
+        """
+        def join():
+            logger.info("Joining in-flight extraction for %s", url)
+            self._emit(on_event, 'coalesced')
+
+        with metrics.IN_FLIGHT.track(operation='extract'), metrics.stage('extract', 'total'):
+            recipe = self._inflight.do(
+                normalize_url(url), lambda: self._extract_recipe(url, on_event), on_wait=join
+            )
+        # Label a copy, so source_url never depends on how the result is shared between callers
+        recipe = dict(recipe)
+        recipe['source_url'] = url
+        return recipe
+
+    def _extract_recipe(self, url, on_event=None):
+        """Fetch and extract a recipe (see extract_recipe)."""
+        logger.info("Extracting recipe from %s", url)
+        with metrics.stage('extract', 'fetch'):
+            page = self._fetch_page(url)
+        self._emit(on_event, 'fetched', characters=self._page_characters(page), not_modified=page['not_modified'])
+
+        # Serve repeat extractions of unchanged pages (including 304s) from the cache,
+        # parsing the page at most once for the cache key, the fast path and the prompt
+        webpage_content, recipe, page_text, cache_key, cached = self._prepare_page(url, page, on_event)
+        if cached is not None:
+            self._emit(on_event, 'cached')
+            self._add_to_store(url, cached)
+            return cached
+
+        # Fast path: most recipe sites embed schema.org Recipe markup
+        if recipe:
+            logger.info("Found structured recipe data: %s", recipe['title'])
+            self._emit(on_event, 'structured', title=recipe['title'])
+        else:
+            recipe = self._extract_with_ai(url, page_text, on_event)
+            if not webpage_content:
+                # The model only had the URL to go on; flag it so callers can treat it as a failure
+                recipe['fetch_error'] = page['error'] or 'Page was empty'
+
+        self._emit(
+            on_event, 'parsed',
+            ingredients=len(recipe.get('ingredients', [])),
+            directions=len(recipe.get('directions', []))
+        )
+        with metrics.stage('extract', 'cache_store'):
+            self._store_cache(cache_key, recipe)
+            # A recipe guessed from the URL alone isn't worth finding again
+            if webpage_content:
+                self._add_to_store(url, recipe)
+        return recipe
+
+    def _fetch_page(self, url):
+        """
+        Fetch a recipe page, re-validating a stored copy with a conditional GET if there is one.
+
+        Args:
+            url (str): The recipe URL
+
+        Returns:
+            dict: The page from _page_from_response, plus "error" (message if the fetch
+                failed, else None) and "reducer" (HTMLReducer already fed the downloaded
+                page, or None)
         """
-        print(f"Extracting recipe from: {url}")
-        
-        # Fetch the webpage content
         try:
-            print("Fetching webpage content...")
-            page_response = requests.get(url, timeout=30, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            page_response.raise_for_status()
-            webpage_content = page_response.text
-            print(f"✓ Fetched {len(webpage_content)} characters from webpage")
+            logger.debug("Fetching webpage content")
+            stored = self.page_cache.get_page(url) if self.page_cache is not None else None
+            reader = None
+            headers = PageCache.conditional_headers(stored)
+            # Stream the body so large pages can be cut off early
+            try:
+                response = self.session.get(url, timeout=30, headers=headers or None, stream=True)
+            except Exception:
+                metrics.upstream('page', 'error')
+                raise
+            metrics.upstream('page', response.status_code)
+            with response:
+                if response.status_code >= 400:
+                    raise Exception(f"HTTP {response.status_code}")
+                text = ''
+                if response.status_code != 304:
+                    text, reader = read_page(
+                        response.headers.get('Content-Type'), response.iter_content(CHUNK_SIZE),
+                        token_budget=self.token_budget
+                    )
+                    self._log_page_read(reader)
+            complete = response.status_code == 304 or not (reader.stopped_early or reader.truncated)
+            page = self._page_from_response(url, stored, response.status_code, text, response.headers, complete)
+            page.update(error=None, reducer=reader.reducer if reader is not None else None)
+            return page
         except Exception as e:
-            print(f"Warning: Could not fetch webpage content: {e}")
-            webpage_content = None
-        
-        # Prompt matching the Recipes repo approach
-        appliance_prompt_section = """
-After extracting the main instructions, please analyze them.
-1. If the recipe involves using a pressure cooker, add a set of specific, alternative instructions under the appliance name "Instant Pot" in the "applianceInstructions" field.
-2. If the recipe involves baking or air frying, add a set of specific, alternative instructions under the appliance name "Breville Smart Oven Toaster Pro" in the "applianceInstructions" field.
+            logger.warning("Could not fetch webpage content from %s: %s", url, e)
+            return {'content': None, 'not_modified': False, 'stored': None, 'validators': None,
+                    'error': str(e), 'reducer': None}
 
-If neither of these conditions are met, the "applianceInstructions" field MUST be an empty array [].
-"""
+    @staticmethod
+    def _log_page_read(reader):
+        """Report when a page download was cut short."""
+        if reader.stopped_early:
+            logger.debug("Recipe captured after %d bytes, skipped the rest of the page", reader.bytes_read)
+        elif reader.truncated:
+            logger.warning("Page exceeds %d bytes, truncated", reader.max_bytes)
+
+    def _page_from_response(self, url, stored, status_code, text, headers, complete=True):
+        """
+        Resolve a page fetch against the page cache.
+
+        Args:
+            url (str): The recipe URL
+            stored (dict): Stored copy of the page from PageCache.get_page, or None
+            status_code (int): HTTP status of the fetch
+            text (str): Response body
+            headers: Response headers
+            complete (bool): False if the body was cut short; such pages aren't stored,
+                since a 304 would later vouch for the partial copy
+
+        Returns:
+            dict: {"content": page HTML (None after a 304; the stored copy is "stored"),
+                "not_modified": True if the stored copy was re-validated with a 304,
+                "stored": that stored copy or None, "validators": (etag, last_modified)
+                to store a complete page under once it's been parsed, or None}
+        """
+        if status_code == 304 and stored is not None:
+            self.page_cache.mark_not_modified(url)
+            logger.debug("Page not modified, reusing stored copy (%d characters)", stored['characters'])
+            return {'content': None, 'not_modified': True, 'stored': stored, 'validators': None}
+
+        logger.debug("Fetched %d characters from webpage", len(text))
+        validators = None
+        if self.page_cache is not None and complete:
+            headers = {k.lower(): v for k, v in headers.items()}
+            validators = (headers.get('etag'), headers.get('last-modified'))
+        return {'content': text, 'not_modified': False, 'stored': None, 'validators': validators}
+
+    @staticmethod
+    def _page_characters(page):
+        """Size of a fetched page, for the "fetched" event (a 304 reports its stored copy)."""
+        if page['stored'] is not None:
+            return page['stored']['characters']
+        return len(page['content'] or '')
+
+    def _prepare_page(self, url, page, on_event=None):
+        """
+        Look up a fetched page's previous extraction, parsing the page only if it has to.
+
+        A page re-validated with a 304 is looked up by the hash stored with it, without
+        decompressing or parsing the stored copy. Otherwise the page is parsed once
+        (see _analyze_page), and a complete page is stored with its hash for later
+        conditional GETs.
+
+        Args:
+            url (str): The recipe URL
+            page (dict): Fetched page from _fetch_page
+            on_event (callable): Optional progress callback (see extract_recipe)
+
+        Returns:
+            tuple: (page HTML or None, structured recipe or None, reduced prompt text or None,
+                cache_key, cached recipe or None); only cache_key and the cached recipe
+                are set when a 304 led straight to a cached extraction
+        """
+        stored = page['stored']
+        if stored is not None and stored['page_hash']:
+            with metrics.stage('extract', 'cache_lookup'):
+                cache_key, cached = self._lookup_cache(url, stored['page_hash'])
+            if cached is not None:
+                return None, None, None, cache_key, cached
 
-        if webpage_content:
+        # No hash stored with the page, or its extraction has expired: parse it after all
+        webpage_content = PageCache.body(stored) if stored is not None else page['content']
+        recipe, page_text, page_hash = self._analyze_page(url, webpage_content, page['reducer'], on_event)
+        validators = page['validators']
+        if stored is not None and stored['page_hash'] != page_hash:
+            validators = (stored['etag'], stored['last_modified'])
+        if validators is not None and webpage_content:
+            self.page_cache.set_page(url, webpage_content, *validators, page_hash=page_hash)
+
+        with metrics.stage('extract', 'cache_lookup'):
+            cache_key, cached = self._lookup_cache(url, page_hash)
+        return webpage_content, recipe, page_text, cache_key, cached
+
+    @staticmethod
+    def _emit(on_event, event, **data):
+        """Report extraction progress to an optional callback; callback errors never fail the extraction."""
+        if on_event is None:
+            return
+        try:
+            on_event(event, data)
+        except Exception as e:
+            logger.warning("Progress callback failed: %s", e)
+
+    def _lookup_cache(self, url, page_hash):
+        """
+        Look up a previous extraction of this exact page.
+
+        Args:
+            url (str): The recipe URL
+            page_hash (str): Hash of the page from _analyze_page, or None if the fetch failed
+
+        Returns:
+            tuple: (cache_key, cached recipe or None). cache_key is None when caching is off.
+        """
+        if self.cache is None or not page_hash:
+            return None, None
+
+        cache_key = self.cache.make_key(url, page_hash, self.PROMPT_VERSION)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached extraction for %s", url)
+            cached['source_url'] = url
+        return cache_key, cached
+
+    def _analyze_page(self, url, webpage_content, reducer=None, on_event=None):
+        """
+        Parse a page once for everything its extraction needs.
+
+        The page hash covers only the part of the page the extraction depends on:
+        downloads stopped early end wherever a network chunk happened to end, so
+        the raw body differs from one read of a page to the next, but its
+        structured recipe, or failing that its reduced prompt text, doesn't.
+
+        Args:
+            url (str): The recipe URL
+            webpage_content (str): Fetched page HTML, or None if the fetch failed
+            reducer (HTMLReducer): Reducer already fed the page while it downloaded, if any
+            on_event (callable): Optional progress callback (see extract_recipe)
+
+        Returns:
+            tuple: (structured recipe or None, reduced prompt text (None if the page has a
+                structured recipe), page hash); all None if there is no page
+        """
+        if not webpage_content:
+            return None, None, None
+
+        with metrics.stage('extract', 'structured_parse'):
+            recipe = extract_structured_recipe(webpage_content, url)
+        if recipe:
+            return recipe, None, content_hash(json.dumps(dict(recipe, source_url=''), sort_keys=True))
+
+        with metrics.stage('extract', 'prompt_build'):
+            if reducer is not None:
+                page_text = build_payload(reducer, self.token_budget)
+            else:
+                page_text = reduce_html(webpage_content, self.token_budget)
+        logger.debug("Reduced page to %d characters for the prompt", len(page_text))
+        self._emit(on_event, 'reduced', characters=len(page_text))
+        return None, page_text, content_hash(page_text)
+
+    def _store_cache(self, cache_key, recipe):
+        """Cache an extraction, but only if it actually produced a recipe."""
+        if cache_key and (recipe.get('ingredients') or recipe.get('directions')):
+            self.cache.set(cache_key, recipe)
+            logger.debug("Cached extraction for %s", recipe.get('source_url'))
+
+    def _add_to_store(self, url, recipe):
+        """Add an extracted recipe to the recipe store, if there is one, so local search can find it."""
+        if self.store is None:
+            return
+        try:
+            self.store.add(recipe, url)
+        except Exception as e:
+            # The extraction itself succeeded, so don't fail it over the index
+            logger.warning("Could not add %s to the recipe store: %s", url, e)
+
+    def _extract_with_ai(self, url, page_text, on_event=None):
+        """
+        Run the LLM extraction for a page.
+
+        Args:
+            url (str): The recipe URL
+            page_text (str): Reduced page text from _analyze_page, or None if the fetch failed
+            on_event (callable): Optional progress callback (see extract_recipe)
+
+        Returns:
+            dict: Structured recipe data (see extract_recipe)
+        """
+        with metrics.stage('extract', 'prompt_build'):
+            prompt = self._build_prompt(url, page_text)
+
+        try:
+            self._emit(on_event, 'llm_started', stage='recipe')
+            with metrics.stage('extract', 'llm'):
+                response_text = self._call_llm(prompt, on_delta=self._partial_emitter(url, on_event))
+            with metrics.stage('extract', 'parse'):
+                return self._parse_recipe_response(response_text, url)
+        except Exception as e:
+            logger.error("AI extraction error: %s", e)
+            raise Exception(f"AI extraction failed: {str(e)}")
+
+    def _build_prompt(self, url, page_text):
+        """
+        Build the extraction prompt for a page.
+
+        Args:
+            url (str): The recipe URL
+            page_text (str): Page reduced to its recipe text so the prompt stays small,
+                or None if the fetch failed
+
+        Returns:
+            str: The prompt
+        """
+        if page_text is not None:
             # Include the webpage content in the prompt
             prompt = f"""Extract the recipe information from the following webpage content.
 
 URL: {url}
 
 Webpage Content:
-{webpage_content[:50000]}
+{page_text}
 
 CRITICAL: Extract ALL of the following:
 1. Recipe name/title
 2. Complete list of ingredients with measurements
 3. Complete step-by-step cooking instructions/directions
 
-{appliance_prompt_section}
-
 Ignore all non-recipe content like stories, ads, comments, and navigation elements.
 
 Return ONLY a valid JSON object with this exact structure:
@@ -110,12 +435,6 @@ Return ONLY a valid JSON object with this exact structure:
     "Step 1: ...",
     "Step 2: ...",
     ...
-  ],
-  "applianceInstructions": [
-    {{
-      "applianceName": "Instant Pot",
-      "instructions": ["Step 1: ...", "Step 2: ..."]
-    }}
   ]
 }}
 
@@ -126,7 +445,6 @@ IMPORTANT REQUIREMENTS:
 - Make instructions clear, actionable, and complete
 - Number the instructions if they aren't already numbered (Step 1, Step 2, etc.)
 - The "instructions" array MUST contain all cooking steps - do not leave it empty
-- Only include applianceInstructions if the recipe can be adapted for Instant Pot or Breville Smart Oven
 - Return ONLY valid JSON, no other text or explanation"""
         else:
             # Fallback if we can't fetch the content
@@ -137,8 +455,6 @@ CRITICAL: Extract ALL of the following:
 2. Complete list of ingredients with measurements
 3. Complete step-by-step cooking instructions/directions
 
-{appliance_prompt_section}
-
 Return ONLY a valid JSON object with this exact structure:
 {{
   "recipeName": "Recipe Name",
@@ -151,12 +467,6 @@ Return ONLY a valid JSON object with this exact structure:
     "Step 1: ...",
     "Step 2: ...",
     ...
-  ],
-  "applianceInstructions": [
-    {{
-      "applianceName": "Instant Pot",
-      "instructions": ["Step 1: ...", "Step 2: ..."]
-    }}
   ]
 }}
 
@@ -166,174 +476,240 @@ IMPORTANT REQUIREMENTS:
 - The "instructions" array MUST contain all cooking steps - do not leave it empty
 - Return ONLY valid JSON, no other text"""
 
+        return prompt
+
+    def _parse_recipe_response(self, response_text, url):
+        """
+        Parse the model's reply into the recipe format returned by extract_recipe.
+
+        Args:
+            response_text (str): Raw model response
+            url (str): The recipe URL
+
+        Returns:
+            dict: Structured recipe data (see extract_recipe)
+        """
+        recipe_data, problems = parse_recipe_response(response_text)
+        if problems:
+            logger.warning("Model response had problems (%s). Response: %.200s", '; '.join(problems), response_text)
+        if not recipe_data['instructions']:
+            logger.warning("No instructions extracted! This might indicate an issue with the prompt or API response.")
+
+        transformed_data = self._to_recipe(recipe_data, url)
+        logger.info(
+            "Extracted %s (%d ingredients, %d directions)", transformed_data.get('title', 'Unknown'),
+            len(transformed_data.get('ingredients', [])), len(transformed_data.get('directions', []))
+        )
+        return transformed_data
+
+    def _partial_emitter(self, url, on_event):
+        """
+        Build a stream callback that emits "partial" events as fields of the reply complete.
+
+        Each event carries the recipe so far, so clients can show the title and
+        ingredients while the directions are still being written.
+
+        Args:
+            url (str): The recipe URL
+            on_event (callable): Progress callback (see extract_recipe)
+
+        Returns:
+            callable: Callback for each streamed text delta, or None if nobody is listening
+        """
+        if on_event is None or not self.backend.stream:
+            return None
+
+        parser = IncrementalRecipeParser()
+
+        def on_delta(text):
+            fields = [field for field in parser.feed(text) if field in PARTIAL_FIELDS]
+            if fields and parser.has_fields('recipeName', 'ingredients'):
+                recipe = self._to_recipe(parser.partial(), url)
+                self._emit(on_event, 'partial', fields=fields, recipe=recipe)
+        return on_delta
+
+    @staticmethod
+    def _to_recipe(recipe_data, url):
+        """
+        Convert validated model output to the format returned by extract_recipe.
+
+        Args:
+            recipe_data (dict): Output of response_parser.validate_recipe
+            url (str): The recipe URL
+
+        Returns:
+            dict: Structured recipe data (see extract_recipe)
+        """
+        # Transform to match frontend expectations
+        # Frontend expects: title, directions, ingredients
+        # Extractor returns: recipeName, instructions, ingredients
+        return {
+            "title": recipe_data.get('recipeName'),
+            "ingredients": recipe_data.get('ingredients', []),
+            "directions": recipe_data.get('instructions', []),  # Map instructions to directions
+            "recipeName": recipe_data.get('recipeName'),  # Keep for backwards compatibility
+            "instructions": recipe_data.get('instructions', []),  # Keep original field
+            "applianceInstructions": recipe_data.get('applianceInstructions', []),
+            "source_url": url  # Add source URL for frontend
+        }
+
+    def appliance_instructions(self, recipe, on_event=None):
+        """
+        Get Instant Pot / Breville Smart Oven instructions for an extracted recipe.
+
+        Extraction leaves these out to keep the AI reply short; they are generated
+        here on demand, cached by recipe content, and shared by concurrent callers.
+
+        Args:
+            recipe (dict): Recipe returned by extract_recipe
+            on_event (callable): Optional progress callback, called with "cached" or
+                "llm_started" (see extract_recipe)
+
+        Returns:
+            list: applianceInstructions entries ({"applianceName", "instructions"})
+
+        Raises:
+            Exception: If the AI call fails
+        """
+        key = ApplianceCache.make_key(recipe, self.APPLIANCE_PROMPT_VERSION)
+        with metrics.stage('appliances', 'total'):
+            return self._inflight.do(
+                f"appliances:{key}", lambda: self._appliance_instructions(key, recipe, on_event)
+            )
+
+    def _appliance_instructions(self, key, recipe, on_event=None):
+        """Look up or generate appliance instructions (see appliance_instructions)."""
+        if self.appliance_cache is not None:
+            cached = self.appliance_cache.get(key)
+            if cached is not None:
+                self._emit(on_event, 'cached', stage='appliance')
+                return cached['applianceInstructions']
+
+        instructions = self._extract_appliance_instructions(recipe, on_event)
+        if self.appliance_cache is not None:
+            self.appliance_cache.set(key, {'applianceInstructions': instructions})
+        return instructions
+
+    def _extract_appliance_instructions(self, recipe, on_event=None):
+        """
+        Generate appliance-specific instructions for an already extracted recipe.
+
+        Only recipes that mention pressure cooking, baking or air frying need an
+        AI call; everything else gets an empty list locally.
+
+        Args:
+            recipe (dict): Recipe with ingredients and directions
+            on_event (callable): Optional progress callback (see extract_recipe)
+
+        Returns:
+            list: applianceInstructions entries ({"applianceName", "instructions"})
+        """
+        prompt = self._build_appliance_prompt(recipe)
+        if prompt is None:
+            return []
+
         try:
-            # Make API request to Writer's Palmyra X5
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            self._emit(on_event, 'llm_started', stage='appliance')
+            with metrics.stage('appliances', 'llm'):
+                return self._parse_appliance_response(self._call_llm(prompt))
+        except Exception as e:
+            logger.warning("Could not generate appliance instructions: %s", e)
+            raise Exception(f"Appliance instruction generation failed: {str(e)}")
 
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"content": prompt, "role": "user"}
-                ]
-            }
+    @staticmethod
+    def _build_appliance_prompt(recipe):
+        """
+        Build the appliance-only prompt for a recipe.
 
-            print(f"Using model: {self.model}")
-            print(f"📡 Making API request to: {self.api_url}")
-            print(f"🔑 Auth header: Bearer {self.api_key[:10]}...{self.api_key[-4:]}")
-            response = requests.post(self.api_url, headers=headers, json=payload)
-            
-            # Handle API errors
-            if response.status_code != 200:
-                error_msg = f"Writer API error: {response.status_code}"
-                try:
-                    error_data = response.json()
-                    if "error" in error_data:
-                        error_msg += f" - {error_data['error']}"
-                    elif "message" in error_data:
-                        error_msg += f" - {error_data['message']}"
-                except:
-                    error_msg += f" - {response.text[:200]}"
-                raise Exception(error_msg)
-            
-            response_data = response.json()
-            
-            # Extract the response text from Writer API response
-            # Writer API response structure may vary, so we handle different formats
-            response_text = None
-            
-            # Try different possible response structures
-            if "choices" in response_data and len(response_data["choices"]) > 0:
-                # OpenAI-style format
-                choice = response_data["choices"][0]
-                if "message" in choice:
-                    response_text = choice["message"].get("content", "").strip()
-                elif "text" in choice:
-                    response_text = choice["text"].strip()
-                elif "content" in choice:
-                    response_text = choice["content"].strip()
-            elif "message" in response_data:
-                # Direct message format
-                if isinstance(response_data["message"], dict):
-                    response_text = response_data["message"].get("content", "").strip()
-                else:
-                    response_text = str(response_data["message"]).strip()
-            elif "content" in response_data:
-                # Direct content format
-                response_text = response_data["content"].strip()
-            elif "text" in response_data:
-                # Direct text format
-                response_text = response_data["text"].strip()
-            elif "output" in response_data:
-                # Output field format
-                response_text = response_data["output"].strip()
-            
-            if not response_text:
-                # Last resort: try to find any string field
-                for key, value in response_data.items():
-                    if isinstance(value, str) and len(value) > 10:
-                        response_text = value.strip()
+        Args:
+            recipe (dict): Recipe with ingredients and directions
+
+        Returns:
+            str: The prompt, or None if the recipe can't be adapted to our appliances
+        """
+        ingredients_text = "\n".join(recipe.get('ingredients', []))
+        directions_text = "\n".join(recipe.get('directions', []))
+        if not APPLIANCE_KEYWORDS_RE.search(f"{ingredients_text}\n{directions_text}"):
+            return None
+
+        return f"""Here is a recipe.
+
+Recipe: {recipe.get('title')}
+
+Ingredients:
+{ingredients_text}
+
+Instructions:
+{directions_text}
+{APPLIANCE_PROMPT_SECTION}
+Return ONLY a valid JSON object with this exact structure:
+{{
+  "applianceInstructions": [
+    {{
+      "applianceName": "Instant Pot",
+      "instructions": ["Step 1: ...", "Step 2: ..."]
+    }}
+  ]
+}}"""
+
+    def _parse_appliance_response(self, response_text):
+        """
+        Parse the reply to an appliance-only prompt.
+
+        Args:
+            response_text (str): Raw model response
+
+        Returns:
+            list: applianceInstructions entries
+        """
+        data = loads_first_object(response_text)
+        if data is None:
+            raise Exception(f"No JSON found in appliance response: {response_text[:200]}")
+        return validate_appliance_instructions(data.get('applianceInstructions'))
+
+    def _call_llm(self, prompt, on_delta=None):
+        """
+        Send a prompt to the LLM backend.
+
+        Args:
+            prompt (str): The user prompt
+            on_delta (callable): If given, the completion is streamed and this is called
+                with each piece of text as it arrives
+
+        Returns:
+            str: The model's response text
+        """
+        backend = self.backend
+        stream = on_delta is not None
+        headers, payload = backend.build_request(prompt, stream=stream)
+
+        logger.debug("Calling %s model %s at %s", backend.label, backend.model, backend.api_url)
+        try:
+            response = self.session.post(
+                backend.api_url, headers=headers, json=payload, timeout=backend.timeout, stream=stream
+            )
+        except Exception:
+            metrics.upstream(backend.name, 'error')
+            raise
+        metrics.upstream(backend.name, response.status_code)
+
+        if stream:
+            with response:
+                ok = response.status_code == 200
+                decoder = StreamDecoder(
+                    backend, response.headers.get('Content-Type') if ok else None, on_delta if ok else None
+                )
+                # chunk_size=None yields data as soon as it arrives
+                for chunk in response.iter_content(chunk_size=None):
+                    if decoder.feed(chunk):
                         break
-                
-                if not response_text:
-                    raise Exception(f"Could not extract response text from Writer API. Response structure: {list(response_data.keys())}")
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                # Find the first ``` and last ```
-                parts = response_text.split("```")
-                if len(parts) >= 3:
-                    response_text = parts[1]  # Get content between first two ```
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                else:
-                    response_text = response_text.replace("```json", "").replace("```", "")
-                response_text = response_text.strip()
-            
-            # Try to parse JSON
-            try:
-                recipe_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                # If parsing fails, try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    try:
-                        recipe_data = json.loads(json_match.group())
-                    except:
-                        # Last resort: return empty structure
-                        print(f"Warning: Could not parse JSON from response. Returning empty structure.")
-                        recipe_data = {
-                            "recipeName": None,
-                            "ingredients": [],
-                            "instructions": [],
-                            "applianceInstructions": []
-                        }
-                else:
-                    # No JSON found, return empty structure
-                    print(f"Warning: No JSON found in AI response. Response: {response_text[:200]}")
-                    recipe_data = {
-                        "recipeName": None,
-                        "ingredients": [],
-                        "instructions": [],
-                        "applianceInstructions": []
-                    }
-            
-            # Ensure all required fields exist
-            if 'recipeName' not in recipe_data:
-                recipe_data['recipeName'] = recipe_data.get('title') or None
-            if 'ingredients' not in recipe_data:
-                recipe_data['ingredients'] = []
-            if 'instructions' not in recipe_data:
-                recipe_data['instructions'] = recipe_data.get('directions') or []
-            if 'applianceInstructions' not in recipe_data:
-                recipe_data['applianceInstructions'] = []
-            
-            # Ensure applianceInstructions is a list
-            if not isinstance(recipe_data.get('applianceInstructions'), list):
-                recipe_data['applianceInstructions'] = []
-            
-            # Ensure instructions is a list and not empty
-            if not isinstance(recipe_data.get('instructions'), list):
-                recipe_data['instructions'] = []
-            if len(recipe_data.get('instructions', [])) == 0:
-                print("⚠️  WARNING: No instructions extracted! This might indicate an issue with the prompt or API response.")
-            
-            # Transform to match frontend expectations
-            # Frontend expects: title, directions, ingredients
-            # Extractor returns: recipeName, instructions, ingredients
-            transformed_data = {
-                "title": recipe_data.get('recipeName') or recipe_data.get('title'),
-                "ingredients": recipe_data.get('ingredients', []),
-                "directions": recipe_data.get('instructions', []),  # Map instructions to directions
-                "recipeName": recipe_data.get('recipeName'),  # Keep for backwards compatibility
-                "instructions": recipe_data.get('instructions', []),  # Keep original field
-                "applianceInstructions": recipe_data.get('applianceInstructions', []),
-                "source_url": url  # Add source URL for frontend
-            }
-            
-            print(f"✓ Successfully extracted: {transformed_data.get('title', 'Unknown')}")
-            print(f"  - Ingredients: {len(transformed_data.get('ingredients', []))} items")
-            print(f"  - Directions: {len(transformed_data.get('directions', []))} steps")
-            return transformed_data
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON Parse Error. Response was: {response_text[:500]}")
-            # Return empty structure instead of raising
-            return {
-                "title": None,
-                "recipeName": None,
-                "ingredients": [],
-                "directions": [],
-                "instructions": [],
-                "applianceInstructions": [],
-                "source_url": url
-            }
-        except Exception as e:
-            print(f"AI extraction error: {str(e)}")
-            raise Exception(f"AI extraction failed: {str(e)}")
+                return backend.stream_result(response.status_code, decoder)
+
+        # Handle API errors
+        if response.status_code != 200:
+            raise Exception(backend.error_message(response.status_code, response.text))
+
+        return backend.response_text(response.json())
 
 
 def main():
@@ -347,6 +723,8 @@ def main():
         # Add more test URLs here
     ]
     
+    setup_logging()
+
     try:
         extractor = RecipeExtractor()
         
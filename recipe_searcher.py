@@ -1,28 +1,98 @@
 """
 RecipeSnap - Recipe Searcher
-Searches for recipes using Google Custom Search API
+Searches for recipes using Google Custom Search API, answering from the local
+recipe store first when it has enough matches
 """
 
 import os
-import requests
+import re
 import json
-import time
+import logging
+import threading
 from dotenv import load_dotenv
+from http_client import get_session
+from recipe_cache import MemoryCache, SQLiteCache, normalize_url
+from singleflight import SingleFlight
+import metrics
+from logging_setup import setup_logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Words that don't change which recipes a query should find
+# Function words, plus "recipe", which every indexed document is. Normalized queries
+# are also the recipe store's index terms, so words like "easy" must stay searchable.
+STOPWORDS = {'a', 'an', 'and', 'the', 'of', 'for', 'with', 'in', 'on', 'to', 'my', 'how', 'recipe', 'recipes'}
+
+# Plural endings that shouldn't be stripped (hummus, swiss, couscous, ...)
+KEEP_S_ENDINGS = ('ss', 'us', 'is')
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def singularize(word):
+    """
+    Naively reduce an English plural to its singular form.
+
+    "-ie" and "-y" words share a stem ("cookie", "cookies" -> "cooky"; "berries" ->
+    "berry") because the plural alone can't tell them apart.
+    """
+    if len(word) <= 3:
+        return word
+    if word.endswith('ies'):
+        return word[:-1] if len(word) == 4 else word[:-3] + 'y'
+    if word.endswith('ie'):
+        return word[:-2] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(KEEP_S_ENDINGS):
+        return word[:-1]
+    return word
+
+
+def normalize_query(query):
+    """
+    Normalize a search query so equivalent phrasings share a cache entry.
+
+    Lowercases, strips punctuation, drops stopwords and singularizes plurals,
+    e.g. "The Best Chocolate-Chip Cookies" -> "best chocolate chip cooky".
+
+    Args:
+        query (str): The search query
+
+    Returns:
+        str: The normalized query
+    """
+    words = WORD_RE.findall(query.lower())
+    normalized = [singularize(w) for w in words if w not in STOPWORDS]
+    # A query made only of stopwords still needs a key
+    return ' '.join(normalized or words)
+
 
 class RecipeSearcher:
     """Searches for recipes using Google Custom Search API."""
 
-    def __init__(self, api_key=None, search_engine_id=None):
+    def __init__(self, api_key=None, search_engine_id=None, session=None, cache=None, shared_cache=None,
+                 prefetcher=None, store=None, min_local_results=None):
         """
         Initialize the recipe searcher.
 
         Args:
             api_key (str): Google Custom Search API key. If not provided, reads from GOOGLE_API_KEY env var.
             search_engine_id (str): Google Custom Search Engine ID. If not provided, reads from GOOGLE_CSE_ID env var.
+            session (requests.Session): HTTP session to use. Defaults to the shared pooled session.
+            cache (MemoryCache): In-process results cache. Defaults to an LRU cache sized from
+                SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES and SEARCH_CACHE_MAX_BYTES env vars.
+            shared_cache (SQLiteCache): Optional cache shared by all worker processes. Defaults to
+                a SQLite cache at SEARCH_CACHE_PATH if that env var is set.
+            prefetcher (Prefetcher): Optional prefetcher that extracts the top results in the
+                background after each search.
+            store (RecipeStore): Optional store of extracted recipes, searched before Google.
+            min_local_results (int): Local matches needed to skip Google. If not provided, reads
+                from LOCAL_SEARCH_MIN_RESULTS env var (default 0: as many as requested).
         """
+        self.session = session or get_session()
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
         self.search_engine_id = search_engine_id or os.getenv('GOOGLE_CSE_ID')
 
@@ -48,10 +118,33 @@ class RecipeSearcher:
             "cookieandkate.com"
         ]
 
-        # Simple in-memory cache with timestamps
-        # Format: {query: {'results': [...], 'timestamp': time}}
-        self._cache = {}
-        self._cache_duration = 3600  # Cache for 1 hour (3600 seconds)
+        # Bounded in-memory LRU cache, optionally backed by a store shared between processes
+        cache_ttl = int(os.getenv('SEARCH_CACHE_TTL', 3600))  # Cache for 1 hour by default
+        self._cache = cache or MemoryCache(
+            ttl=cache_ttl,
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1000)),
+            max_bytes=int(os.getenv('SEARCH_CACHE_MAX_BYTES', 10 * 1024 * 1024))
+        )
+        self._shared_cache = shared_cache
+        if self._shared_cache is None and os.getenv('SEARCH_CACHE_PATH'):
+            self._shared_cache = SQLiteCache(
+                os.getenv('SEARCH_CACHE_PATH'), table='search_results', ttl=cache_ttl,
+                max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1000))
+            )
+
+        # Concurrent identical searches share one Google API call
+        self._inflight = SingleFlight()
+
+        self.prefetcher = prefetcher
+
+        self.store = store
+        self.min_local_results = (
+            min_local_results if min_local_results is not None else int(os.getenv('LOCAL_SEARCH_MIN_RESULTS', 0))
+        )
+        # Searches answered from the store, and ones it couldn't answer that went to Google
+        self._counter_lock = threading.Lock()
+        self.local_answers = 0
+        self.google_fallbacks = 0
 
     def search_recipes(self, query, num_results=5):
         """
@@ -73,88 +166,239 @@ class RecipeSearcher:
                 ...
             ]
         """
-        print(f"🔍 Searching for recipes: {query}")
-
-        # Normalize query for cache key
-        cache_key = f"{query.lower().strip()}:{num_results}"
+        with metrics.IN_FLIGHT.track(operation='search'), metrics.stage('search', 'total'):
+            results = self._inflight.do(
+                f"{normalize_query(query)}:{min(num_results, 10)}",
+                lambda: self._search_recipes(query, num_results)
+            )
+        if self.prefetcher is not None:
+            self.prefetcher.prefetch_results(results)
+        return results
+
+    def _search_recipes(self, query, num_results):
+        """Search the recipe store, then Google Custom Search using the cache (see search_recipes)."""
+        logger.info("Searching for recipes: %s", query)
+
+        with metrics.stage('search', 'local'):
+            local = self._search_local(query, num_results)
+        if self._enough_local(local, num_results):
+            logger.info("Answered '%s' from the recipe store", query)
+            return local
 
         # Check cache first
-        if cache_key in self._cache:
-            cached_data = self._cache[cache_key]
-            # Check if cache is still valid (within 1 hour)
-            if time.time() - cached_data['timestamp'] < self._cache_duration:
-                print(f"✅ Returning cached results for '{query}'")
-                return cached_data['results']
-            else:
-                # Cache expired, remove it
-                del self._cache[cache_key]
-
-        # Limit results to max 10
-        num_results = min(num_results, 10)
-
-        # Build search query to focus on recipes
-        search_query = f"{query} recipe"
+        with metrics.stage('search', 'cache_lookup'):
+            cached = self._get_cached(query, num_results)
+        if cached is not None:
+            return self._merge_local(local, cached, num_results)
 
         try:
             # Make API request to Google Custom Search
-            params = {
-                'key': self.api_key,
-                'cx': self.search_engine_id,
-                'q': search_query,
-                'num': num_results
-            }
-
-            response = requests.get(self.api_url, params=params, timeout=10)
+            params = self._build_params(query, num_results)
+            self._count_google_fallback()
+            try:
+                with metrics.stage('search', 'google_api'):
+                    response = self.session.get(self.api_url, params=params, timeout=10)
+            except Exception:
+                metrics.upstream('google', 'error')
+                raise
+            metrics.upstream('google', response.status_code)
 
             # Handle API errors
             if response.status_code != 200:
-                error_msg = f"Google Search API error: {response.status_code}"
-                try:
-                    error_data = response.json()
-                    if "error" in error_data:
-                        error_msg += f" - {error_data['error'].get('message', '')}"
-                except:
-                    error_msg += f" - {response.text[:200]}"
-                raise Exception(error_msg)
-
-            data = response.json()
-
-            # Extract search results
-            results = []
-            if 'items' in data:
-                for item in data['items']:
-                    # Extract domain from URL
-                    url = item.get('link', '')
-                    domain = url.split('/')[2] if len(url.split('/')) > 2 else ''
-
-                    result = {
-                        'title': item.get('title', 'Untitled Recipe'),
-                        'url': url,
-                        'snippet': item.get('snippet', ''),
-                        'site': domain
-                    }
-                    results.append(result)
-
-            print(f"✓ Found {len(results)} recipe results")
-
-            # Cache the results
-            self._cache[cache_key] = {
-                'results': results,
-                'timestamp': time.time()
-            }
-            print(f"💾 Cached results for '{query}'")
+                raise Exception(self._error_message(response.status_code, response.text))
 
-            return results
+            with metrics.stage('search', 'parse'):
+                results = self._parse_results(response.json())
+            self._store_cached(query, num_results, results)
+            return self._merge_local(local, results, num_results)
 
         except Exception as e:
-            print(f"Search error: {str(e)}")
+            logger.error("Search error: %s", e)
             raise Exception(f"Recipe search failed: {str(e)}")
 
+    def _search_local(self, query, num_results):
+        """Search the recipe store, returning [] if there is none or it fails."""
+        if self.store is None:
+            return []
+        try:
+            return self.store.search(query, min(num_results, 10))
+        except Exception as e:
+            logger.warning("Local recipe search failed: %s", e)
+            return []
+
+    def _enough_local(self, local, num_results):
+        """
+        Decide whether local results can answer a search without Google.
+
+        Args:
+            local (list): Results from the recipe store
+            num_results (int): Number of results requested
+
+        Returns:
+            bool: True if there are at least min_local_results (or, if that is 0,
+                as many as requested)
+        """
+        if self.store is None:
+            return False
+        needed = min(self.min_local_results or num_results, num_results, 10)
+        if local and len(local) >= needed:
+            with self._counter_lock:
+                self.local_answers += 1
+            return True
+        return False
+
+    def _count_google_fallback(self):
+        """Count a search the recipe store couldn't answer, once Google is actually called."""
+        if self.store is not None:
+            with self._counter_lock:
+                self.google_fallbacks += 1
+
+    @staticmethod
+    def _merge_local(local, results, num_results):
+        """Put local matches ahead of Google results, dropping duplicates of the same page."""
+        if not local:
+            return results
+        seen = {normalize_url(result['url']) for result in local}
+        merged = local + [result for result in results if normalize_url(result['url']) not in seen]
+        return merged[:min(num_results, 10)]
+
+    def _get_cached(self, query, num_results):
+        """
+        Return cached results for a query, or None if missing or expired.
+
+        Only the largest result set fetched for each normalized query is cached;
+        smaller requests are answered by slicing it.
+
+        Args:
+            query (str): The recipe search query
+            num_results (int): Number of results requested
+
+        Returns:
+            list: Cached search results, or None
+        """
+        num_results = min(num_results, 10)
+        cache_key = normalize_query(query)
+
+        entry = self._cache.get(cache_key)
+        if entry is None and self._shared_cache is not None:
+            # Another worker process may already have run this search
+            entry = self._shared_cache.get(cache_key)
+            if entry is not None:
+                self._cache.set(cache_key, entry)
+
+        if entry is None:
+            return None
+
+        # Usable if we fetched at least as many, or Google had no more to give
+        if entry['num_results'] >= num_results or len(entry['results']) < entry['num_results']:
+            logger.info("Returning cached results for '%s'", query)
+            return entry['results'][:num_results]
+        return None
+
+    def _store_cached(self, query, num_results, results):
+        """
+        Cache the results of a query, unless a larger result set is already cached,
+        here or by another worker process in the shared cache. Lookups here don't
+        count towards the cache stats.
+        """
+        num_results = min(num_results, 10)
+        cache_key = normalize_query(query)
+
+        for cache in (self._cache, self._shared_cache):
+            existing = cache.peek(cache_key) if cache is not None else None
+            if existing is not None and existing['num_results'] > num_results:
+                return
+
+        entry = {'results': results, 'num_results': num_results}
+        self._cache.set(cache_key, entry)
+        if self._shared_cache is not None:
+            self._shared_cache.set(cache_key, entry)
+        logger.debug("Cached results for '%s'", query)
+
+    def cache_stats(self):
+        """
+        Return search cache counters.
+
+        Returns:
+            dict: {"memory": {...}, "shared": {...} or None, "local_answers": int,
+                "google_fallbacks": int}
+        """
+        with self._counter_lock:
+            local_answers, google_fallbacks = self.local_answers, self.google_fallbacks
+        return {
+            'memory': self._cache.stats(),
+            'shared': self._shared_cache.stats() if self._shared_cache is not None else None,
+            'local_answers': local_answers,
+            'google_fallbacks': google_fallbacks
+        }
+
+    def _build_params(self, query, num_results):
+        """
+        Build the Google Custom Search query parameters.
+
+        Args:
+            query (str): The recipe search query
+            num_results (int): Number of results requested (capped at 10)
+
+        Returns:
+            dict: Query string parameters
+        """
+        # Build search query to focus on recipes
+        return {
+            'key': self.api_key,
+            'cx': self.search_engine_id,
+            'q': f"{query} recipe",
+            'num': min(num_results, 10)  # Limit results to max 10
+        }
+
+    @staticmethod
+    def _error_message(status_code, body):
+        """Build the error message for a failed Google Search API call."""
+        error_msg = f"Google Search API error: {status_code}"
+        try:
+            error_data = json.loads(body)
+            if "error" in error_data:
+                error_msg += f" - {error_data['error'].get('message', '')}"
+        except:
+            error_msg += f" - {body[:200]}"
+        return error_msg
+
+    @staticmethod
+    def _parse_results(data):
+        """
+        Convert a Google Custom Search response into recipe search results.
+
+        Args:
+            data (dict): Decoded JSON response
+
+        Returns:
+            list: Search results (title, url, snippet, site)
+        """
+        results = []
+        if 'items' in data:
+            for item in data['items']:
+                # Extract domain from URL
+                url = item.get('link', '')
+                domain = url.split('/')[2] if len(url.split('/')) > 2 else ''
+
+                result = {
+                    'title': item.get('title', 'Untitled Recipe'),
+                    'url': url,
+                    'snippet': item.get('snippet', ''),
+                    'site': domain
+                }
+                results.append(result)
+
+        logger.debug("Found %d recipe results", len(results))
+        return results
+
 
 def main():
     """
     Main function for testing the recipe searcher.
     """
+    setup_logging()
+
     try:
         searcher = RecipeSearcher()
 
@@ -0,0 +1,319 @@
+"""
+RecipeSnap - Recipe Store
+Keeps every extracted recipe in SQLite with a full-text inverted index over
+titles, ingredients and directions, so searches can be answered from recipes
+we have already extracted. The index is updated incrementally as recipes are
+added and results are ranked with BM25.
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from dotenv import load_dotenv
+from recipe_cache import normalize_url, content_hash
+from recipe_searcher import normalize_query
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A title word counts as this many occurrences in the body
+TITLE_WEIGHT = 3
+
+SNIPPET_CHARS = 160
+
+
+def index_terms(recipe):
+    """
+    Count the index terms of a recipe.
+
+    Words are normalized like search queries (lowercased, stopwords dropped,
+    plurals singularized) so queries and recipes match on the same terms.
+
+    Args:
+        recipe (dict): Recipe with title, ingredients and directions
+
+    Returns:
+        Counter: Weighted occurrences of each term
+    """
+    terms = Counter()
+    for word in normalize_query(recipe.get('title') or '').split():
+        terms[word] += TITLE_WEIGHT
+    for line in (recipe.get('ingredients') or []) + (recipe.get('directions') or []):
+        terms.update(normalize_query(line).split())
+    return terms
+
+
+class RecipeStore:
+    """Persistent recipe repository with an incrementally updated BM25 full-text index."""
+
+    def __init__(self, path=None):
+        """
+        Initialize the store.
+
+        Args:
+            path (str): SQLite file. If not provided, reads from RECIPE_STORE_PATH env var,
+                falling back to the extraction cache file.
+        """
+        self.path = path or os.getenv('RECIPE_STORE_PATH') or os.getenv('RECIPE_CACHE_PATH', 'recipe_cache.sqlite3')
+
+        self._lock = threading.Lock()
+        # timeout: wait for other worker processes' writes instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS recipes (
+                id INTEGER PRIMARY KEY,
+                url_key TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                title TEXT,
+                site TEXT,
+                recipe TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # One row per (term, recipe); the primary key doubles as the term lookup index
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                recipe_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, recipe_id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_recipe ON postings (recipe_id)")
+        # Document count and total length, kept up to date for BM25
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_index_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                documents INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("INSERT OR IGNORE INTO recipe_index_stats VALUES (0, 0, 0)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS recipes_updated ON recipes (updated_at, id)")
+
+        self.added = 0
+        self.searches = 0
+
+    def add(self, recipe, url=None):
+        """
+        Store a recipe and index it, replacing any earlier version from the same URL.
+
+        Args:
+            recipe (dict): Recipe as returned by RecipeExtractor.extract_recipe
+            url (str): Recipe URL. If not provided, the recipe's source_url is used.
+
+        Returns:
+            bool: True if the recipe was new or changed, False if it was already stored
+                or has no ingredients or directions
+        """
+        url = url or recipe.get('source_url')
+        if not url or not (recipe.get('ingredients') or recipe.get('directions')):
+            return False
+
+        stored = {key: value for key, value in recipe.items() if key != 'source_url'}
+        encoded = json.dumps(stored, ensure_ascii=False, sort_keys=True)
+        digest = content_hash(encoded)
+        url_key = normalize_url(url)
+
+        terms = index_terms(recipe)
+        length = sum(terms.values())
+        site = url.split('/')[2] if len(url.split('/')) > 2 else ''
+        now = time.time()
+
+        with self._lock:
+            # Re-adds of unchanged recipes (cache hits) shouldn't take the write lock
+            unchanged = self._conn.execute(
+                "SELECT 1 FROM recipes WHERE url_key = ? AND content_hash = ?", (url_key, digest)
+            ).fetchone()
+            if unchanged:
+                return False
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, content_hash, length FROM recipes WHERE url_key = ?", (url_key,)
+                ).fetchone()
+                if row is not None and row[1] == digest:
+                    self._conn.execute("COMMIT")
+                    return False
+
+                if row is None:
+                    recipe_id = self._conn.execute(
+                        """INSERT INTO recipes (url_key, url, title, site, recipe, content_hash, length, updated_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (url_key, url, recipe.get('title'), site, encoded, digest, length, now)
+                    ).lastrowid
+                    self._conn.execute(
+                        "UPDATE recipe_index_stats SET documents = documents + 1, total_length = total_length + ?",
+                        (length,)
+                    )
+                else:
+                    recipe_id, _, old_length = row
+                    self._conn.execute(
+                        """UPDATE recipes SET url = ?, title = ?, site = ?, recipe = ?, content_hash = ?,
+                           length = ?, updated_at = ? WHERE id = ?""",
+                        (url, recipe.get('title'), site, encoded, digest, length, now, recipe_id)
+                    )
+                    self._conn.execute("DELETE FROM postings WHERE recipe_id = ?", (recipe_id,))
+                    self._conn.execute(
+                        "UPDATE recipe_index_stats SET total_length = total_length + ?", (length - old_length,)
+                    )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, recipe_id, tf) VALUES (?, ?, ?)",
+                    [(term, recipe_id, tf) for term, tf in terms.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.added += 1
+
+        logger.debug("Indexed recipe %s (%d terms)", url, len(terms))
+        return True
+
+    def get(self, url):
+        """
+        Look up a stored recipe.
+
+        Args:
+            url (str): Recipe URL (normalized here)
+
+        Returns:
+            dict: The recipe, with source_url set, or None if not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, recipe FROM recipes WHERE url_key = ?", (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        recipe = json.loads(row[1])
+        recipe['source_url'] = row[0]
+        return recipe
+
+    def changed_since(self, since, batch_size=1000):
+        """
+        Iterate over recipes added or updated since a time, oldest first.
+
+        Rows are read in batches so the store isn't locked for the whole scan.
+
+        Args:
+            since (float): Unix time; recipes updated at or after it are returned
+            batch_size (int): Rows read per query
+
+        Yields:
+            tuple: (recipe id, url, title, site, recipe dict, content hash, updated_at)
+        """
+        last = (since, -1)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """SELECT id, url, title, site, recipe, content_hash, updated_at FROM recipes
+                       WHERE updated_at > ? OR (updated_at = ? AND id > ?)
+                       ORDER BY updated_at, id LIMIT ?""",
+                    (last[0], last[0], last[1], batch_size)
+                ).fetchall()
+            for recipe_id, url, title, site, encoded, digest, updated_at in rows:
+                yield recipe_id, url, title, site, json.loads(encoded), digest, updated_at
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][6], rows[-1][0])
+
+    def search(self, query, num_results=5):
+        """
+        Find stored recipes matching every word of a query, best first.
+
+        Args:
+            query (str): The recipe search query (e.g., "chocolate chip cookies")
+            num_results (int): Maximum number of results
+
+        Returns:
+            list: Search results in the RecipeSearcher.search_recipes format
+                (title, url, snippet, site), ranked by BM25
+        """
+        terms = sorted(set(normalize_query(query).split()))
+        if not terms or num_results <= 0:
+            return []
+
+        placeholders = ','.join('?' * len(terms))
+        with self._lock:
+            self.searches += 1
+            documents, total_length = self._conn.execute(
+                "SELECT documents, total_length FROM recipe_index_stats"
+            ).fetchone()
+            doc_freq = dict(self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms
+            ).fetchall())
+            # Every query word must appear, so "chicken soup" doesn't return every chicken dish
+            if not documents or len(doc_freq) < len(terms):
+                return []
+
+            idf = [
+                value
+                for term in terms
+                for value in (term, math.log(1 + (documents - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5)))
+            ]
+            # Score and rank inside SQLite so common words don't pull every posting into Python
+            rows = self._conn.execute(
+                f"""SELECT r.url, r.title, r.site, r.recipe FROM (
+                        SELECT p.recipe_id AS id,
+                               SUM((CASE p.term {'WHEN ? THEN ? ' * len(terms)}END) * p.tf * ?
+                                   / (p.tf + ? * (1 - ? + ? * r.length / ?))) AS score
+                        FROM postings p JOIN recipes r ON r.id = p.recipe_id
+                        WHERE p.term IN ({placeholders})
+                        GROUP BY p.recipe_id
+                        HAVING COUNT(*) = ?
+                        ORDER BY score DESC, p.recipe_id
+                        LIMIT ?
+                    ) top JOIN recipes r ON r.id = top.id
+                    ORDER BY top.score DESC, top.id""",
+                idf + [BM25_K1 + 1, BM25_K1, BM25_B, BM25_B, total_length / documents]
+                + terms + [len(terms), num_results]
+            ).fetchall()
+
+        return [
+            {
+                'title': title or 'Untitled Recipe',
+                'url': url,
+                'snippet': self._snippet(json.loads(encoded)),
+                'site': site
+            }
+            for url, title, site, encoded in rows
+        ]
+
+    @staticmethod
+    def _snippet(recipe):
+        """Summarize a recipe's ingredients for a search result."""
+        snippet = ', '.join(recipe.get('ingredients') or recipe.get('directions') or [])
+        if len(snippet) > SNIPPET_CHARS:
+            snippet = snippet[:SNIPPET_CHARS].rsplit(' ', 1)[0] + '...'
+        return snippet
+
+    def stats(self):
+        """
+        Return store counters.
+
+        Returns:
+            dict: recipes stored, and recipes added and searches run by this process
+        """
+        with self._lock:
+            documents = self._conn.execute("SELECT documents FROM recipe_index_stats").fetchone()[0]
+        return {
+            'recipes': documents,
+            'added': self.added,
+            'searches': self.searches
+        }
@@ -0,0 +1,421 @@
+"""
+RecipeSnap - LLM Response Parser
+Turns model replies into recipe data. The reply is scanned once, character by
+character, for the first balanced JSON object, so code fences and chatter
+around the JSON are skipped without regex backtracking. Replies that aren't
+valid JSON (trailing commas, output cut off mid-array) are repaired, and the
+result is checked against the recipe schema. The scanner can be fed a reply
+in pieces as it streams in, and reports each top-level field as soon as its
+value is complete.
+"""
+
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Runs of characters inside a JSON string that need no special handling
+STRING_BODY_RE = re.compile(r'[^"\\]+')
+
+CLOSERS = {'{': '}', '[': ']'}
+
+# Top-level fields of the recipe reply and the types they must have
+RECIPE_SCHEMA = {
+    'recipeName': str,
+    'ingredients': list,
+    'instructions': list,
+    'applianceInstructions': list,
+}
+
+
+class JSONObjectScanner:
+    """
+    Finds the first JSON object in text fed in pieces.
+
+    Text before the opening brace is ignored. Call feed() with each piece; once
+    the object's closing brace arrives, complete is True and anything after it
+    is ignored.
+    """
+
+    def __init__(self):
+        self.complete = False
+        # Top-level keys whose values have been fully received, in order
+        self.closed_keys = []
+
+        self._parts = []
+        self._length = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._key = None
+        self._expecting_key = False
+        self._chunk_start = 0
+
+    @property
+    def started(self):
+        """True once the opening brace has been seen."""
+        return bool(self._parts)
+
+    @property
+    def text(self):
+        """The object text received so far, from its opening brace."""
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    def feed(self, chunk):
+        """
+        Scan the next piece of the reply.
+
+        Args:
+            chunk (str): Next piece of text
+
+        Returns:
+            list: Top-level keys whose values completed in this piece
+        """
+        if self.complete or not chunk:
+            return []
+
+        start = 0
+        if not self._stack:
+            start = chunk.find('{')
+            if start < 0:
+                return []
+
+        closed_before = len(self.closed_keys)
+        self._chunk_start = start
+        i = start
+        end = len(chunk)
+        while i < end:
+            if self._in_string:
+                if self._escape:
+                    # The escaped character can't end the string
+                    self._escape = False
+                    i += 1
+                    continue
+                match = STRING_BODY_RE.match(chunk, i)
+                if match:
+                    i = match.end()
+                    if i >= end:
+                        break
+                char = chunk[i]
+                if char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._capturing_key():
+                        self._key = self._read_key(chunk, i)
+                i += 1
+                continue
+
+            char = chunk[i]
+            if char == '"':
+                self._in_string = True
+                self._string_start = self._length + (i - start)
+            elif char in CLOSERS:
+                self._stack.append(char)
+                if len(self._stack) == 1:
+                    self._expecting_key = True
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._close_key()
+                    i += 1
+                    self.complete = True
+                    break
+            elif len(self._stack) == 1:
+                if char == ':':
+                    self._expecting_key = False
+                elif char == ',':
+                    self._close_key()
+                    self._expecting_key = True
+            i += 1
+
+        piece = chunk[start:i]
+        self._parts.append(piece)
+        self._length += len(piece)
+        return self.closed_keys[closed_before:]
+
+    def _capturing_key(self):
+        return len(self._stack) == 1 and self._expecting_key
+
+    def _read_key(self, chunk, end_index):
+        """Decode the key string that just closed at chunk[end_index]."""
+        offset = self._string_start - self._length + self._chunk_start
+        if offset >= self._chunk_start:
+            raw = chunk[offset:end_index + 1]
+        else:
+            # The key started in an earlier piece
+            raw = self.text[self._string_start:] + chunk[:end_index + 1]
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _close_key(self):
+        if self._key is not None:
+            self.closed_keys.append(self._key)
+            self._key = None
+
+
+def repair_json(text):
+    """
+    Repair common defects in model-written JSON.
+
+    Removes trailing commas, drops an unterminated string or dangling key at
+    the end, and closes any arrays and objects left open by a truncated reply.
+
+    Args:
+        text (str): JSON text starting at its opening brace or bracket
+
+    Returns:
+        str: Repaired JSON text (not guaranteed to be valid)
+    """
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    string_start = 0
+    # Places the text can be cut back to: (length of out, open containers) after each comma
+    cut_points = []
+
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+            string_start = len(out)
+        elif char in CLOSERS:
+            stack.append(char)
+        elif char in '}]':
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+        elif char == ',':
+            cut_points.append((len(out), tuple(stack)))
+        out.append(char)
+        if char in '}]' and not stack:
+            break
+
+    if in_string:
+        # A string cut off mid-way is dropped rather than kept half-written
+        del out[string_start:]
+    _strip_trailing_comma(out)
+
+    candidates = [(out, stack)]
+    candidates.extend((out[:cut], list(open_stack)) for cut, open_stack in reversed(cut_points[-3:]))
+    for chars, open_stack in candidates:
+        repaired = ''.join(chars).rstrip().rstrip(',') + ''.join(CLOSERS[c] for c in reversed(open_stack))
+        try:
+            json.loads(repaired)
+            return repaired
+        except ValueError:
+            continue
+    return ''.join(out)
+
+
+def _strip_trailing_comma(out):
+    """Remove trailing whitespace and a trailing comma from a list of characters."""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ',':
+        out.pop()
+
+
+def loads_first_object(text):
+    """
+    Decode the first JSON object in a model reply, repairing it if needed.
+
+    Args:
+        text (str): Model reply, possibly with code fences or prose around the JSON
+
+    Returns:
+        dict: The decoded object, or None if the reply contains no usable object
+    """
+    scanner = JSONObjectScanner()
+    scanner.feed(text)
+    return _decode(scanner)
+
+
+def _decode(scanner):
+    """Decode the object a scanner has found, repairing it if it isn't valid JSON."""
+    if not scanner.started:
+        return None
+
+    object_text = scanner.text
+    try:
+        data = json.loads(object_text)
+    except ValueError:
+        try:
+            data = json.loads(repair_json(object_text))
+            logger.debug("Repaired malformed JSON in model response")
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def _string_list(value):
+    """Keep the non-empty strings of a list, converting numbers to strings."""
+    items = []
+    for item in value:
+        if isinstance(item, (int, float)) and not isinstance(item, bool):
+            item = str(item)
+        if isinstance(item, str) and item.strip():
+            items.append(item.strip())
+    return items
+
+
+def validate_appliance_instructions(value):
+    """
+    Keep the well-formed entries of an applianceInstructions list.
+
+    Args:
+        value: Decoded applianceInstructions field
+
+    Returns:
+        list: Entries with a string applianceName and a list of string instructions
+    """
+    if not isinstance(value, list):
+        return []
+    entries = []
+    for entry in value:
+        if not isinstance(entry, dict) or not isinstance(entry.get('applianceName'), str):
+            continue
+        instructions = entry.get('instructions')
+        if not isinstance(instructions, list):
+            continue
+        entries.append({'applianceName': entry['applianceName'], 'instructions': _string_list(instructions)})
+    return entries
+
+
+def validate_recipe(data):
+    """
+    Check a decoded reply against the recipe schema and normalize it.
+
+    Missing fields get empty values; "title" and "directions" are accepted as
+    aliases for "recipeName" and "instructions". Wrong-typed fields and list
+    items are dropped.
+
+    Args:
+        data (dict): Decoded model reply
+
+    Returns:
+        tuple: (recipe dict with recipeName, ingredients, instructions and
+            applianceInstructions, list of problems found)
+    """
+    problems = []
+    data = dict(data)
+    if 'recipeName' not in data and 'title' in data:
+        data['recipeName'] = data['title']
+    if 'instructions' not in data and 'directions' in data:
+        data['instructions'] = data['directions']
+
+    recipe = {}
+    for field, expected in RECIPE_SCHEMA.items():
+        value = data.get(field)
+        if value is None:
+            if field != 'applianceInstructions':
+                problems.append(f"missing {field}")
+            recipe[field] = None if expected is str else []
+        elif not isinstance(value, expected):
+            problems.append(f"{field} should be a {expected.__name__}")
+            recipe[field] = None if expected is str else []
+        elif expected is str:
+            recipe[field] = value.strip() or None
+        else:
+            recipe[field] = value
+
+    for field in ('ingredients', 'instructions'):
+        cleaned = _string_list(recipe[field])
+        if len(cleaned) != len(recipe[field]):
+            problems.append(f"dropped {len(recipe[field]) - len(cleaned)} invalid {field} entries")
+        recipe[field] = cleaned
+    recipe['applianceInstructions'] = validate_appliance_instructions(recipe['applianceInstructions'])
+
+    return recipe, problems
+
+
+def parse_recipe_response(text):
+    """
+    Parse a complete extraction reply.
+
+    Args:
+        text (str): Model reply
+
+    Returns:
+        tuple: (recipe dict, see validate_recipe, list of problems). The recipe is
+            all empty fields if the reply contains no usable JSON object.
+    """
+    data = loads_first_object(text)
+    if data is None:
+        return validate_recipe({})[0], ['no JSON object found']
+    return validate_recipe(data)
+
+
+class IncrementalRecipeParser:
+    """
+    Parses an extraction reply while it streams in.
+
+    Feed each piece of the reply to feed(); it returns the top-level fields that
+    just became complete, and partial() returns a validated recipe holding every
+    complete field so far.
+    """
+
+    def __init__(self):
+        self.scanner = JSONObjectScanner()
+
+    @property
+    def complete(self):
+        """True once the whole JSON object has been received."""
+        return self.scanner.complete
+
+    def feed(self, chunk):
+        """
+        Add the next piece of the reply.
+
+        Args:
+            chunk (str): Next piece of text
+
+        Returns:
+            list: Top-level field names whose values completed with this piece
+        """
+        return self.scanner.feed(chunk)
+
+    def has_fields(self, *fields):
+        """True if every named field has been fully received."""
+        return all(field in self.scanner.closed_keys for field in fields)
+
+    def partial(self):
+        """
+        Return the fields received so far.
+
+        Returns:
+            dict: Validated recipe (see validate_recipe) containing the complete
+                fields, with empty values for the rest
+        """
+        data = _decode(self.scanner) or {}
+        closed = set(self.scanner.closed_keys)
+        return validate_recipe({key: value for key, value in data.items() if key in closed})[0]
+
+    def result(self):
+        """
+        Parse the full reply once it has been received.
+
+        Returns:
+            tuple: (recipe dict, list of problems), as parse_recipe_response
+        """
+        data = _decode(self.scanner)
+        if data is None:
+            return validate_recipe({})[0], ['no JSON object found']
+        return validate_recipe(data)
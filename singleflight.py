@@ -0,0 +1,152 @@
+"""
+RecipeSnap - Request Coalescing
+Single-flight deduplication: concurrent callers asking for the same key wait on
+one in-progress computation and share its result, so a burst of identical
+requests costs one upstream call.
+"""
+
+import copy
+import asyncio
+import threading
+
+
+class _Call:
+    """An in-progress computation that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe single-flight group for blocking functions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, on_wait=None):
+        """
+        Run fn() for this key, or wait for the call already in flight.
+
+        Args:
+            key (str): Deduplication key
+            fn (callable): Zero-argument function computing the result
+            on_wait (callable): Optional callback invoked when this caller joins an in-flight call
+
+        Returns:
+            The result of fn(). Waiting callers get their own deep copy so they can
+            modify it freely. Exceptions raised by fn() propagate to every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if on_wait is not None:
+                on_wait()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return copy.deepcopy(call.result)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Return coalescing counters.
+
+        Returns:
+            dict: executions, coalesced and in_flight
+        """
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': in_flight
+        }
+
+
+class _AsyncCall:
+    """An in-progress coroutine, run as its own task, and how many callers await it."""
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Single-flight group for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, on_wait=None):
+        """
+        Await coro_fn() for this key, or wait for the call already in flight.
+
+        The call runs as its own task, so the caller that started it can be
+        cancelled without cancelling it for the others. It is only cancelled
+        once every caller waiting on it has been.
+
+        Args:
+            key (str): Deduplication key
+            coro_fn (callable): Zero-argument function returning a coroutine
+            on_wait (callable): Optional callback invoked when this caller joins an in-flight call
+
+        Returns:
+            A deep copy of the coroutine's result for each caller
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            if on_wait is not None:
+                on_wait()
+        else:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(coro_fn()))
+            self.executions += 1
+            call.task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        call.waiters += 1
+        try:
+            # Shield so one caller being cancelled doesn't cancel the shared call
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Every caller has given up
+                call.task.cancel()
+        return copy.deepcopy(result)
+
+    def stats(self):
+        """
+        Return coalescing counters.
+
+        Returns:
+            dict: executions, coalesced and in_flight
+        """
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls)
+        }
@@ -0,0 +1,342 @@
+"""
+RecipeSnap - Structured Data Parser
+Extracts schema.org Recipe markup (JSON-LD, microdata and RDFa) from a webpage
+so most recipes can be returned without an AI round trip.
+"""
+
+import re
+import json
+import html
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+
+# Microdata properties that are always lists, even with a single value
+LIST_PROPS = {'recipeIngredient', 'ingredients', 'recipeInstructions'}
+
+TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([.,;:!?)])')
+STEP_PREFIX_RE = re.compile(r'^\s*(step\s*\d+\s*[:.)-]?|\d+\s*[.)])\s*', re.IGNORECASE)
+
+
+def _clean_text(value):
+    """Unescape entities, strip inline HTML and collapse whitespace."""
+    if value is None:
+        return ''
+    text = TAG_RE.sub(' ', html.unescape(str(value)))
+    return SPACE_BEFORE_PUNCT_RE.sub(r'\1', WHITESPACE_RE.sub(' ', text)).strip()
+
+
+def _local_type(value):
+    """Return schema.org type names from an @type/itemtype/typeof value."""
+    if isinstance(value, list):
+        values = value
+    else:
+        values = str(value or '').split()
+    return {str(v).rstrip('/').rsplit('/', 1)[-1].rsplit(':', 1)[-1] for v in values}
+
+
+def _local_prop(value):
+    """Strip vocabulary prefixes from itemprop/property names (e.g. "schema:name")."""
+    return [v.rstrip('/').rsplit('/', 1)[-1].rsplit(':', 1)[-1] for v in value.split()]
+
+
+class _MarkupParser(HTMLParser):
+    """Collects JSON-LD blocks and microdata/RDFa item scopes in a single pass."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.json_ld = []
+        self.items = []
+
+        self._in_json_ld = False
+        self._json_ld_buffer = []
+        # Open elements: dicts with tag, props, scope (item dict or None), text buffer
+        self._stack = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if tag == 'script':
+            self._in_json_ld = (attrs.get('type') or '').strip().lower() == 'application/ld+json'
+            self._json_ld_buffer = []
+
+        prop_attr = attrs.get('itemprop') or attrs.get('property')
+        props = _local_prop(prop_attr) if prop_attr else []
+
+        scope = None
+        if 'itemscope' in attrs or 'typeof' in attrs:
+            scope = {'@type': _local_type(attrs.get('itemtype') or attrs.get('typeof')), 'props': {}}
+            if not props:
+                self.items.append(scope)
+
+        element = {
+            'tag': tag,
+            'props': props,
+            'scope': scope,
+            'content': attrs.get('content'),
+            'text': []
+        }
+
+        if tag in VOID_ELEMENTS:
+            self._close(element)
+        else:
+            self._stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._in_json_ld:
+            self.json_ld.append(''.join(self._json_ld_buffer))
+            self._in_json_ld = False
+
+        # Tolerate malformed HTML: only close if the tag is actually open
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index]['tag'] == tag:
+                while len(self._stack) > index:
+                    self._close(self._stack.pop())
+                return
+
+    def handle_data(self, data):
+        if self._in_json_ld:
+            self._json_ld_buffer.append(data)
+            return
+        for element in self._stack:
+            if element['props'] and element['scope'] is None:
+                element['text'].append(data)
+
+    def _close(self, element):
+        """Attach a finished property element to its nearest enclosing item scope."""
+        if not element['props']:
+            return
+
+        if element['scope'] is not None:
+            value = element['scope']
+        elif element['content'] is not None:
+            value = element['content']
+        else:
+            value = ''.join(element['text'])
+
+        for parent in reversed(self._stack):
+            if parent['scope'] is not None and parent is not element:
+                for prop in element['props']:
+                    parent['scope']['props'].setdefault(prop, []).append(value)
+                return
+
+
+def _iter_json_ld_nodes(node):
+    """Yield every dict in a JSON-LD document, including @graph members."""
+    if isinstance(node, list):
+        for child in node:
+            yield from _iter_json_ld_nodes(child)
+    elif isinstance(node, dict):
+        yield node
+        for key in ('@graph', 'mainEntity', 'mainEntityOfPage'):
+            if key in node:
+                yield from _iter_json_ld_nodes(node[key])
+
+
+def _flatten_instructions(value):
+    """Flatten HowToStep / HowToSection / plain-string instructions into a list of steps."""
+    steps = []
+    if value is None:
+        return steps
+    if isinstance(value, str):
+        for line in re.split(r'\n+', value):
+            line = _clean_text(line)
+            if line:
+                steps.append(line)
+    elif isinstance(value, list):
+        for child in value:
+            steps.extend(_flatten_instructions(child))
+    elif isinstance(value, dict):
+        if 'itemListElement' in value:
+            steps.extend(_flatten_instructions(value['itemListElement']))
+        else:
+            text = value.get('text') or value.get('name') or value.get('description')
+            if isinstance(text, list):
+                text = ' '.join(str(t) for t in text)
+            text = _clean_text(text)
+            if text:
+                steps.append(text)
+    return steps
+
+
+def _microdata_to_json_ld(item):
+    """Convert a parsed microdata/RDFa scope into a JSON-LD style dict."""
+    node = {'@type': list(item['@type'])}
+    for prop, values in item['props'].items():
+        converted = [
+            _microdata_to_json_ld(v) if isinstance(v, dict) else v
+            for v in values
+        ]
+        if len(converted) == 1 and prop not in LIST_PROPS:
+            converted = converted[0]
+        node[prop] = converted
+    return node
+
+
+def _first_string(value):
+    """Return the first non-empty string from a value that may be a list."""
+    if isinstance(value, list):
+        for v in value:
+            text = _first_string(v)
+            if text:
+                return text
+        return ''
+    if isinstance(value, dict):
+        return _first_string(value.get('name') or value.get('text'))
+    return _clean_text(value)
+
+
+def _json_ld_recipe_nodes(block):
+    """Return the Recipe nodes in one JSON-LD script block (empty if it isn't valid JSON)."""
+    try:
+        document = json.loads(block.strip())
+    except json.JSONDecodeError:
+        # Some sites emit raw control characters inside JSON-LD strings
+        try:
+            document = json.loads(block.strip(), strict=False)
+        except json.JSONDecodeError:
+            return []
+    return [
+        node for node in _iter_json_ld_nodes(document)
+        if 'Recipe' in _local_type(node.get('@type'))
+    ]
+
+
+def find_recipe_nodes(webpage_content):
+    """
+    Find schema.org Recipe objects embedded in a page.
+
+    Args:
+        webpage_content (str): Raw HTML
+
+    Returns:
+        list: Recipe nodes as JSON-LD style dicts, JSON-LD first, then microdata/RDFa
+    """
+    parser = _MarkupParser()
+    try:
+        parser.feed(webpage_content)
+        parser.close()
+    except Exception as e:
+        logger.warning("Could not parse page markup: %s", e)
+
+    nodes = []
+    for block in parser.json_ld:
+        nodes.extend(_json_ld_recipe_nodes(block))
+
+    for item in parser.items:
+        if 'Recipe' in item['@type']:
+            nodes.append(_microdata_to_json_ld(item))
+
+    return nodes
+
+
+def extract_structured_recipe(webpage_content, url):
+    """
+    Build a recipe from embedded schema.org markup.
+
+    Args:
+        webpage_content (str): Raw HTML
+        url (str): Source URL
+
+    Returns:
+        dict: Recipe in the same format as RecipeExtractor.extract_recipe (with an empty
+        applianceInstructions list), or None if no complete Recipe markup was found
+    """
+    for node in find_recipe_nodes(webpage_content):
+        recipe = _recipe_from_node(node, url)
+        if recipe:
+            return recipe
+
+    return None
+
+
+def _recipe_from_node(node, url):
+    """Build a recipe from one Recipe node, or return None if its markup is incomplete."""
+    title = _first_string(node.get('name') or node.get('headline'))
+
+    raw_ingredients = node.get('recipeIngredient') or node.get('ingredients') or []
+    if isinstance(raw_ingredients, str):
+        raw_ingredients = [raw_ingredients]
+    ingredients = [_clean_text(i) for i in raw_ingredients if _clean_text(i)]
+
+    directions = []
+    for i, step in enumerate(_flatten_instructions(node.get('recipeInstructions')), 1):
+        directions.append(f"Step {i}: {STEP_PREFIX_RE.sub('', step)}")
+
+    # Incomplete markup: let the AI extraction handle this page
+    if not title or not ingredients or not directions:
+        return None
+
+    return {
+        "title": title,
+        "ingredients": ingredients,
+        "directions": directions,
+        "recipeName": title,
+        "instructions": directions,
+        "applianceInstructions": [],
+        "source_url": url
+    }
+
+
+class StructuredRecipeWatcher:
+    """
+    Incremental detector for a complete JSON-LD Recipe while a page is still downloading.
+
+    Feed decoded HTML chunks with feed(), or, if the page is already being parsed
+    elsewhere, pass its growing list of JSON-LD blocks to check(). found becomes True
+    as soon as a JSON-LD block holding a complete recipe has been read, so the rest
+    of the page can be skipped.
+    """
+
+    def __init__(self):
+        self.found = False
+        self._parser = None
+        self._checked = 0
+
+    def feed(self, text):
+        """
+        Parse another chunk of HTML.
+
+        Returns:
+            bool: True once a complete structured recipe has been seen
+        """
+        if self.found:
+            return True
+        if self._parser is None:
+            self._parser = _MarkupParser()
+        try:
+            self._parser.feed(text)
+        except Exception:
+            # Malformed markup: fall back to reading the page normally
+            return False
+        return self.check(self._parser.json_ld)
+
+    def check(self, blocks):
+        """
+        Look for a complete recipe in JSON-LD blocks not checked yet.
+
+        Args:
+            blocks (list): Every JSON-LD block of the page read so far, in page order
+
+        Returns:
+            bool: True once a complete structured recipe has been seen
+        """
+        for block in blocks[self._checked:]:
+            if any(_recipe_from_node(node, '') for node in _json_ld_recipe_nodes(block)):
+                self.found = True
+        self._checked = len(blocks)
+        return self.found
@@ -0,0 +1,98 @@
+"""Shared fixtures: fake HTTP responses and an extractor that never touches the network."""
+
+import os
+import sys
+import json
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_backends import WriterBackend  # noqa: E402
+from recipe_extractor import RecipeExtractor  # noqa: E402
+
+
+class FakeResponse:
+    """Just enough of requests.Response for page fetches and API calls."""
+
+    def __init__(self, status_code=200, body='', headers=None, chunk_size=None):
+        self.status_code = status_code
+        self.text = body
+        self.headers = {'Content-Type': 'text/html; charset=utf-8', **(headers or {})}
+        self._body = body.encode('utf-8')
+        self._chunk_size = chunk_size
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=None):
+        size = self._chunk_size or chunk_size or len(self._body) or 1
+        for start in range(0, len(self._body), size):
+            yield self._body[start:start + size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    """Serves pages from a dict of url -> FakeResponse (404 for anything else) and records requests."""
+
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        return self.pages.get(url) or FakeResponse(404, 'Not Found')
+
+
+class LLMSession(FakeSession):
+    """Serves pages like FakeSession, but sends LLM calls on to a local mock LLM server."""
+
+    def post(self, url, **kwargs):
+        return requests.post(url, **kwargs)
+
+
+RECIPE_REPLY = json.dumps({
+    'recipeName': 'Mock Recipe',
+    'ingredients': ['1 cup flour', '2 eggs'],
+    'instructions': ['Step 1: Mix.', 'Step 2: Bake.'],
+})
+
+
+@pytest.fixture
+def make_extractor():
+    """Build a RecipeExtractor with a fake session and an LLM that always returns RECIPE_REPLY."""
+    def make(pages=None, reply=RECIPE_REPLY, **kwargs):
+        extractor = RecipeExtractor(backend=WriterBackend(api_key='test-key'), session=FakeSession(pages), **kwargs)
+        extractor.llm_prompts = []
+
+        def call_llm(prompt, on_delta=None):
+            extractor.llm_prompts.append(prompt)
+            if on_delta is not None:
+                on_delta(reply)
+            return reply
+        extractor._call_llm = call_llm
+        return extractor
+    return make
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """Import the Flask app with its stores in a temporary directory and background work off."""
+    directory = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'RECIPE_CACHE_PATH': str(directory / 'cache.sqlite3'),
+        'RECIPE_STORE_PATH': str(directory / 'store.sqlite3'),
+        'JOB_QUEUE_ENABLED': 'false',
+        'PREFETCH_ENABLED': 'false',
+        'APPLIANCE_PRECOMPUTE': 'false',
+        'LLM_BACKEND': 'writer',
+        'WRITER_API_KEY': 'test-key',
+    })
+    import app
+    return app
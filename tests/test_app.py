@@ -0,0 +1,201 @@
+from conftest import FakeResponse
+
+PAGE = """<html><body><article><h1>Pancakes</h1>
+<ul><li>1 cup flour</li><li>2 eggs</li></ul><ol><li>Mix.</li><li>Cook.</li></ol>
+</article></body></html>"""
+
+
+def test_batch_reports_failed_fetch(app_module, make_extractor, monkeypatch):
+    pages = {f'https://example.com/recipe-{i}': FakeResponse(200, PAGE) for i in range(4)}
+    monkeypatch.setattr(app_module, 'extractor', make_extractor(pages=pages))
+    urls = list(pages) + ['https://example.com/nope.html']
+
+    response = app_module.app.test_client().post('/api/extract/batch', json={'urls': urls})
+
+    body = response.get_json()
+    assert body['stats']['succeeded'] == 4
+    assert body['stats']['failed'] == 1
+    failed = [result for result in body['results'] if not result['success']]
+    assert failed[0]['url'] == 'https://example.com/nope.html'
+    assert failed[0]['recipe'] is None
+    assert failed[0]['error'] == 'Could not fetch page: HTTP 404'
+
+
+def test_single_extract_flags_url_only_guess(app_module, make_extractor, monkeypatch):
+    monkeypatch.setattr(app_module, 'extractor', make_extractor())
+
+    response = app_module.app.test_client().post('/api/extract', json={'url': 'https://example.com/nope.html'})
+
+    recipe = response.get_json()['recipe']
+    assert recipe['fetch_error'] == 'HTTP 404'
+
+
+def test_scale_rejects_malformed_entries(app_module):
+    client = app_module.app.test_client()
+    entries = [
+        {'url': 5},
+        {'ingredients': ['1 cup flour'], 'servings': True, 'target_servings': 2},
+        {'ingredients': ['1 egg'], 'factor': 2},
+    ]
+
+    for endpoint in ('/api/scale', '/api/shopping-list'):
+        response = client.post(endpoint, json={'recipes': entries})
+
+        assert response.status_code == 200
+        errors = [recipe['error'] for recipe in response.get_json()['recipes']]
+        assert errors == [
+            'Field "url" must be a string',
+            '"servings" and "target_servings" must be positive numbers',
+            None,
+        ]
+
+
+def test_queued_job_retries_unfetchable_page(app_module, make_extractor, monkeypatch, tmp_path):
+    from job_queue import JobQueue
+
+    monkeypatch.setattr(app_module, 'extractor', make_extractor())
+    queue = JobQueue(app_module._run_extraction_job, path=str(tmp_path / 'jobs.sqlite3'),
+                     max_attempts=2, retry_backoff=0)
+    job_id = queue.submit({'url': 'https://example.com/nope.html'})['id']
+
+    for _ in range(2):
+        queue._run(*queue._claim())
+
+    job = queue.get(job_id)
+    assert (job['status'], job['attempts'], job['result']) == ('failed', 2, None)
+    assert job['error'] == 'Could not fetch page: HTTP 404'
+
+
+def test_stream_cancels_pending_extractions_on_disconnect(app_module, make_extractor, monkeypatch):
+    import json
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='batch-extract')
+    monkeypatch.setattr(app_module, 'batch_executor', executor)
+    monkeypatch.setattr(app_module, 'extractor', make_extractor())
+    release = threading.Event()
+    started = []
+
+    def extract_one(url, on_event=None):
+        started.append((url, threading.current_thread().name))
+        on_event('fetched', {})
+        release.wait(5)
+        return {'url': url, 'success': True, 'recipe': None, 'error': None, 'duration_ms': 0.0}
+    monkeypatch.setattr(app_module, '_extract_one', extract_one)
+    urls = [f'https://example.com/recipe-{i}' for i in range(3)]
+
+    response = app_module.app.test_client().post('/api/extract/batch/stream', json={'urls': urls}, buffered=False)
+    first = json.loads(next(iter(response.response)))
+    response.close()
+    release.set()
+    executor.shutdown(wait=True)
+
+    assert first['event'] == 'fetched'
+    # Only the extraction already running when the client left was carried out, on the shared pool
+    assert [url for url, _ in started] == urls[:1]
+    assert started[0][1].startswith('batch-extract')
+
+
+def test_single_stream_runs_on_the_shared_pool(app_module, make_extractor, monkeypatch):
+    import json
+    import threading
+
+    monkeypatch.setattr(app_module, 'extractor', make_extractor())
+    threads = []
+
+    def extract_one(url, on_event=None):
+        threads.append(threading.current_thread().name)
+        return {'url': url, 'success': True, 'recipe': None, 'error': None, 'duration_ms': 0.0}
+    monkeypatch.setattr(app_module, '_extract_one', extract_one)
+
+    response = app_module.app.test_client().post('/api/extract/stream', json={'url': 'https://example.com/a'})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert [event['event'] for event in events] == ['result', 'done']
+    assert threads[0].startswith('batch-extract')
+
+
+def test_stream_events_arrive_in_order_as_ndjson(app_module, make_extractor, monkeypatch):
+    import json
+
+    url = 'https://example.com/pancakes'
+    monkeypatch.setattr(app_module, 'extractor', make_extractor(pages={url: FakeResponse(200, PAGE)}))
+
+    response = app_module.app.test_client().post('/api/extract/stream', json={'url': url})
+
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    names = [event['event'] for event in events]
+    assert names[:3] == ['fetched', 'reduced', 'llm_started']
+    assert names[-3:] == ['parsed', 'result', 'done']
+    assert set(names[3:-3]) <= {'partial'}
+    assert events[-2]['recipe']['title'] == 'Mock Recipe'
+    stats = events[-1]['stats']
+    assert (stats['requested'], stats['unique'], stats['succeeded']) == (1, 1, 1)
+    elapsed = [event['elapsed_ms'] for event in events[:-1]]
+    assert elapsed == sorted(elapsed)
+
+
+def test_batch_stream_as_server_sent_events(app_module, make_extractor, monkeypatch):
+    import json
+
+    pages = {f'https://example.com/recipe-{i}': FakeResponse(200, PAGE) for i in range(2)}
+    monkeypatch.setattr(app_module, 'extractor', make_extractor(pages=pages))
+    urls = list(pages) + [list(pages)[0]]
+
+    response = app_module.app.test_client().post(
+        '/api/extract/batch/stream', json={'urls': urls}, headers={'Accept': 'text/event-stream'}
+    )
+
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    blocks = response.get_data(as_text=True).split('\n\n')
+    assert blocks[-1] == ''
+    events = []
+    for block in blocks[:-1]:
+        name, data = block.split('\n')
+        assert name.startswith('event: ') and data.startswith('data: ')
+        events.append(json.loads(data[len('data: '):]))
+        assert events[-1]['event'] == name[len('event: '):]
+    results = [event for event in events if event['event'] == 'result']
+    assert sorted(result['url'] for result in results) == list(pages)
+    # Each URL's result comes after its own progress events, and "done" comes last
+    for result in results:
+        own = [i for i, event in enumerate(events) if event.get('url') == result['url']]
+        assert events[own[-1]] is result
+    assert events[-1]['event'] == 'done'
+    assert events[-1]['stats']['requested'] == 3
+    assert events[-1]['stats']['unique'] == 2
+
+
+def test_metrics_endpoint_serves_prometheus_text(app_module):
+    client = app_module.app.test_client()
+    client.get('/api/health')
+
+    response = client.get('/api/metrics')
+
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    text = response.get_data(as_text=True)
+    assert text.endswith('\n')
+    assert '# TYPE recipesnap_http_requests_total counter' in text
+    assert 'recipesnap_http_requests_total{endpoint="/api/health",status="200"}' in text
+    assert 'recipesnap_http_request_duration_seconds_bucket{endpoint="/api/health",le="+Inf"}' in text
+    assert 'recipesnap_cache_entries{cache="extraction"}' in text
+    assert 'recipesnap_coalesce_in_flight{operation="extract"} 0' in text
+
+
+def test_request_id_header_reaches_log_records(app_module, make_extractor, monkeypatch, caplog):
+    from logging_setup import RequestIdFilter
+
+    monkeypatch.setattr(app_module, 'extractor', make_extractor())
+    caplog.handler.addFilter(RequestIdFilter())
+    client = app_module.app.test_client()
+
+    response = client.post('/api/extract', json={'url': 'https://example.com/nope.html'},
+                           headers={'X-Request-ID': 'trace-7'})
+
+    assert response.headers['X-Request-ID'] == 'trace-7'
+    fetch_warnings = [record for record in caplog.records if 'Could not fetch' in record.getMessage()]
+    assert [record.request_id for record in fetch_warnings] == ['trace-7']
+    assert client.get('/api/health').headers['X-Request-ID'] != 'trace-7'
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from async_recipes import AsyncRecipeExtractor, AsyncRecipeSearcher
+from conftest import RECIPE_REPLY
+from http_client import AsyncHTTPClient
+from llm_backends import LocalBackend
+from mock_llm_server import serve
+
+PAGE = """<html><body><article><h1>Pancakes</h1>
+<h2>Ingredients</h2><ul><li>1 cup flour</li><li>2 eggs</li></ul>
+<h2>Instructions</h2><ol><li>Mix.</li><li>Cook.</li></ol>
+</article></body></html>"""
+
+
+@pytest.fixture
+def site():
+    """A recipe site serving PAGE at every path, and a Google-like search API at /search."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            if self.path.startswith('/search'):
+                items = [{'title': f'Pancakes {i}', 'link': f'https://example.com/pancakes-{i}'} for i in range(5)]
+                body, content_type = json.dumps({'items': items}).encode(), 'application/json'
+            else:
+                body, content_type = PAGE.encode(), 'text/html; charset=utf-8'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", hits
+    server.shutdown()
+
+
+@pytest.fixture
+def llm():
+    server = serve(port=0, latency='fixed:20', responses=[{'content': RECIPE_REPLY}])
+    yield server
+    server.shutdown()
+
+
+def test_concurrent_extractions_share_duplicate_work(site, llm):
+    base, hits = site
+    backend = LocalBackend(api_url=f"http://127.0.0.1:{llm.server_address[1]}/v1/chat/completions")
+    urls = [f"{base}/pancakes-{i}" for i in range(4)] + [f"{base}/pancakes-0"]
+
+    async def run():
+        async with AsyncRecipeExtractor(backend=backend) as extractor:
+            return await asyncio.gather(*(extractor.extract_recipe(url) for url in urls))
+    recipes = asyncio.run(run())
+
+    assert [recipe['title'] for recipe in recipes] == ['Mock Recipe'] * 5
+    assert [recipe['source_url'] for recipe in recipes] == urls
+    assert recipes[0]['ingredients'] == ['1 cup flour', '2 eggs']
+    # The repeated URL joined the extraction already in flight
+    assert sorted(hits) == [f"/pancakes-{i}" for i in range(4)]
+    assert llm.mock.stats()['requests'] == 4
+
+
+def test_async_extraction_of_missing_page_is_flagged(site, llm):
+    base, _ = site
+    backend = LocalBackend(api_url=f"http://127.0.0.1:{llm.server_address[1]}/v1/chat/completions")
+
+    async def run():
+        async with AsyncRecipeExtractor(backend=backend, http=AsyncHTTPClient(retries=0)) as extractor:
+            return await extractor.extract_recipe('http://127.0.0.1:9/unreachable')
+    recipe = asyncio.run(run())
+
+    assert recipe['title'] == 'Mock Recipe'
+    assert recipe['fetch_error']
+
+
+def test_async_searcher_slices_cached_results(site):
+    base, hits = site
+
+    async def run():
+        async with AsyncRecipeSearcher(api_key='key', search_engine_id='cx') as searcher:
+            searcher.api_url = f"{base}/search"
+            first = await searcher.search_recipes('Pancakes', 5)
+            second = await searcher.search_recipes('pancake recipe', 2)
+            return first, second
+    first, second = asyncio.run(run())
+
+    assert [result['url'] for result in first] == [f'https://example.com/pancakes-{i}' for i in range(5)]
+    assert second == first[:2]
+    assert len(hits) == 1
@@ -0,0 +1,51 @@
+import socket
+import struct
+import time
+from functools import partial
+from urllib.parse import urlsplit
+
+from benchmark import Benchmark, _CorpusHandler, _start_server, percentile
+
+
+class StreamingExtractor:
+    """Emits the events of an LLM extraction whose reply streams in over 60 ms."""
+
+    def extract_recipe(self, url, on_event=None):
+        on_event('fetched', {})
+        on_event('llm_started', {'stage': 'recipe'})
+        for _ in range(3):
+            time.sleep(0.02)
+            on_event('partial', {'fields': ['ingredients']})
+        on_event('parsed', {})
+        return {'ingredients': ['1 cup flour']}
+
+
+def test_partial_events_do_not_reset_stage_clock():
+    stages = Benchmark._extract_with_stages(StreamingExtractor(), 'https://example.com/r')
+
+    assert stages['llm_and_parse'] >= 55
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([40, 10, 30, 20], 50) == 20
+    assert percentile([40, 10, 30, 20], 95) == 40
+    assert percentile([], 50) is None
+
+
+def test_corpus_server_ignores_dropped_connections(tmp_path, capsys):
+    (tmp_path / 'page.html').write_text('<p>recipe</p>' * 200000)
+    server, base_url = _start_server(partial(_CorpusHandler, directory=str(tmp_path)))
+    try:
+        for _ in range(3):
+            # Read the start of the page, then reset the connection like an early stop does
+            client = socket.create_connection((urlsplit(base_url).hostname, urlsplit(base_url).port))
+            client.sendall(b'GET /page.html HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            client.recv(1024)
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            client.close()
+        time.sleep(0.2)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'Traceback' not in capsys.readouterr().err
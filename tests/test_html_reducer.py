@@ -0,0 +1,72 @@
+import html_reducer
+from html_reducer import CHARS_PER_TOKEN, HTMLReducer, build_payload, recipe_region_complete, reduce_html
+
+STORY = ''.join(f'<p>Story paragraph {i} about my grandmother.</p>' for i in range(40))
+RECIPE = '''<h2>Ingredients</h2><ul><li>1 cup flour</li><li>2 eggs</li><li>1 tsp salt</li></ul>
+<h2>Instructions</h2><ol><li>Mix.</li><li>Bake.</li></ol>'''
+PAGE = f'''<html><head><title>Best  Pancakes</title><style>p {{ color: red }}</style></head><body>
+<header><nav>Home | Recipes</nav></header><script>track()</script>
+<article><header><h1>Pancakes</h1></header>{STORY}{RECIPE}<!-- ad slot --></article>
+<footer>Copyright</footer></body></html>'''
+
+
+def test_keeps_recipe_text_and_drops_page_chrome():
+    text = reduce_html(PAGE)
+
+    assert text.startswith('Page title: Best Pancakes\n')
+    assert '- 1 cup flour\n- 2 eggs\n- 1 tsp salt\nInstructions\n- Mix.\n- Bake.' in text
+    for chrome in ('track()', 'color: red', 'Home | Recipes', 'Copyright', 'ad slot'):
+        assert chrome not in text
+
+
+def test_starts_near_the_ingredients_heading():
+    lines = reduce_html(PAGE).split('\n')
+
+    assert 'Story paragraph 0 about my grandmother.' not in lines
+    assert lines.index('Ingredients') == 9
+
+
+def test_stays_within_token_budget():
+    text = reduce_html(PAGE.replace('Mix.', 'Mix. ' * 200), token_budget=150)
+
+    assert len(text) <= 150 * CHARS_PER_TOKEN
+    assert '- 1 cup flour' in text
+
+
+def test_region_complete_needs_both_headings_and_a_full_budget():
+    reducer = HTMLReducer()
+    reducer.feed(PAGE[:PAGE.index('<h2>Instructions')])
+    assert not recipe_region_complete(reducer, token_budget=10)
+
+    reducer.feed(PAGE[PAGE.index('<h2>Instructions'):])
+    reducer.close()
+    assert recipe_region_complete(reducer, token_budget=10)
+    assert not recipe_region_complete(reducer, token_budget=6000)
+
+
+class CountingPattern:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.calls = 0
+
+    def match(self, text):
+        self.calls += 1
+        return self.pattern.match(text)
+
+
+def test_each_line_is_scanned_once(monkeypatch):
+    pattern = CountingPattern(html_reducer.INGREDIENTS_HEADING_RE)
+    monkeypatch.setattr(html_reducer, 'INGREDIENTS_HEADING_RE', pattern)
+    reducer = HTMLReducer()
+    for _ in range(2000):
+        reducer.feed('<p>Ingredients</p><p>1 cup flour</p>')
+        recipe_region_complete(reducer)
+    reducer.close()
+
+    text = build_payload(reducer, token_budget=100)
+
+    assert len(reducer.lines) == 4000
+    assert pattern.calls == 4000
+    # The last heading with a full window of quantities wins, and the region starts a few lines above it
+    assert reducer.region.ingredients_heading() == 3970
+    assert text.startswith('\n'.join(reducer.lines[3962:3990]))
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+
+from http_client import AsyncHTTPClient, create_session
+
+
+@pytest.fixture
+def unavailable_server():
+    """A server that answers every request with 503 and counts them by method."""
+    counts = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self):
+            counts[self.command] = counts.get(self.command, 0) + 1
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/", counts
+    server.shutdown()
+
+
+def test_session_retries_get_but_not_post(unavailable_server):
+    url, counts = unavailable_server
+    session = create_session(retries=2, backoff=0)
+
+    assert session.get(url).status_code == 503
+    assert session.post(url, json={'prompt': 'hi'}).status_code == 503
+
+    assert counts == {'GET': 3, 'POST': 1}
+
+
+def test_async_client_retries_get_but_not_post(unavailable_server):
+    url, counts = unavailable_server
+
+    async def run():
+        client = AsyncHTTPClient(retries=2, backoff=0)
+        try:
+            await client.request('GET', url)
+            await client.request('POST', url, json={'prompt': 'hi'})
+        finally:
+            await client.close()
+    asyncio.run(run())
+
+    assert counts == {'GET': 3, 'POST': 1}
+
+
+def test_async_post_retried_only_when_never_connected():
+    client = AsyncHTTPClient(retries=2)
+
+    assert not client._retryable('POST', 0, error=asyncio.TimeoutError())
+    assert not client._retryable('POST', 0, error=aiohttp.ServerDisconnectedError())
+    assert client._retryable('POST', 0, error=aiohttp.ClientConnectorError(None, OSError('refused')))
+    assert client._retryable('GET', 0, error=asyncio.TimeoutError())
+    assert not client._retryable('GET', 2, error=asyncio.TimeoutError())
+
+
+def test_async_retry_waits_are_capped_and_release_the_host_slot():
+    import time
+
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.path)
+            busy = self.path == '/busy' and seen.count('/busy') == 1
+            self.send_response(503 if busy else 200)
+            if busy:
+                self.send_header('Retry-After', '3600')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    finished = []
+
+    async def get(client, path):
+        response = await client.request('GET', base + path)
+        finished.append(path)
+        return response.status_code
+
+    async def run():
+        client = AsyncHTTPClient(host_concurrency=1, retries=1, max_retry_after=0.3)
+        try:
+            busy = asyncio.create_task(get(client, '/busy'))
+            await asyncio.sleep(0.1)
+            return await asyncio.gather(busy, get(client, '/free'))
+        finally:
+            await client.close()
+
+    start = time.monotonic()
+    try:
+        statuses = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert statuses == [200, 200]
+    # The hour-long Retry-After was cut short, and /free ran while /busy backed off
+    assert time.monotonic() - start < 5
+    assert finished == ['/free', '/busy']
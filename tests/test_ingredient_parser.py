@@ -0,0 +1,118 @@
+import pytest
+
+from ingredient_parser import IngredientTable, parse_ingredient
+
+
+def texts(table, recipe=0):
+    return [row['text'] for row in table.records(recipe)]
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('17 cups water', '1 gallon water'),
+    ('6 cups chicken broth', '1 1/2 quarts chicken broth'),
+    ('2 cups milk', '1 pint milk'),
+    ('1 cup sugar', '1 cup sugar'),
+    ('2 cups flour', '2 cups flour'),
+    ('20 cups popcorn', '20 cups popcorn'),
+    ('1 cup heavy cream', '1 cup heavy cream'),
+    ('3 tsp baking powder', '1 tbsp baking powder'),
+])
+def test_imperial_conversion_uses_largest_unit(line, expected):
+    assert texts(IngredientTable.from_recipes([[line]]).convert('imperial').rounded()) == [expected]
+
+
+def test_metric_conversion_and_rounding():
+    table = IngredientTable.from_recipes([['1 1/2 cups flour', '1 lb ground beef', '1 tsp salt']])
+    assert texts(table.convert('metric').rounded()) == ['355 ml flour', '455 g ground beef', '4.9 ml salt']
+
+
+def test_scale_per_recipe_keeps_counted_units():
+    table = IngredientTable.from_recipes([['2 cans (15 oz) black beans, drained'], ['a pinch of salt']])
+    scaled = table.scale([2, 3]).rounded()
+    assert texts(scaled, 0) == ['4 (15 oz) cans black beans, drained']
+    assert texts(scaled, 1) == ['3 pinches salt']
+
+
+def test_parse_ingredient_fields():
+    parsed = parse_ingredient('2-3 tablespoons olive oil, divided')
+    assert parsed['quantity'] == 2
+    assert parsed['quantity_max'] == 3
+    assert parsed['unit'] == 'tbsp'
+    assert parsed['item'] == 'olive oil'
+    assert parsed['notes'] == 'divided'
+
+
+@pytest.mark.parametrize('line, names', [
+    ('1 lb ground beef', ['ground beef']),
+    ('1 tsp ground cinnamon', ['ground cinnamon']),
+    ('Salt and pepper to taste', ['salt', 'pepper']),
+    ('4 cloves garlic, minced', ['garlic']),
+    ('1 (28 ounce) can crushed tomatoes', ['tomato']),
+])
+def test_ingredient_names(line, names):
+    assert parse_ingredient(line)['names'] == names
+
+
+@pytest.mark.parametrize('line', ['1 15-oz can tomatoes', '1 15 oz can tomatoes', '1 (15 ounce) can tomatoes'])
+def test_inline_package_size(line):
+    parsed = parse_ingredient(line)
+    assert (parsed['quantity'], parsed['unit'], parsed['item']) == (1, 'can', 'tomatoes')
+    assert parsed['size'] in ('15 oz', '15 ounce')
+
+
+def test_shopping_list_lists_each_ingredient_of_compound_line():
+    items = IngredientTable.from_recipes([['Salt and pepper to taste', '1 tsp salt']]).shopping_list()
+    assert [(item['name'], item['text']) for item in items] == [
+        ('pepper', 'pepper'), ('salt', '1 tsp salt'), ('salt', 'salt')
+    ]
+
+
+def test_shopping_list_merges_sizes_and_units():
+    items = IngredientTable.from_recipes([
+        ['2 cans (15 oz) black beans', '1 lb ground beef'],
+        ['1 15-ounce can black beans', '500 g ground beef', '1 lb ground turkey'],
+    ]).shopping_list()
+    by_name = {item['name']: item for item in items}
+    assert by_name['black bean']['text'] == '3 (15 oz) cans black beans'
+    assert by_name['black bean']['recipes'] == [0, 1]
+    assert by_name['ground beef']['text'] == '2 1/8 lb ground beef'
+    assert 'ground turkey' in by_name
+
+
+def test_counted_items_are_pluralized():
+    items = IngredientTable.from_recipes([['1 egg', '1 tomato'], ['2 eggs', '1/2 tomato']]).shopping_list()
+    assert [item['text'] for item in items] == ['3 eggs', '1 1/2 tomatoes']
+    table = IngredientTable.from_recipes([['1 onion, diced', '2 egg whites', '1 berry']]).scale(3)
+    assert texts(table) == ['3 onions, diced', '6 egg whites', '3 berries']
+
+
+def test_counted_items_agree_with_scaled_amount():
+    lines = ['2 large eggs', '2 bay leaves', '1 glass of wine', '2 salt', '2 cookies']
+    assert texts(IngredientTable.from_recipes([lines]).scale(0.5)) == [
+        '1 large egg', '1 bay leaf', '1/2 glass of wine', '1 salt', '1 cookie'
+    ]
+    assert texts(IngredientTable.from_recipes([lines]).scale(2)) == [
+        '4 large eggs', '4 bay leaves', '2 glasses of wine', '4 salt', '4 cookies'
+    ]
+
+
+@pytest.mark.parametrize('line, unit, expected', [
+    ('2 T butter', 'tbsp', '4 tbsp butter'),
+    ('1 t salt', 'tsp', '2 tsp salt'),
+    ('1 T-bone steak', None, '2 T-bone steaks'),
+])
+def test_cased_spoon_abbreviations(line, unit, expected):
+    assert parse_ingredient(line)['unit'] == unit
+    assert texts(IngredientTable.from_recipes([[line]]).scale(2)) == [expected]
+
+
+def test_shopping_list_merges_aliased_names():
+    items = IngredientTable.from_recipes([
+        ['2 cups all-purpose flour', '1 tsp kosher salt'],
+        ['1 cup flour', '1/2 tsp salt', '1 cup bread flour'],
+    ]).shopping_list()
+    assert [(item['name'], item['text'], item['recipes']) for item in items] == [
+        ('bread flour', '1 cup bread flour', [1]),
+        ('flour', '3 cups flour', [0, 1]),
+        ('salt', '1 1/2 tsp salt', [0, 1]),
+    ]
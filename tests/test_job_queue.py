@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(handler, **kwargs):
+        kwargs.setdefault('retry_backoff', 0)
+        queue = JobQueue(handler, path=str(tmp_path / 'jobs.sqlite3'), workers=2, poll_interval=0.01, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop(timeout=5)
+
+
+def wait_for(queue, job_id, statuses=('succeeded', 'failed')):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job still {job['status']}")
+
+
+def test_failed_attempts_are_retried(make_queue):
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload)
+        if len(attempts) < 3:
+            raise Exception('upstream timeout')
+        return {'url': payload['url']}
+
+    queue = make_queue(flaky, max_attempts=3)
+    queue.start()
+    job = wait_for(queue, queue.submit({'url': 'https://example.com/r'})['id'])
+
+    assert (job['status'], job['attempts'], job['result'], job['error']) == (
+        'succeeded', 3, {'url': 'https://example.com/r'}, None
+    )
+    stats = queue.stats()
+    assert (stats['succeeded'], stats['completed'], stats['retried']) == (1, 1, 2)
+
+
+def test_job_fails_after_its_last_attempt(make_queue):
+    def broken(payload):
+        raise Exception('page gone')
+
+    queue = make_queue(broken, max_attempts=2)
+    queue.start()
+    job = wait_for(queue, queue.submit({})['id'])
+
+    assert (job['status'], job['attempts'], job['error']) == ('failed', 2, 'page gone')
+    assert queue.stats()['failed_permanently'] == 1
+
+
+def test_retries_back_off(make_queue):
+    def broken(payload):
+        raise Exception('rate limited')
+
+    queue = make_queue(broken, max_attempts=3, retry_backoff=60)
+    job_id = queue.submit({})['id']
+    queue._run(*queue._claim())
+
+    job = queue.get(job_id)
+    assert job['status'] == 'queued'
+    assert 30 <= job['retry_at'] - job['updated_at'] <= 60
+    assert queue._claim() is None
+
+
+def test_job_with_expired_lease_is_claimed_again(make_queue):
+    queue = make_queue(lambda payload: None, lease=0.05)
+    job_id = queue.submit({'url': 'https://example.com/r'})['id']
+
+    # A worker claims the job and then dies without finishing it
+    assert queue._claim()[0] == job_id
+    assert queue._claim() is None
+    time.sleep(0.1)
+
+    claimed = queue._claim()
+    assert (claimed[0], claimed[2]) == (job_id, 2)
+    job = queue.get(job_id)
+    assert (job['status'], job['error']) == ('running', 'Worker lost: lease expired')
+
+
+def test_lost_job_fails_after_its_last_attempt(make_queue):
+    queue = make_queue(lambda payload: None, lease=0.05, max_attempts=2)
+    job_id = queue.submit({})['id']
+
+    for _ in range(2):
+        assert queue._claim()[0] == job_id
+        time.sleep(0.1)
+
+    assert queue._claim() is None
+    job = queue.get(job_id)
+    assert (job['status'], job['attempts'], job['error']) == ('failed', 2, 'Worker lost: lease expired')
+
+
+def test_outcome_of_an_expired_attempt_is_discarded(make_queue):
+    queue = make_queue(lambda payload: 'stale', lease=0.05)
+    job_id = queue.submit({})['id']
+    first = queue._claim()
+    time.sleep(0.1)
+    second = queue._claim()
+
+    queue._run(*first)
+    assert queue.get(job_id)['status'] == 'running'
+
+    queue._run(*second)
+    assert queue.get(job_id)['status'] == 'succeeded'
+    assert queue.stats()['completed'] == 1
+
+
+def test_heartbeat_keeps_slow_jobs_from_running_twice(make_queue):
+    runs = []
+
+    def slow(payload):
+        runs.append(payload)
+        time.sleep(0.5)
+        return 'done'
+
+    queue = make_queue(slow, lease=0.15)
+    queue.start()
+    job = wait_for(queue, queue.submit({})['id'])
+
+    assert (job['status'], job['attempts']) == ('succeeded', 1)
+    assert len(runs) == 1
+
+
+def test_worker_survives_database_errors(make_queue, monkeypatch):
+    queue = make_queue(lambda payload: payload)
+    real_run = queue._run
+    failed = threading.Event()
+
+    def run(*job):
+        if not failed.is_set():
+            failed.set()
+            raise sqlite3.OperationalError('database is locked')
+        real_run(*job)
+
+    monkeypatch.setattr(queue, '_run', run)
+    queue.workers = 1
+    queue.start()
+    queue.submit({'n': 1})
+    assert failed.wait(5)
+
+    job = wait_for(queue, queue.submit({'n': 2})['id'])
+    assert job['result'] == {'n': 2}
+
+
+def test_submit_dedupes_unfinished_jobs(make_queue):
+    queue = make_queue(lambda payload: payload)
+    first = queue.submit({'url': 'a'}, dedupe_key='a')
+
+    assert queue.submit({'url': 'a'}, dedupe_key='a')['id'] == first['id']
+    assert queue.submit({'url': 'b'}, dedupe_key='b')['id'] != first['id']
+
+    queue._run(*queue._claim())
+    assert queue.submit({'url': 'a'}, dedupe_key='a')['id'] != first['id']
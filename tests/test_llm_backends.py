@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from conftest import FakeResponse, LLMSession, RECIPE_REPLY
+from llm_backends import LocalBackend, OpenAICompatibleBackend, StreamDecoder, WriterBackend, create_backend
+from mock_llm_server import parse_errors, parse_latency, serve, synthesize_response
+from recipe_extractor import RecipeExtractor
+
+
+@pytest.fixture
+def llm():
+    server = serve(port=0, latency='fixed:0', responses=[
+        {'match': 'Pancakes', 'content': RECIPE_REPLY},
+    ])
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+
+
+def test_create_backend_by_name(monkeypatch):
+    monkeypatch.delenv('LLM_API_URL', raising=False)
+    monkeypatch.delenv('LLM_MODEL', raising=False)
+    monkeypatch.setenv('LLM_API_KEY', 'key')
+
+    assert isinstance(create_backend('OpenAI'), OpenAICompatibleBackend)
+    assert create_backend('local').api_url == 'http://127.0.0.1:8001/v1/chat/completions'
+    with pytest.raises(ValueError, match='Unknown LLM backend'):
+        create_backend('palm')
+    monkeypatch.delenv('WRITER_API_KEY', raising=False)
+    with pytest.raises(ValueError, match='WRITER_API_KEY'):
+        create_backend('writer')
+
+
+def test_requests_and_responses_use_the_chat_format():
+    backend = OpenAICompatibleBackend(api_key='key', model='gpt-test')
+    headers, payload = backend.build_request('Extract this', stream=True)
+
+    assert headers['Authorization'] == 'Bearer key'
+    assert payload == {'model': 'gpt-test', 'messages': [{'content': 'Extract this', 'role': 'user'}],
+                       'stream': True}
+    assert 'Authorization' not in LocalBackend(api_url='http://mock').build_request('hi')[0]
+    assert backend.response_text({'choices': [{'message': {'content': ' {} '}}]}) == '{}'
+    assert WriterBackend(api_key='key').response_text({'output': 'plain text reply'}) == 'plain text reply'
+    assert backend.error_message(429, '{"error": "slow down"}') == 'OpenAI-compatible API error: 429 - slow down'
+
+
+def test_stream_decoder_reassembles_split_events():
+    backend = LocalBackend(api_url='http://mock')
+    deltas = []
+    decoder = StreamDecoder(backend, 'text/event-stream', on_delta=deltas.append)
+    events = ''.join(
+        f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n" for piece in ('{"a": ', '"é"}')
+    ) + 'data: [DONE]\n\n'
+    raw = events.encode('utf-8')
+    for start in range(0, len(raw), 7):
+        decoder.feed(raw[start:start + 7])
+
+    assert backend.stream_result(200, decoder) == '{"a": "é"}'
+    assert deltas == ['{"a": ', '"é"}']
+
+
+def test_mock_server_specs():
+    assert parse_latency('fixed:250')() == 0.25
+    assert 0.1 <= parse_latency('uniform:100:200')() <= 0.2
+    assert parse_errors('429:0.02,timeout:0.01') == [(429, 0.02), ('timeout', 0.01)]
+    with pytest.raises(ValueError):
+        parse_latency('gamma:1')
+    with pytest.raises(ValueError):
+        parse_errors('500:0.7,429:0.6')
+
+    reply = json.loads(synthesize_response('Page title: Waffles\nWebpage Content:\n- 2 cups flour\n- 1 egg\n'))
+    assert reply['recipeName'] == 'Waffles'
+    assert reply['ingredients'] == ['2 cups flour', '1 egg']
+
+
+def test_extractor_runs_against_mock_server(llm):
+    server, api_url = llm
+    url = 'https://example.com/pancakes'
+    page = '<html><head><title>Pancakes</title></head><body><ul><li>1 cup flour</li></ul></body></html>'
+    extractor = RecipeExtractor(backend=LocalBackend(api_url=api_url),
+                                session=LLMSession({url: FakeResponse(200, page)}))
+
+    recipe = extractor.extract_recipe(url)
+
+    assert recipe['title'] == 'Mock Recipe'
+    assert recipe['ingredients'] == ['1 cup flour', '2 eggs']
+    assert server.mock.stats() == {'requests': 1, 'errors': {}}
+
+
+def test_mock_server_injects_errors():
+    server = serve(port=0, latency='fixed:0', errors='500:1')
+    try:
+        backend = LocalBackend(api_url=f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+        extractor = RecipeExtractor(backend=backend, session=LLMSession())
+
+        with pytest.raises(Exception, match='Local LLM API error: 500'):
+            extractor.extract_recipe('https://example.com/nope.html')
+        assert server.mock.stats() == {'requests': 1, 'errors': {'500': 1}}
+    finally:
+        server.shutdown()
@@ -0,0 +1,46 @@
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from logging_setup import JSONFormatter, RequestIdFilter, bind_context, get_request_id, set_request_id
+
+
+def test_client_request_ids_are_only_trusted_if_plausible():
+    assert set_request_id('checkout-42') == 'checkout-42'
+    assert get_request_id() == 'checkout-42'
+
+    generated = set_request_id('bad id\nwith newline')
+    assert generated != 'bad id\nwith newline'
+    assert len(generated) == 16
+    assert get_request_id() == generated
+
+
+def test_bound_work_logs_the_callers_request_id():
+    set_request_id('caller-1')
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        bound = pool.submit(bind_context(get_request_id)).result()
+        unbound = pool.submit(get_request_id).result()
+
+    assert bound == 'caller-1'
+    assert unbound == '-'
+
+
+def test_json_records_carry_the_request_id():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    handler.addFilter(RequestIdFilter())
+    logger = logging.getLogger('test_logging_setup.json')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        set_request_id('abc.123')
+        logger.warning("Could not fetch %s", 'https://example.com')
+    finally:
+        logger.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry['request_id'] == 'abc.123'
+    assert entry['level'] == 'WARNING'
+    assert entry['message'] == 'Could not fetch https://example.com'
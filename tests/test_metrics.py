@@ -0,0 +1,53 @@
+import pytest
+
+import metrics
+
+
+def test_counters_and_gauges_render_in_exposition_format():
+    registry = metrics.Registry()
+    counter = registry.counter('demo_requests_total', 'Requests handled.', labels=('endpoint', 'status'))
+    gauge = registry.gauge('demo_in_flight', 'Work in progress.')
+    counter.inc(endpoint='/api/extract', status=200)
+    counter.inc(2, endpoint='/api/extract', status=200)
+    counter.inc(endpoint='/say "hi"\n', status=500)
+    gauge.set(1.5)
+
+    assert registry.render() == (
+        '# HELP demo_requests_total Requests handled.\n'
+        '# TYPE demo_requests_total counter\n'
+        'demo_requests_total{endpoint="/api/extract",status="200"} 3\n'
+        'demo_requests_total{endpoint="/say \\"hi\\"\\n",status="500"} 1\n'
+        '# HELP demo_in_flight Work in progress.\n'
+        '# TYPE demo_in_flight gauge\n'
+        'demo_in_flight 1.5\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('demo_seconds', 'Durations.', labels=('stage',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, stage='fetch')
+
+    assert histogram.render().splitlines()[2:] == [
+        'demo_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'demo_seconds_bucket{stage="fetch",le="1"} 3',
+        'demo_seconds_bucket{stage="fetch",le="+Inf"} 4',
+        'demo_seconds_sum{stage="fetch"} 4.25',
+        'demo_seconds_count{stage="fetch"} 4',
+    ]
+
+
+def test_wrong_labels_are_rejected():
+    counter = metrics.Counter('demo_total', 'Demo.', labels=('service',))
+
+    with pytest.raises(ValueError, match='expects labels'):
+        counter.inc(status=200)
+
+
+def test_failing_callback_renders_without_samples():
+    def broken():
+        raise RuntimeError('cache closed')
+
+    metric = metrics.CallbackMetric('demo_entries', 'Entries.', 'gauge', ('cache',), broken)
+
+    assert metric.render() == '# HELP demo_entries Entries.\n# TYPE demo_entries gauge'
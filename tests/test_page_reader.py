@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+import html_reducer
+from page_reader import PageReader, detect_charset, read_page
+
+RECIPE = json.dumps({
+    '@type': 'Recipe', 'name': 'Chili', 'recipeIngredient': ['1 lb beef'], 'recipeInstructions': 'Simmer.'
+})
+PAGE = (
+    f'<html><head><script type="application/ld+json">{RECIPE}</script></head><body>'
+    + '<p>A long comment thread.</p>' * 5000 + '</body></html>'
+).encode('utf-8')
+
+
+def chunks(body, size=1024):
+    return (body[start:start + size] for start in range(0, len(body), size))
+
+
+def test_stops_once_structured_recipe_is_read():
+    text, reader = read_page('text/html', chunks(PAGE))
+
+    assert reader.stopped_early and not reader.truncated
+    assert reader.bytes_read < len(PAGE) // 10
+    assert RECIPE in text
+
+
+def test_reads_whole_page_without_early_stop():
+    reader = PageReader('text/html', early_stop=False)
+    assert not any(reader.feed(chunk) for chunk in chunks(PAGE))
+
+    assert reader.close() == PAGE.decode('utf-8')
+    assert not reader.stopped_early and reader.bytes_read == len(PAGE)
+
+
+def test_caps_body_size():
+    text, reader = read_page('text/html', chunks(b'<p>' + b'x' * 10000), max_bytes=5000)
+
+    assert reader.truncated and reader.bytes_read == 5000
+    assert len(text) == 5000
+
+
+def test_page_of_exactly_the_cap_is_complete():
+    body = b'<p>' + b'x' * 4997
+
+    text, reader = read_page('text/html', chunks(body), max_bytes=5000)
+    assert not reader.truncated and text == body.decode('utf-8')
+
+    text, reader = read_page('text/html', chunks(body + b'y'), max_bytes=5000)
+    assert reader.truncated and text == body.decode('utf-8')
+
+
+def test_rejects_non_html_before_reading():
+    with pytest.raises(Exception, match='Unsupported content type: application/pdf'):
+        PageReader('application/pdf; qs=0.9')
+
+
+@pytest.mark.parametrize('content_type, head, charset', [
+    ('text/html; charset=ISO-8859-1', b'<meta charset="utf-8">', 'iso8859-1'),
+    ('text/html', b'<meta http-equiv="Content-Type" content="text/html; charset=windows-1252">', 'cp1252'),
+    ('text/html; charset=bogus', b'\xef\xbb\xbf<p>', 'utf-8-sig'),
+    (None, b'<p>', 'utf-8'),
+])
+def test_detect_charset(content_type, head, charset):
+    assert detect_charset(content_type, head) == charset
+
+
+def test_decodes_multibyte_characters_split_across_chunks():
+    body = '<meta charset="utf-8"><p>Crème brûlée</p>'.encode('utf-8')
+
+    text, _ = read_page('text/html', chunks(body, size=1))
+
+    assert text == body.decode('utf-8')
+
+
+def test_early_stop_checks_scale_with_page_size(monkeypatch):
+    calls = []
+    pattern = html_reducer.INGREDIENTS_HEADING_RE
+
+    class CountingPattern:
+        def match(self, text):
+            calls.append(text)
+            return pattern.match(text)
+
+    monkeypatch.setattr(html_reducer, 'INGREDIENTS_HEADING_RE', CountingPattern())
+    body = ('<p>Ingredients</p><p>Great post, thanks!</p>' * 20000).encode('utf-8')
+
+    text, reader = read_page('text/html', chunks(body, size=4096), max_bytes=2 * len(body))
+
+    assert not reader.stopped_early and not reader.truncated
+    assert len(text) == len(body)
+    # Every line is looked at once, however many chunks the page arrived in
+    assert len(calls) == 40000
+    assert reader._watcher._parser is None
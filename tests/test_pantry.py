@@ -0,0 +1,126 @@
+import pytest
+
+from pantry import PantryIndex
+from recipe_store import RecipeStore
+
+
+def add(store, slug, ingredients):
+    store.add({'title': slug.title(), 'ingredients': ingredients, 'directions': ['Cook.']},
+              f'https://example.com/{slug}')
+
+
+def loaded(store, **kwargs):
+    index = PantryIndex(store, **kwargs)
+    index.refresh()
+    return index
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecipeStore(path=str(tmp_path / 'store.sqlite3'))
+    add(store, 'omelette', ['3 large eggs', '1 tbsp butter', 'salt and pepper to taste'])
+    add(store, 'pancakes', ['1 1/2 cups all-purpose flour', '2 eggs', '1 cup milk', '1 tbsp sugar'])
+    add(store, 'stuffed peppers', ['4 red bell peppers', '1 lb ground beef', '1 cup rice'])
+    return store
+
+
+def test_ranks_by_fewest_missing_ingredients(store):
+    results = loaded(store).match(['eggs', 'butter', 'flour'])
+
+    assert [(r['title'], r['matched'], r['missing']) for r in results] == [
+        ('Omelette', 4, []),
+        ('Pancakes', 2, ['milk', 'sugar']),
+    ]
+    assert results[0]['coverage'] == 1.0
+    assert results[1]['coverage'] == 0.5
+
+
+def test_staples_alone_do_not_match(store):
+    index = loaded(store)
+
+    assert index.match(['water']) == []
+    assert [r['title'] for r in index.match(['butter'])] == ['Omelette']
+    assert index.match(['butter'], assume_staples=False)[0]['missing'] == ['egg', 'salt', 'pepper']
+
+
+def test_pantry_words_cover_longer_names_but_staples_do_not(store):
+    index = loaded(store)
+
+    assert [r['title'] for r in index.match(['bell pepper'])] == ['Stuffed Peppers']
+    assert index.match(['flour'])[0]['missing'] == ['egg', 'milk', 'sugar']
+
+
+def test_max_missing_and_limit(store):
+    index = loaded(store)
+
+    assert [r['title'] for r in index.match(['eggs'], max_missing=1)] == ['Omelette']
+    assert [r['title'] for r in index.match(['eggs'], limit=1)] == ['Omelette']
+
+
+def test_refresh_picks_up_new_and_updated_recipes(store):
+    index = loaded(store)
+    assert index.match(['tortillas']) == []
+
+    add(store, 'quesadilla', ['2 flour tortillas', '1 cup shredded cheese'])
+    add(store, 'omelette', ['3 large eggs', '1/4 cup shredded cheese'])
+    # Queries never refresh; that's left to the background thread
+    assert index.match(['cheese']) == []
+    index.refresh()
+
+    assert [r['title'] for r in index.match(['cheese'])] == ['Quesadilla', 'Omelette']
+    assert index.match(['butter']) == []
+    assert index.stats()['recipes'] == 4
+
+
+def test_replaced_rows_are_compacted(store):
+    index = loaded(store)
+    for i in range(5):
+        add(store, 'omelette', ['3 large eggs', f'{i + 1} tbsp butter'])
+        add(store, 'pancakes', ['2 eggs', f'{i + 1} cups milk'])
+        index.refresh()
+
+    # Every refresh replaces two of three rows, so dead rows never pile up
+    indptr, indices, column_indptr, column_rows, alive = index._matrix
+    assert len(alive) < 6
+    assert index.stats() == {'recipes': 3, 'ingredients': len(index._names), 'entries': int(len(indices))}
+    assert [r['title'] for r in index.match(['milk', 'eggs'])] == ['Pancakes', 'Omelette']
+    assert index.match(['flour']) == []
+
+
+def test_queries_do_not_wait_for_a_refresh(store):
+    import threading
+
+    index = loaded(store)
+    reading, release = threading.Event(), threading.Event()
+    changed_since = store.changed_since
+
+    def slow_changed_since(since):
+        reading.set()
+        release.wait(5)
+        return changed_since(since)
+    store.changed_since = slow_changed_since
+    add(store, 'toast', ['2 slices bread', '1 tbsp butter'])
+
+    refresh = threading.Thread(target=index.refresh)
+    refresh.start()
+    assert reading.wait(5)
+    # The store read is in progress; queries are answered from the current index meanwhile
+    assert [r['title'] for r in index.match(['butter'])] == ['Omelette']
+    release.set()
+    refresh.join()
+    assert [r['title'] for r in index.match(['butter'])] == ['Omelette', 'Toast']
+
+
+def test_background_refresh(store):
+    import time
+
+    index = PantryIndex(store, refresh_interval=0.05)
+    index.start()
+    try:
+        add(store, 'toast', ['2 slices bread', '1 tbsp butter'])
+        deadline = time.monotonic() + 5
+        while index.stats()['recipes'] < 4 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        index.stop()
+    assert [r['title'] for r in index.match(['bread'])] == ['Toast']
@@ -0,0 +1,45 @@
+import threading
+
+from prefetch import Prefetcher
+
+
+class SlowExtractor:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.urls = []
+
+    def extract_recipe(self, url):
+        self.urls.append(url)
+        self.started.set()
+        self.release.wait(5)
+        return {}
+
+
+def test_cancelled_prefetches_free_their_slots():
+    extractor = SlowExtractor()
+    prefetcher = Prefetcher(extractor, workers=1, max_pending=3)
+    urls = [f'https://example.com/recipe-{i}' for i in range(4)]
+
+    assert [prefetcher.prefetch(url) for url in urls] == [True, True, True, False]
+    extractor.started.wait(5)
+    prefetcher.shutdown()
+    extractor.release.set()
+    prefetcher._executor.shutdown(wait=True)
+
+    stats = prefetcher.stats()
+    assert (stats['pending'], stats['completed'], stats['dropped']) == (0, 1, 1)
+    assert extractor.urls == urls[:1]
+    # Cancelled URLs weren't extracted, so they aren't treated as recently prefetched
+    assert prefetcher._recent.get(urls[0]) is True
+    assert prefetcher._recent.get(urls[1]) is None
+
+
+def test_prefetch_after_shutdown_is_dropped():
+    prefetcher = Prefetcher(SlowExtractor(), workers=1)
+    prefetcher.shutdown()
+
+    assert prefetcher.prefetch('https://example.com/recipe') is False
+    stats = prefetcher.stats()
+    assert (stats['pending'], stats['submitted'], stats['dropped']) == (0, 0, 1)
+    assert prefetcher._recent.get('https://example.com/recipe') is None
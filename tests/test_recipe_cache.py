@@ -0,0 +1,93 @@
+import json
+
+import recipe_cache
+from recipe_cache import MemoryCache, normalize_url
+
+
+def test_normalize_url_merges_equivalent_spellings():
+    assert normalize_url('HTTPS://Example.COM:443/Recipe?b=2&a=1&utm_source=x#comments') == \
+        'https://example.com/Recipe?a=1&b=2'
+    assert normalize_url('http://example.com:80') == 'http://example.com/'
+
+
+def test_normalize_url_keeps_distinct_resources_apart():
+    assert normalize_url('https://www.example.com/r') != normalize_url('https://example.com/r')
+    assert normalize_url('https://example.com/r/') != normalize_url('https://example.com/r')
+    assert normalize_url('https://example.com/R') != normalize_url('https://example.com/r')
+    assert normalize_url('https://example.com:8443/r') != normalize_url('https://example.com/r')
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_cache_bounds_total_size():
+    value = ['x' * 40]
+    cache = MemoryCache(max_bytes=3 * len(json.dumps(value)))
+    for key in 'abcd':
+        cache.set(key, value)
+
+    assert [key for key in 'abcd' if cache.get(key) is not None] == ['b', 'c', 'd']
+    assert cache.stats()['bytes'] == 3 * len(json.dumps(value))
+    cache.set('big', 'x' * 1000)
+    assert cache.get('big') is None
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(recipe_cache.time, 'time', lambda: now[0])
+    cache = MemoryCache(ttl=60)
+    cache.set('a', 1)
+
+    now[0] += 59
+    assert cache.get('a') == 1
+    now[0] += 1
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['expirations']) == (0, 0, 1)
+
+
+def test_memory_cache_values_are_not_shared_with_callers():
+    cache = MemoryCache()
+    results = [{'title': 'Chili'}]
+    cache.set('chili', results)
+    results[0]['title'] = 'Changed before the next lookup'
+
+    cached = cache.get('chili')
+    cached.append({'title': 'Added by a caller'})
+    cached[0]['title'] = 'Changed by a caller'
+
+    assert cache.get('chili') == [{'title': 'Chili'}]
+
+
+def test_peek_leaves_stats_and_recency_alone(tmp_path):
+    memory = MemoryCache(max_entries=2)
+    shared = recipe_cache.SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    for cache in (memory, shared):
+        cache.set('a', {'n': 1})
+        assert cache.peek('a') == {'n': 1}
+        assert cache.peek('b') is None
+        assert (cache.stats()['hits'], cache.stats()['misses']) == (0, 0)
+
+    # Peeking didn't make 'a' recently used, so it is still evicted first
+    memory.set('b', 2)
+    memory.peek('a')
+    memory.set('c', 3)
+    assert memory.peek('a') is None
+
+
+def test_explicit_zero_ttl_is_not_replaced_by_the_default(tmp_path, monkeypatch):
+    monkeypatch.setenv('RECIPE_CACHE_TTL', '3600')
+    cache = recipe_cache.ExtractionCache(str(tmp_path / 'cache.sqlite3'), ttl=0)
+    cache.set('key', {'title': 'Pancakes'})
+
+    assert cache.ttl == 0
+    assert cache.get('key') is None
+    assert recipe_cache.PageCache(str(tmp_path / 'cache.sqlite3'), ttl=0).ttl == 0
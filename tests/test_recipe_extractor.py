@@ -0,0 +1,219 @@
+import json
+
+from conftest import FakeResponse, LLMSession, RECIPE_REPLY
+from llm_backends import LocalBackend
+from mock_llm_server import serve
+from recipe_extractor import RecipeExtractor
+from recipe_cache import ApplianceCache
+from recipe_store import RecipeStore
+
+
+PLAIN_PAGE = """<html><body><article>
+<h1>Weeknight Pancakes</h1>
+<h2>Ingredients</h2><ul><li>1 cup flour</li><li>2 eggs</li></ul>
+<h2>Instructions</h2><ol><li>Mix.</li><li>Cook.</li></ol>
+</article></body></html>"""
+
+
+def test_failed_fetch_is_not_added_to_store(tmp_path, make_extractor):
+    store = RecipeStore(str(tmp_path / 'store.sqlite3'))
+    extractor = make_extractor(store=store)
+
+    recipe = extractor.extract_recipe('https://example.com/nope.html')
+
+    # The URL-only guess is still returned, but never indexed
+    assert recipe['title'] == 'Mock Recipe'
+    assert store.get('https://example.com/nope.html') is None
+    assert store.search('mock recipe') == []
+
+
+def test_fetched_page_is_added_to_store(tmp_path, make_extractor):
+    store = RecipeStore(str(tmp_path / 'store.sqlite3'))
+    url = 'https://example.com/pancakes'
+    extractor = make_extractor(pages={url: FakeResponse(200, PLAIN_PAGE)}, store=store)
+
+    extractor.extract_recipe(url)
+
+    assert store.get(url)['title'] == 'Mock Recipe'
+
+
+def _long_page():
+    steps = ''.join(f'<li>Step {i}: stir the batter for {i} minutes.</li>' for i in range(1, 40))
+    comments = ''.join(f'<p>Comment {i}: loved these, made them again.</p>' for i in range(2000))
+    return f"""<html><head><title>Pancakes</title></head><body><article>
+<h1>Weeknight Pancakes</h1><h2>Ingredients</h2><ul><li>1 cup flour</li><li>2 eggs</li></ul>
+<h2>Instructions</h2><ol>{steps}</ol></article><section>{comments}</section></body></html>"""
+
+
+def test_cache_key_stable_across_chunk_boundaries(tmp_path, make_extractor):
+    from recipe_cache import ExtractionCache, PageCache
+
+    url = 'https://example.com/pancakes'
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite3'))
+    page_cache = PageCache(str(tmp_path / 'cache.sqlite3'))
+    page = _long_page()
+    events = []
+
+    for chunk_size in (1024, 3000):
+        extractor = make_extractor(
+            pages={url: FakeResponse(200, page, headers={'ETag': '"v1"'}, chunk_size=chunk_size)},
+            cache=cache, page_cache=page_cache, token_budget=200
+        )
+        extractor.extract_recipe(url, on_event=lambda event, data: events.append((event, data)))
+
+    fetched = [data for event, data in events if event == 'fetched']
+    # Both reads stopped early, at different places
+    assert fetched[0]['characters'] != fetched[1]['characters']
+    assert fetched[0]['characters'] < len(page)
+    # ...and the second one was still served from the cache
+    assert [event for event, _ in events].count('cached') == 1
+    # A partial body is never kept as the copy a 304 would vouch for
+    assert page_cache.get_page(url) is None
+
+
+def test_complete_page_is_stored_for_conditional_gets(tmp_path, make_extractor):
+    from recipe_cache import PageCache
+
+    url = 'https://example.com/pancakes'
+    page_cache = PageCache(str(tmp_path / 'cache.sqlite3'))
+    extractor = make_extractor(pages={url: FakeResponse(200, PLAIN_PAGE, headers={'ETag': '"v1"'})},
+                               page_cache=page_cache)
+
+    extractor.extract_recipe(url)
+
+    assert PageCache.body(page_cache.get_page(url)) == PLAIN_PAGE
+
+
+def test_coalesced_callers_get_their_own_copy(make_extractor):
+    import threading
+    import time
+
+    url_a = 'https://example.com/pancakes?a=1&b=2'
+    url_b = 'https://example.com/pancakes?b=2&a=1'
+    pages = {url: FakeResponse(200, PLAIN_PAGE) for url in (url_a, url_b)}
+    extractor = make_extractor(pages=pages)
+    call_llm = extractor._call_llm
+
+    def slow_llm(prompt, on_delta=None):
+        time.sleep(0.2)
+        return call_llm(prompt, on_delta)
+    extractor._call_llm = slow_llm
+
+    results = {}
+    threads = [threading.Thread(target=lambda u=u: results.__setitem__(u, extractor.extract_recipe(u)))
+               for u in (url_a, url_b)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert len(extractor.llm_prompts) == 1
+    assert results[url_a]['source_url'] == url_a
+    assert results[url_b]['source_url'] == url_b
+    assert results[url_a] is not results[url_b]
+
+
+def test_page_is_parsed_once_per_extraction(tmp_path, make_extractor, monkeypatch):
+    import recipe_extractor
+    from recipe_cache import ExtractionCache
+
+    calls = []
+    structured = recipe_extractor.extract_structured_recipe
+    monkeypatch.setattr(recipe_extractor, 'extract_structured_recipe',
+                        lambda *args: calls.append('structured') or structured(*args))
+    monkeypatch.setattr(recipe_extractor, 'reduce_html', lambda *args: calls.append('reduce_html'))
+    url = 'https://example.com/pancakes'
+    extractor = make_extractor(pages={url: FakeResponse(200, PLAIN_PAGE)},
+                               cache=ExtractionCache(str(tmp_path / 'cache.sqlite3')))
+
+    extractor.extract_recipe(url)
+
+    # The reducer that watched the download builds the prompt; the page isn't reduced again
+    assert calls == ['structured']
+    assert '- 1 cup flour\n- 2 eggs' in extractor.llm_prompts[0]
+
+
+def test_not_modified_page_goes_straight_to_stored_extraction(tmp_path, make_extractor, monkeypatch):
+    import recipe_extractor
+    from recipe_cache import ExtractionCache, PageCache
+
+    url = 'https://example.com/pancakes'
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite3'))
+    page_cache = PageCache(str(tmp_path / 'cache.sqlite3'))
+    extractor = make_extractor(pages={url: FakeResponse(200, PLAIN_PAGE, headers={'ETag': '"v1"'})},
+                               cache=cache, page_cache=page_cache)
+    extractor.extract_recipe(url)
+
+    calls = []
+    monkeypatch.setattr(recipe_extractor, 'extract_structured_recipe', lambda *args: calls.append(args))
+    monkeypatch.setattr(PageCache, 'body', staticmethod(lambda entry: calls.append(entry)))
+    extractor.session.pages[url] = FakeResponse(304)
+    events = []
+
+    recipe = extractor.extract_recipe(url, on_event=lambda event, data: events.append((event, data)))
+
+    assert extractor.session.requests[-1][1]['headers'] == {'If-None-Match': '"v1"'}
+    # Neither decompressed nor parsed: the stored page hash leads to the cached extraction
+    assert calls == []
+    assert events == [('fetched', {'characters': len(PLAIN_PAGE), 'not_modified': True}), ('cached', {})]
+    assert recipe['title'] == 'Mock Recipe'
+    assert len(extractor.llm_prompts) == 1
+
+
+def test_not_modified_page_is_parsed_when_its_extraction_expired(tmp_path, make_extractor):
+    from recipe_cache import ExtractionCache, PageCache
+
+    url = 'https://example.com/pancakes'
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite3'))
+    extractor = make_extractor(pages={url: FakeResponse(200, PLAIN_PAGE, headers={'ETag': '"v1"'})},
+                               cache=cache, page_cache=PageCache(str(tmp_path / 'cache.sqlite3')))
+    extractor.extract_recipe(url)
+    cache.clear()
+    extractor.session.pages[url] = FakeResponse(304)
+
+    recipe = extractor.extract_recipe(url)
+
+    assert recipe['title'] == 'Mock Recipe'
+    assert len(extractor.llm_prompts) == 2
+    assert '- 1 cup flour\n- 2 eggs' in extractor.llm_prompts[1]
+
+
+def test_streamed_reply_emits_partial_recipes_before_parsing():
+    url = 'https://example.com/pancakes'
+    server = serve(port=0, latency='fixed:50', responses=[{'content': RECIPE_REPLY}])
+    try:
+        backend = LocalBackend(api_url=f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+        extractor = RecipeExtractor(backend=backend, session=LLMSession({url: FakeResponse(200, PLAIN_PAGE)}))
+        events = []
+
+        recipe = extractor.extract_recipe(url, on_event=lambda event, data: events.append((event, data)))
+    finally:
+        server.shutdown()
+
+    names = [event for event, _ in events]
+    partials = [data for event, data in events if event == 'partial']
+    assert names.index('llm_started') < names.index('partial') < names.index('parsed')
+    assert partials[0]['recipe']['ingredients'] == ['1 cup flour', '2 eggs']
+    assert partials[0]['recipe']['directions'] == []
+    assert partials[-1]['fields'] == ['instructions']
+    assert partials[-1]['recipe']['directions'] == recipe['directions']
+
+
+def test_appliance_instructions_are_generated_once_per_recipe(tmp_path, make_extractor):
+    reply = json.dumps({'applianceInstructions': [
+        {'applianceName': 'Breville Smart Oven', 'instructions': ['Bake at 350°F for 12 minutes.']},
+    ]})
+    extractor = make_extractor(reply=reply, appliance_cache=ApplianceCache(str(tmp_path / 'cache.sqlite3')))
+    recipe = {'title': 'Cookies', 'ingredients': ['1 cup flour'], 'directions': ['Bake for 12 minutes.']}
+    first_events, second_events = [], []
+
+    first = extractor.appliance_instructions(recipe, on_event=lambda event, data: first_events.append((event, data)))
+    second = extractor.appliance_instructions(dict(recipe),
+                                              on_event=lambda event, data: second_events.append((event, data)))
+
+    assert first == second == json.loads(reply)['applianceInstructions']
+    assert len(extractor.llm_prompts) == 1
+    assert first_events == [('llm_started', {'stage': 'appliance'})]
+    assert second_events == [('cached', {'stage': 'appliance'})]
+    assert extractor.appliance_cache.stats()['hits'] == 1
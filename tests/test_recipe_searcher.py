@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from conftest import FakeResponse, FakeSession
+from recipe_cache import MemoryCache
+from recipe_searcher import RecipeSearcher, normalize_query
+from recipe_store import RecipeStore
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('The Chocolate-Chip Cookies', 'chocolate chip cooky'),
+    ('chocolate chip cookie recipe', 'chocolate chip cooky'),
+    ('Easy Homemade Bread', 'easy homemade bread'),
+    ('Best Make-Ahead Lasagna', 'best make ahead lasagna'),
+    ('hummus with pita chips', 'hummus pita chip'),
+    ('the', 'the'),
+])
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+def test_descriptive_words_are_searchable(tmp_path):
+    store = RecipeStore(path=str(tmp_path / 'store.sqlite3'))
+    store.add({'title': 'Easy Weeknight Chili', 'ingredients': ['1 lb beef'], 'directions': ['Simmer.']},
+              'https://a.com/easy-chili')
+    store.add({'title': 'Slow Cooker Chili', 'ingredients': ['1 lb beef'], 'directions': ['Cook.']},
+              'https://a.com/slow-chili')
+
+    assert [result['url'] for result in store.search('easy chili recipe')] == ['https://a.com/easy-chili']
+
+
+def test_smaller_searches_are_served_from_larger_cached_ones():
+    items = [{'title': f'Chili {i}', 'link': f'https://example.com/chili-{i}'} for i in range(8)]
+    searcher = RecipeSearcher(api_key='key', search_engine_id='cx', cache=MemoryCache())
+    searcher.session = FakeSession({searcher.api_url: FakeResponse(200, json.dumps({'items': items}))})
+
+    assert len(searcher.search_recipes('Beef Chili', 10)) == 8
+    assert [r['url'] for r in searcher.search_recipes('beef chili recipe', 3)] == [
+        'https://example.com/chili-0', 'https://example.com/chili-1', 'https://example.com/chili-2'
+    ]
+    # Google had only 8 results, so asking for 10 again is still a cache hit
+    searcher.search_recipes('BEEF, chili!', 10)
+    assert len(searcher.session.requests) == 1
+    assert searcher.session.requests[0][1]['params']['num'] == 10
+
+
+def test_larger_shared_result_set_is_not_overwritten(tmp_path):
+    from recipe_cache import SQLiteCache
+
+    shared = SQLiteCache(str(tmp_path / 'search.sqlite3'), table='search')
+    items = [{'title': f'Chili {i}', 'link': f'https://example.com/chili-{i}'} for i in range(10)]
+    shared.set('beef chili', {'results': [{'title': 'Chili'}] * 10, 'num_results': 10})
+    searcher = RecipeSearcher(api_key='key', search_engine_id='cx', cache=MemoryCache(), shared_cache=shared)
+
+    # Another worker's larger entry arrived after this search missed the cache
+    searcher._store_cached('beef chili', 3, searcher._parse_results({'items': items[:3]}))
+
+    assert shared.peek('beef chili')['num_results'] == 10
+    assert searcher._cache.peek('beef chili') is None
+    assert (searcher._cache.stats()['misses'], shared.stats()['hits'], shared.stats()['misses']) == (0, 0, 0)
+
+
+def test_google_fallbacks_count_only_google_calls(tmp_path):
+    store = RecipeStore(path=str(tmp_path / 'store.sqlite3'))
+    store.add({'title': 'Beef Chili', 'ingredients': ['1 lb beef'], 'directions': ['Simmer.']},
+              'https://a.com/beef-chili')
+    items = [{'title': f'Chili {i}', 'link': f'https://example.com/chili-{i}'} for i in range(5)]
+    searcher = RecipeSearcher(api_key='key', search_engine_id='cx', cache=MemoryCache(), store=store,
+                              min_local_results=3)
+    searcher.session = FakeSession({searcher.api_url: FakeResponse(200, json.dumps({'items': items}))})
+
+    searcher.search_recipes('beef chili', 5)
+    # Too few local matches again, but the search cache answers without calling Google
+    searcher.search_recipes('beef chili', 5)
+
+    stats = searcher.cache_stats()
+    assert len(searcher.session.requests) == 1
+    assert (stats['local_answers'], stats['google_fallbacks']) == (0, 1)
@@ -0,0 +1,33 @@
+import pytest
+
+from recipe_store import RecipeStore
+
+
+def recipe(title, ingredients, directions=('Cook.',)):
+    return {'title': title, 'ingredients': list(ingredients), 'directions': list(directions)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RecipeStore(path=str(tmp_path / 'store.sqlite3'))
+
+
+def test_title_matches_rank_first(store):
+    store.add(recipe('Garlic Bread', ['1 loaf bread', '4 cloves garlic', 'butter']), 'https://a.com/bread')
+    store.add(recipe('Roast Chicken', ['1 chicken', '2 cloves garlic']), 'https://b.com/chicken')
+    store.add(recipe('Chicken Soup', ['1 chicken', '1 onion', 'garlic']), 'https://c.com/soup')
+
+    assert [result['url'] for result in store.search('chicken')] == ['https://b.com/chicken', 'https://c.com/soup']
+    assert [result['url'] for result in store.search('garlic', 1)] == ['https://a.com/bread']
+    assert [result['url'] for result in store.search('chicken soup')] == ['https://c.com/soup']
+    assert store.search('chicken bread') == []
+
+
+def test_re_adding_a_url_replaces_its_index_entries(store):
+    store.add(recipe('Tomato Soup', ['tomatoes']), 'https://a.com/soup')
+    assert store.add(recipe('Tomato Soup', ['tomatoes']), 'https://a.com/soup') is False
+    assert store.add(recipe('Leek Soup', ['leeks']), 'https://a.com/soup') is True
+
+    assert store.search('tomato') == []
+    assert [result['title'] for result in store.search('leek')] == ['Leek Soup']
+    assert store.stats() == {'recipes': 1, 'added': 2, 'searches': 2}
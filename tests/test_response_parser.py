@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from response_parser import IncrementalRecipeParser, loads_first_object, parse_recipe_response
+
+REPLY = {
+    'recipeName': 'Chili',
+    'ingredients': ['1 lb beef', '2 cans {kidney} beans'],
+    'instructions': ['Brown the "beef".', 'Simmer.'],
+    'applianceInstructions': [{'applianceName': 'Slow cooker', 'instructions': ['Cook on low.']}],
+}
+
+
+def test_skips_code_fences_and_chatter():
+    text = f'Sure! Here is the recipe:\n```json\n{json.dumps(REPLY)}\n```\nEnjoy {{cooking}}!'
+
+    recipe, problems = parse_recipe_response(text)
+
+    assert recipe == REPLY
+    assert problems == []
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"a": [1, 2,], "b": 3,}', {'a': [1, 2], 'b': 3}),
+    ('{"a": ["x", "y"', {'a': ['x', 'y']}),
+    ('{"a": ["x", "unfinish', {'a': ['x']}),
+    ('{"a": 1, "b":', {'a': 1}),
+    ('no json here', None),
+])
+def test_repairs_malformed_json(text, expected):
+    assert loads_first_object(text) == expected
+
+
+def test_validates_against_the_schema():
+    recipe, problems = parse_recipe_response(json.dumps({
+        'title': ' Chili ',
+        'ingredients': ['1 lb beef', None, 3, ' '],
+        'directions': 'Simmer.',
+        'applianceInstructions': [{'applianceName': 'Oven'}, {'applianceName': 'Grill', 'instructions': []}],
+    }))
+
+    assert recipe == {
+        'recipeName': 'Chili',
+        'ingredients': ['1 lb beef', '3'],
+        'instructions': [],
+        'applianceInstructions': [{'applianceName': 'Grill', 'instructions': []}],
+    }
+    assert problems == ['instructions should be a list', 'dropped 2 invalid ingredients entries']
+
+
+def test_reply_without_json_gives_empty_recipe():
+    recipe, problems = parse_recipe_response('I could not find a recipe on this page.')
+
+    assert recipe == {'recipeName': None, 'ingredients': [], 'instructions': [], 'applianceInstructions': []}
+    assert problems == ['no JSON object found']
+
+
+def test_incremental_parser_reports_fields_as_they_complete():
+    text = json.dumps(REPLY)
+    parser = IncrementalRecipeParser()
+    completed = []
+    for start in range(0, len(text), 7):
+        fields = parser.feed(text[start:start + 7])
+        completed.extend(fields)
+        if fields == ['ingredients']:
+            partial = parser.partial()
+            assert partial['ingredients'] == REPLY['ingredients']
+            assert partial['instructions'] == []
+
+    assert completed == list(REPLY)
+    assert parser.complete
+    assert parser.result() == (REPLY, [])
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    group = SingleFlight()
+    release = threading.Event()
+    joined = threading.Semaphore(0)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {'ingredients': ['1 cup flour']}
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(group.do, 'key', fn)
+        waiters = [pool.submit(group.do, 'key', fn, joined.release) for _ in range(3)]
+        for _ in waiters:
+            assert joined.acquire(timeout=5)
+        release.set()
+        results = [leader.result()] + [waiter.result() for waiter in waiters]
+
+    assert len(calls) == 1
+    assert results == [{'ingredients': ['1 cup flour']}] * 4
+    assert len({id(result) for result in results}) == 4
+    assert group.stats() == {'executions': 1, 'coalesced': 3, 'in_flight': 0}
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    group = SingleFlight()
+    release = threading.Event()
+    joined = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(group.do, 'key', fail)
+        waiter = pool.submit(group.do, 'key', fail, joined.set)
+        assert joined.wait(5)
+        release.set()
+        for future in (leader, waiter):
+            with pytest.raises(ValueError):
+                future.result()
+
+    assert group.do('key', lambda: 'recovered') == 'recovered'
+
+
+def test_async_callers_share_one_call():
+    group = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'title': 'Chili'}
+
+    async def main():
+        return await asyncio.gather(*(group.do('key', fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert results == [{'title': 'Chili'}] * 3
+    assert len({id(result) for result in results}) == 3
+    assert group.stats() == {'executions': 1, 'coalesced': 2, 'in_flight': 0}
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    group = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def main():
+        leader = asyncio.create_task(group.do('key', fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(group.do('key', fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await leader, waiter
+
+    result, waiter = asyncio.run(main())
+
+    assert result == 'done'
+    assert waiter.cancelled()
+
+
+def test_cancelled_leader_hands_the_call_to_its_waiters():
+    group = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def main():
+        leader = asyncio.create_task(group.do('key', fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(group.do('key', fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return leader, await waiter
+
+    leader, result = asyncio.run(main())
+
+    assert leader.cancelled()
+    assert result == 'done'
+    assert len(calls) == 1
+    assert group.stats()['in_flight'] == 0
+
+
+def test_call_is_cancelled_once_every_caller_is():
+    group = AsyncSingleFlight()
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def main():
+        callers = [asyncio.create_task(group.do('key', fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.sleep(0.1)
+        return group.stats()
+
+    assert asyncio.run(main())['in_flight'] == 0
+    assert finished == []
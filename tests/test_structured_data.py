@@ -0,0 +1,74 @@
+import json
+
+from structured_data import StructuredRecipeWatcher, extract_structured_recipe
+
+URL = 'https://example.com/chili'
+
+
+def page(*blocks, body=''):
+    scripts = ''.join(f'<script type="application/ld+json">{block}</script>' for block in blocks)
+    return f'<html><head>{scripts}</head><body>{body}</body></html>'
+
+
+RECIPE = {
+    '@context': 'https://schema.org',
+    '@type': 'Recipe',
+    'name': 'Beef &amp; Bean Chili',
+    'recipeIngredient': ['1 lb <b>ground beef</b>', ' 2 cans  beans ', ''],
+    'recipeInstructions': [
+        {'@type': 'HowToSection', 'name': 'Cook', 'itemListElement': [
+            {'@type': 'HowToStep', 'text': '1. Brown the beef.'},
+            {'@type': 'HowToStep', 'text': 'Add beans , then simmer.'},
+        ]},
+    ],
+}
+
+
+def test_json_ld_recipe_in_graph():
+    document = {'@context': 'https://schema.org', '@graph': [{'@type': 'WebPage'}, dict(RECIPE)]}
+
+    recipe = extract_structured_recipe(page('{"broken":', json.dumps(document)), URL)
+
+    assert recipe['title'] == 'Beef & Bean Chili'
+    assert recipe['ingredients'] == ['1 lb ground beef', '2 cans beans']
+    assert recipe['directions'] == ['Step 1: Brown the beef.', 'Step 2: Add beans, then simmer.']
+    assert recipe['applianceInstructions'] == []
+    assert recipe['source_url'] == URL
+
+
+def test_string_instructions_and_type_lists():
+    node = dict(RECIPE, **{'@type': ['Recipe', 'NewsArticle'], 'recipeInstructions': 'Brown.\n\nSimmer.'})
+
+    recipe = extract_structured_recipe(page(json.dumps(node)), URL)
+
+    assert recipe['directions'] == ['Step 1: Brown.', 'Step 2: Simmer.']
+
+
+def test_incomplete_markup_falls_back():
+    node = dict(RECIPE, recipeInstructions=[])
+
+    assert extract_structured_recipe(page(json.dumps(node)), URL) is None
+    assert extract_structured_recipe(page(), URL) is None
+
+
+def test_microdata_recipe():
+    body = '''<div itemscope itemtype="https://schema.org/Recipe">
+        <h1 itemprop="name">Pancakes</h1>
+        <li itemprop="recipeIngredient">1 cup flour</li>
+        <div itemprop="recipeInstructions">Whisk everything.</div>
+    </div>'''
+
+    recipe = extract_structured_recipe(page(body=body), URL)
+
+    assert (recipe['title'], recipe['ingredients'], recipe['directions']) == (
+        'Pancakes', ['1 cup flour'], ['Step 1: Whisk everything.']
+    )
+
+
+def test_watcher_finds_recipe_before_page_ends():
+    html = page(json.dumps(RECIPE), body='<p>comments</p>' * 100)
+    end = html.index('</script>') + len('</script>')
+    watcher = StructuredRecipeWatcher()
+
+    assert watcher.feed(html[:end - 20]) is False
+    assert watcher.feed(html[end - 20:end]) is True